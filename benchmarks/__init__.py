@@ -0,0 +1,15 @@
+"""
+Benchmarks for the parser and extractor hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks -o results.json
+    python -m benchmarks --filter synthetic/comfyui --scale 0.5
+    python -m benchmarks --compare baseline.json
+
+Results are written as JSON, so that runs of different commits can be compared.
+
+Import times (cold start) are measured separately, see `benchmarks.importtime`:
+
+    python -m benchmarks.importtime
+"""
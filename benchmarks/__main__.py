@@ -0,0 +1,137 @@
+"""Standalone benchmark runner, writing results as JSON."""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import PIL
+
+from ._timing import measure
+from .suite import collect
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment() -> Dict[str, Any]:
+    from sd_parsers._cache import _package_version
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "sd_parsers": _package_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "pillow": PIL.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def _print_result(name: str, result: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    line = f"{name:<60} {result['latency'] * 1000:10.3f} ms {result['items_per_second']:10.1f}/s"
+
+    if "megabytes_per_second" in result:
+        line += f" {result['megabytes_per_second']:10.1f} MB/s"
+
+    line += f" {result['peak_memory'] / 1_000_000:10.1f} MB peak"
+
+    if "retained_memory_per_item" in result:
+        line += f" {result['retained_memory_per_item']:10.0f} B/item held"
+
+    if baseline and name in baseline:
+        line += f"  x{baseline[name]['median'] / result['median']:.2f}"
+
+    print(line, file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argument_parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmark the sd-parsers hot paths."
+    )
+    argument_parser.add_argument(
+        "-k",
+        "--filter",
+        action="append",
+        default=[],
+        help="only run benchmarks whose name contains the given text (repeatable)",
+    )
+    argument_parser.add_argument(
+        "--scale", type=float, default=1.0, help="size factor for synthetic inputs (default: 1)"
+    )
+    argument_parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="minimum time in seconds to spend on each benchmark (default: 0.5)",
+    )
+    argument_parser.add_argument(
+        "--compare", help="results of an earlier run, to print speedups against"
+    )
+    argument_parser.add_argument(
+        "--list", action="store_true", help="list the available benchmarks and exit"
+    )
+    argument_parser.add_argument("-o", "--output", help="write JSON results to this file")
+    args = argument_parser.parse_args(argv)
+
+    cases = {
+        name: setup
+        for name, setup in collect(args.scale).items()
+        if not args.filter or any(text in name for text in args.filter)
+    }
+
+    if args.list:
+        print("\n".join(cases))
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    results = {}
+    for name, setup in cases.items():
+        benchmark = setup()
+        results[name] = measure(
+            benchmark.function,
+            min_time=args.min_time,
+            items=benchmark.items,
+            size=benchmark.size,
+        )
+        _print_result(name, results[name], baseline)
+
+    output = {
+        "environment": _environment(),
+        "settings": {"scale": args.scale, "min_time": args.min_time},
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(output, file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
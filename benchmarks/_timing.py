@@ -0,0 +1,84 @@
+"""Timing of single benchmark cases."""
+
+import gc
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def measure(
+    function: Callable[[], Any],
+    *,
+    min_time: float = 0.5,
+    min_rounds: int = 3,
+    max_rounds: int = 10_000,
+    items: int = 1,
+    size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Call `function` repeatedly, for at least `min_time` seconds and `min_rounds` calls.
+
+    Parameters:
+        items: number of files (or other units) processed by a single call.
+        size: number of bytes processed by a single call.
+
+    Returns a dictionary of timing statistics (in seconds), throughput figures and the peak
+    memory allocated during a single call (in bytes).
+    If `function` returns a value, the memory held by it is reported as well, in total and per item.
+    """
+    function()  # warm up
+
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        while len(timings) < max_rounds:
+            call_start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - call_start)
+
+            if len(timings) >= min_rounds and call_start - start >= min_time:
+                break
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    median = statistics.median(timings)
+    result = {
+        "rounds": len(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.mean(timings),
+        "median": median,
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "items": items,
+        "latency": median / items,
+        "items_per_second": items / median if median else None,
+    }
+
+    result["peak_memory"], retained = memory_usage(function)
+    if retained is not None:
+        result["retained_memory"] = retained
+        result["retained_memory_per_item"] = retained / items
+
+    if size is not None:
+        result["bytes"] = size
+        result["megabytes_per_second"] = size / median / 1_000_000 if median else None
+
+    return result
+
+
+def memory_usage(function: Callable[[], Any]) -> Tuple[int, Optional[int]]:
+    """
+    Return the peak memory allocated by Python code during a call of `function`,
+    and the memory still allocated while holding on to its return value (None if it returns None).
+    """
+    tracemalloc.start()
+    try:
+        value = function()
+        current, peak = tracemalloc.get_traced_memory()
+        return peak, None if value is None else current
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,162 @@
+"""
+Cold start: time spent importing modules, as reported by `python -X importtime`.
+
+Run from the repository root:
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 20 --top 10
+
+Every scenario runs in a new interpreter. Imports made while running the scenario count,
+including those deferred to the first `parse()` call.
+Exits with status 1 if the best time of a scenario exceeds its budget
+(the best of several runs, as other processes can only make imports slower).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from tests.tools import RESOURCE_PATH
+
+# written to stderr before running a scenario, to leave out the imports of interpreter startup
+MARKER = "-- scenario --"
+
+
+class Scenario(NamedTuple):
+    code: str
+    budget: float
+    """Maximum import time in milliseconds."""
+
+
+class Import(NamedTuple):
+    module: str
+    depth: int
+    self_time: int
+    """Microseconds spent importing the module, without its imports."""
+    cumulative: int
+    """Microseconds spent importing the module, including its imports."""
+
+
+def _scenarios() -> Dict[str, Scenario]:
+    parse = "from sd_parsers import ParserManager\nParserManager().parse({!r})"
+    images = RESOURCE_PATH / "parsers"
+
+    return {
+        "import": Scenario("import sd_parsers", 40),
+        "parser_manager": Scenario("from sd_parsers import ParserManager\nParserManager()", 60),
+        "first_parse/PNG": Scenario(
+            parse.format(str(images / "AUTOMATIC1111/automatic1111_cropped.png")), 150
+        ),
+        "first_parse/JPEG": Scenario(
+            parse.format(str(images / "AUTOMATIC1111/automatic1111_cropped.jpg")), 150
+        ),
+        "first_parse/ComfyUI": Scenario(
+            parse.format(str(images / "ComfyUI/img2img_cropped.png")), 150
+        ),
+    }
+
+
+def import_times(code: str) -> List[Import]:
+    """Run `code` in a new interpreter, returning the modules imported by it."""
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys\nprint({MARKER!r}, file=sys.stderr, flush=True)\n{code}",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    imports = []
+    for line in process.stderr.partition(MARKER)[2].splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        self_time, cumulative, module = line[len("import time:") :].split("|")
+        if not self_time.strip().isdigit():
+            continue  # header
+
+        name = module.strip()
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        imports.append(Import(name, depth, int(self_time), int(cumulative)))
+
+    return imports
+
+
+def total_time(imports: List[Import]) -> float:
+    """Return the total import time in milliseconds."""
+    return sum(entry.cumulative for entry in imports if entry.depth == 0) / 1000
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argument_parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.importtime",
+        description="Measure the import time of sd-parsers against a budget.",
+    )
+    argument_parser.add_argument(
+        "-k",
+        "--filter",
+        action="append",
+        default=[],
+        help="only run scenarios whose name contains the given text (repeatable)",
+    )
+    argument_parser.add_argument(
+        "--runs", type=int, default=5, help="interpreters to start per scenario (default: 5)"
+    )
+    argument_parser.add_argument(
+        "--top", type=int, default=0, help="show the given number of slowest modules"
+    )
+    argument_parser.add_argument("-o", "--output", help="write JSON results to this file")
+    args = argument_parser.parse_args(argv)
+
+    scenarios = {
+        name: scenario
+        for name, scenario in _scenarios().items()
+        if not args.filter or any(text in name for text in args.filter)
+    }
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, scenario in scenarios.items():
+        import_times(scenario.code)  # warm up, i.e. compile bytecode
+
+        runs = [import_times(scenario.code) for _ in range(max(args.runs, 1))]
+        totals = [total_time(imports) for imports in runs]
+        best = min(totals)
+
+        results[name] = {
+            "median": statistics.median(totals),
+            "min": best,
+            "max": max(totals),
+            "budget": scenario.budget,
+            "modules": len(runs[-1]),
+        }
+
+        line = f"{name:<30} {best:8.1f} ms best {results[name]['median']:8.1f} ms median"
+        line += f" {len(runs[-1]):6} modules   budget {scenario.budget:.0f} ms"
+        if best > scenario.budget:
+            line += "   OVER BUDGET"
+        print(line, file=sys.stderr)
+
+        slowest = sorted(runs[-1], key=lambda entry: entry.self_time, reverse=True)
+        for entry in slowest[: args.top]:
+            print(f"    {entry.module:<50} {entry.self_time / 1000:8.1f} ms", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"results": results}, file, indent=2)
+
+    over_budget = [name for name, result in results.items() if result["min"] > result["budget"]]
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
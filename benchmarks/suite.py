@@ -0,0 +1,324 @@
+"""The benchmark cases."""
+
+import io
+import json
+from contextlib import suppress
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from PIL import Image
+
+from sd_parsers import InternPool, NDJSONWriter, ParserManager, _json
+from sd_parsers.data import Generators
+from sd_parsers.exceptions import MetadataError
+from sd_parsers.extractors import METADATA_EXTRACTORS, Eagerness
+from sd_parsers.parsers import AUTOMATIC1111Parser, ComfyUIParser
+from sd_parsers.parsers._comfyui import _decode_workflow
+
+from tests.tools import RESOURCE_PATH
+
+from . import synthetic
+
+IMAGE_SUFFIXES = (".jpg", ".png", ".webp")
+
+
+class Benchmark(NamedTuple):
+    """A function to be timed, along with the number of files and bytes processed per call."""
+
+    function: Callable[[], Any]
+    items: int = 1
+    size: Optional[int] = None
+
+
+def _resource_images() -> List[Path]:
+    return sorted(
+        filename
+        for filename in (RESOURCE_PATH / "parsers").rglob("*.*")
+        if filename.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def _negative_images() -> List[Path]:
+    bad_images = RESOURCE_PATH / "bad_images"
+    return [bad_images / "empty_image.png", bad_images / "empty_image.jpg"]
+
+
+def _parse_files(
+    filenames: List[Path], eagerness: Eagerness, lazy: bool = False
+) -> Callable[[], Benchmark]:
+    def setup():
+        parser_manager = ParserManager(eagerness=eagerness, lazy=lazy)
+
+        def run():
+            for filename in filenames:
+                parser_manager.parse(filename)
+
+        return Benchmark(run, len(filenames), sum(f.stat().st_size for f in filenames))
+
+    return setup
+
+
+def _hold_results(
+    filenames: List[Path], copies: int, structured: bool = False, interned: bool = False
+) -> Callable[[], Benchmark]:
+    def setup():
+        parser_manager = ParserManager()
+        data = [filename.read_bytes() for filename in filenames]
+
+        def run():
+            parser_manager.intern_pool = InternPool() if interned else None
+
+            # returning the results lets the memory held by them be measured
+            results = [parser_manager.parse(io.BytesIO(d)) for d in data for _ in range(copies)]
+            if structured:
+                # without the raw metadata strings
+                return [result.samplers for result in results if result]
+            return results
+
+        return Benchmark(run, len(filenames) * copies, sum(len(d) for d in data) * copies)
+
+    return setup
+
+
+def _serialize_results(
+    filenames: List[Path], copies: int, streaming: bool
+) -> Callable[[], Benchmark]:
+    def setup():
+        parser_manager = ParserManager()
+        results = [parser_manager.parse(filename) for filename in filenames]
+        results = [result for result in results if result] * copies
+        output = io.StringIO()
+        writer = NDJSONWriter(output)
+
+        def run():
+            output.seek(0)
+            output.truncate()
+            for result in results:
+                if streaming:
+                    writer.write(result)
+                else:
+                    output.write(result.to_json() + "\n")
+
+        run()
+        return Benchmark(run, len(results), len(output.getvalue()))
+
+    return setup
+
+
+def _detect_files(filenames: List[Path], eagerness: Eagerness) -> Callable[[], Benchmark]:
+    def setup():
+        parser_manager = ParserManager(eagerness=eagerness)
+
+        def run():
+            for filename in filenames:
+                parser_manager.detect(filename)
+
+        return Benchmark(run, len(filenames), sum(f.stat().st_size for f in filenames))
+
+    return setup
+
+
+def _extract_files(extractor, filenames: List[Path]) -> Callable[[], Benchmark]:
+    def setup():
+        # the generator folders are named after the generators
+        sources = [(filename, Generators(filename.parent.name)) for filename in filenames]
+
+        def run():
+            for filename, generator in sources:
+                with Image.open(filename) as image, suppress(MetadataError):
+                    extractor(image, generator)
+
+        return Benchmark(run, len(sources), sum(f.stat().st_size for f in filenames))
+
+    return setup
+
+
+def _parse_bytes(make_data: Callable[[], bytes], eagerness: Eagerness) -> Callable[[], Benchmark]:
+    def setup():
+        data = make_data()
+        parser_manager = ParserManager(eagerness=eagerness)
+
+        def run():
+            with io.BytesIO(data) as file:
+                parser_manager.parse(file)
+
+        return Benchmark(run, 1, len(data))
+
+    return setup
+
+
+def _parse_parameters(parser_type, make_parameters) -> Callable[[], Benchmark]:
+    def setup():
+        parameters = make_parameters()
+        parser = parser_type()
+
+        def run():
+            parser.parse(parameters)
+
+        return Benchmark(run, 1, sum(len(value) for value in parameters.values()))
+
+    return setup
+
+
+def _decode_workflow_links(selective: bool, node_count: int) -> Callable[[], Benchmark]:
+    def setup():
+        workflow = synthetic.comfyui_graph(node_count)["workflow"]
+
+        def run():
+            if selective:
+                return _decode_workflow(workflow)["links"]
+            return json.loads(workflow)["links"]
+
+        return Benchmark(run, 1, len(workflow))
+
+    return setup
+
+
+def _decode_prompt(backend: str, node_count: int) -> Callable[[], Benchmark]:
+    def setup():
+        prompt = synthetic.comfyui_graph(node_count)["prompt"]
+
+        def run():
+            with _json.use_backend(backend):
+                return _json.loads(prompt)
+
+        return Benchmark(run, 1, len(prompt))
+
+    return setup
+
+
+def _json_backends() -> List[str]:
+    backends = []
+    for backend in _json.BACKENDS:
+        with suppress(ImportError):
+            _json.get_backend(backend)
+            backends.append(backend)
+    return backends
+
+
+def collect(scale: float = 1.0) -> Dict[str, Callable[[], Benchmark]]:
+    """
+    Collect all benchmark cases by name.
+
+    Each case is given as a setup function, returning the Benchmark to be timed.
+    `scale` adjusts the size of the synthetic inputs.
+    """
+    cases: Dict[str, Callable[[], Benchmark]] = {}
+    images = _resource_images()
+
+    def scaled(value: int) -> int:
+        return max(1, int(value * scale))
+
+    # per file latency, for each generator
+    for filename in images:
+        cases[f"generator/{filename.parent.name}/{filename.name}"] = _parse_files(
+            [filename], Eagerness.EAGER
+        )
+
+    # throughput for each eagerness level, including files without metadata
+    for eagerness in Eagerness:
+        cases[f"eagerness/{eagerness.name}"] = _parse_files(images + _negative_images(), eagerness)
+
+    # generator detection only
+    cases["lazy/DEFAULT"] = _parse_files(images + _negative_images(), Eagerness.DEFAULT, True)
+    cases["detect/DEFAULT"] = _detect_files(images + _negative_images(), Eagerness.DEFAULT)
+
+    # memory held by parsing results
+    cases["memory/results"] = _hold_results(images, scaled(100))
+    cases["memory/samplers"] = _hold_results(images, scaled(100), structured=True)
+    cases["memory/samplers_interned"] = _hold_results(
+        images, scaled(100), structured=True, interned=True
+    )
+
+    # writing results as NDJSON, compared to PromptInfo.to_json()
+    png_images = [filename for filename in images if filename.suffix == ".png"]
+    cases["serialize/ndjson"] = _serialize_results(png_images, scaled(100), True)
+    cases["serialize/to_json"] = _serialize_results(png_images, scaled(100), False)
+
+    # each extractor, on the images of its format
+    for image_format, stages in METADATA_EXTRACTORS.items():
+        filenames = []
+        for filename in images:
+            with Image.open(filename) as image:
+                if image.format == image_format:
+                    filenames.append(filename)
+
+        if not filenames:
+            continue
+
+        for eagerness, extractors in stages.items():
+            for extractor in extractors:
+                name = f"extractor/{image_format}/{eagerness.name}/{extractor.__name__}"
+                cases[name] = _extract_files(extractor, filenames)
+
+    # scaled synthetic inputs
+    for length in (1_000, 100_000, 1_000_000):
+        length = scaled(length)
+        cases[f"synthetic/a1111/{length}_chars"] = _parse_parameters(
+            AUTOMATIC1111Parser,
+            lambda length=length: {"parameters": synthetic.a1111_parameters(length)},
+        )
+
+    for node_count in (100, 1_000, 5_000):
+        node_count = scaled(node_count)
+        cases[f"synthetic/comfyui/{node_count}_nodes"] = _parse_parameters(
+            ComfyUIParser, lambda node_count=node_count: synthetic.comfyui_graph(node_count)
+        )
+        cases[f"synthetic/comfyui_prompt_links/{node_count}_nodes"] = _parse_parameters(
+            partial(ComfyUIParser, links_from_prompt=True),
+            lambda node_count=node_count: synthetic.comfyui_graph(node_count),
+        )
+
+        # reading the workflow links, compared to decoding the whole workflow
+        cases[f"synthetic/workflow_links/{node_count}_nodes"] = _decode_workflow_links(
+            True, node_count
+        )
+        cases[f"synthetic/workflow_json/{node_count}_nodes"] = _decode_workflow_links(
+            False, node_count
+        )
+
+        # the installed JSON backends
+        for backend in _json_backends():
+            cases[f"synthetic/json/{backend}/{node_count}_nodes"] = _decode_prompt(
+                backend, node_count
+            )
+
+    for size in (512, 2048):
+        size = scaled(size)
+        cases[f"synthetic/png_text/{size}px"] = _parse_bytes(
+            lambda size=size: synthetic.png_bytes(
+                synthetic.rgba_image(size), {"parameters": synthetic.a1111_parameters(1000)}
+            ),
+            Eagerness.DEFAULT,
+        )
+        cases[f"synthetic/stealth/{size}px"] = _parse_bytes(
+            lambda size=size: synthetic.stealth_png(size, synthetic.a1111_parameters(1000)),
+            Eagerness.EAGER,
+        )
+        cases[f"synthetic/no_stealth/{size}px"] = _parse_bytes(
+            lambda size=size: synthetic.png_bytes(synthetic.rgba_image(size)),
+            Eagerness.EAGER,
+        )
+
+    # video tags, the size of the video data should not matter
+    for container in ("mp4", "webm"):
+        for megabytes in (1, 50):
+            size = scaled(megabytes * 1_000_000)
+            cases[f"synthetic/video/{container}/{megabytes}MB"] = _parse_bytes(
+                lambda container=container, size=size: synthetic.video(container, size),
+                Eagerness.DEFAULT,
+            )
+
+    # animated images, the number of frames should not matter
+    for image_format in ("webp", "apng", "gif"):
+        for frame_count in (10, 200):
+            frames = scaled(frame_count)
+            cases[f"synthetic/animation/{image_format}/{frame_count}frames"] = _parse_bytes(
+                lambda image_format=image_format, frames=frames: synthetic.animation(
+                    image_format, frames
+                ),
+                Eagerness.DEFAULT,
+            )
+
+    return cases
@@ -0,0 +1,191 @@
+"""Scaled synthetic inputs for benchmarking."""
+
+import gzip
+import io
+import json
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+from PIL import Image, PngImagePlugin
+
+from sd_parsers.extractors._png_stenographic_alpha import STEALTH_HEADER
+
+from tests.tools.animation import animated_gif, animated_png, animated_webp
+from tests.tools.stealth import embed_stealth
+from tests.tools.video import mp4_file, webm_file
+
+
+def a1111_parameters(prompt_length: int, seed: int = 0) -> str:
+    """An AUTOMATIC1111 parameter string with prompts of (roughly) the given length."""
+    rng = random.Random(seed)
+    words = ["masterpiece", "best quality", "(detailed:1.2)", "<lora:style:0.8>", "landscape"]
+
+    def prompt():
+        parts: List[str] = []
+        length = 0
+        while length < prompt_length:
+            word = rng.choice(words)
+            parts.append(word)
+            length += len(word) + 2
+        return ", ".join(parts)
+
+    hashes = {f"lora:style{index}": f"{rng.getrandbits(40):010x}" for index in range(20)}
+
+    return (
+        f"{prompt()}\n"
+        f"Negative prompt: {prompt()}\n"
+        "Steps: 30, Sampler: DPM++ 2M Karras, CFG scale: 7, Seed: 1234567890, "
+        "Size: 512x768, Model hash: 6ce0161689, Model: v1-5-pruned-emaonly, "
+        f"Denoising strength: 0.5, Hashes: {json.dumps(hashes)}, Version: v1.6.0"
+    )
+
+
+def comfyui_graph(node_count: int) -> Dict[str, str]:
+    """
+    A ComfyUI prompt/workflow pair with about `node_count` nodes.
+
+    A checkpoint loader feeds a long chain of LoRA loaders, and the positive prompt a long chain
+    of conditioning nodes. A number of sampler stages share these models and prompts.
+    """
+    prompt: Dict[str, Dict[str, Any]] = {}
+    links: List[List[Any]] = []
+    link_types = {"model": "MODEL", "clip": "CLIP", "positive": "CONDITIONING"}
+    link_types.update(negative="CONDITIONING", conditioning="CONDITIONING")
+
+    def add_node(class_type: str, inputs: Dict[str, Any]) -> str:
+        node_id = str(len(prompt) + 1)
+        prompt[node_id] = {"class_type": class_type, "inputs": inputs}
+
+        for input_name, value in inputs.items():
+            if isinstance(value, list):
+                link_type = link_types.get(input_name, "LATENT")
+                links.append([len(links) + 1, int(value[0]), value[1], int(node_id), 0, link_type])
+
+        return node_id
+
+    sampler_count = max(1, node_count // 100)
+    chain_length = max(0, node_count - 4 - sampler_count)
+    lora_count = chain_length // 2
+
+    checkpoint = add_node("CheckpointLoaderSimple", {"ckpt_name": "model.safetensors"})
+    model, clip = [checkpoint, 0], [checkpoint, 1]
+
+    for index in range(lora_count):
+        lora = add_node(
+            "LoraLoader",
+            {
+                "lora_name": f"lora_{index}.safetensors",
+                "strength_model": 0.5,
+                "strength_clip": 0.5,
+                "model": model,
+                "clip": clip,
+            },
+        )
+        model, clip = [lora, 0], [lora, 1]
+
+    positive = [add_node("CLIPTextEncode", {"text": "positive prompt", "clip": clip}), 0]
+    negative = [add_node("CLIPTextEncode", {"text": "negative prompt", "clip": clip}), 0]
+
+    for _ in range(chain_length - lora_count):
+        positive = [
+            add_node("ConditioningSetAreaStrength", {"strength": 1.0, "conditioning": positive}),
+            0,
+        ]
+
+    latent = [add_node("EmptyLatentImage", {"width": 512, "height": 512, "batch_size": 1}), 0]
+
+    for index in range(sampler_count):
+        sampler = add_node(
+            "KSampler",
+            {
+                "seed": index,
+                "steps": 20,
+                "cfg": 7.0,
+                "sampler_name": "euler",
+                "scheduler": "normal",
+                "denoise": 1.0,
+                "model": model,
+                "positive": positive,
+                "negative": negative,
+                "latent_image": latent,
+            },
+        )
+        latent = [sampler, 0]
+
+    def ui_node(node_id: str, node: Dict[str, Any]) -> Dict[str, Any]:
+        # layout information, as stored by the ComfyUI frontend
+        inputs = node["inputs"]
+        return {
+            "id": int(node_id),
+            "type": node["class_type"],
+            "pos": [int(node_id) * 320 % 8000, int(node_id) // 25 * 260],
+            "size": [315, 262],
+            "flags": {},
+            "order": int(node_id),
+            "mode": 0,
+            "inputs": [
+                {"name": name, "type": link_types.get(name, "LATENT"), "link": None}
+                for name, value in inputs.items()
+                if isinstance(value, list)
+            ],
+            "outputs": [{"name": "OUTPUT", "type": "*", "links": [], "slot_index": 0}],
+            "properties": {"Node name for S&R": node["class_type"]},
+            "widgets_values": [value for value in inputs.values() if not isinstance(value, list)],
+        }
+
+    workflow = {
+        "last_node_id": len(prompt),
+        "last_link_id": len(links),
+        "nodes": [ui_node(node_id, node) for node_id, node in prompt.items()],
+        "links": links,
+        "groups": [],
+        "config": {},
+        "extra": {"ds": {"scale": 1.0, "offset": [0, 0]}},
+        "version": 0.4,
+    }
+
+    return {"prompt": json.dumps(prompt), "workflow": json.dumps(workflow)}
+
+
+def png_bytes(image: Image.Image, text: Optional[Dict[str, str]] = None) -> bytes:
+    """Encode an image as PNG, with the given text chunks."""
+    info = PngImagePlugin.PngInfo()
+    for key, value in (text or {}).items():
+        info.add_text(key, value)
+
+    with io.BytesIO() as file:
+        image.save(file, format="PNG", pnginfo=info, compress_level=1)
+        return file.getvalue()
+
+
+def rgba_image(size: int, seed: int = 0) -> Image.Image:
+    """A square RGBA image filled with noise."""
+    return Image.frombytes("RGBA", (size, size), random.Random(seed).randbytes(size * size * 4))
+
+
+def stealth_png(size: int, text: str) -> bytes:
+    """
+    A square RGBA PNG image, with `text` hidden in its alpha channel.
+
+    The image is enlarged if `size` is too small to hold the text.
+    """
+    bits = (len(STEALTH_HEADER) + 4 + len(gzip.compress(text.encode("utf-8")))) * 8
+    size = max(size, math.isqrt(bits - 1) + 1)
+    return png_bytes(embed_stealth(rgba_image(size), text))
+
+
+def video(container: str, payload_size: int, node_count: int = 100) -> bytes:
+    """A "mp4" or "webm" video, with a ComfyUI workflow in its comment tag."""
+    graph = comfyui_graph(node_count)
+    comment = json.dumps({key: json.loads(value) for key, value in graph.items()})
+    video_file = mp4_file if container == "mp4" else webm_file
+    return video_file({"comment": comment}, payload_size=payload_size)
+
+
+def animation(image_format: str, frame_count: int, node_count: int = 100) -> bytes:
+    """An animated "webp", "apng" or "gif" image, with a ComfyUI workflow as ComfyUI stores it."""
+    graph = comfyui_graph(node_count)
+    parameters = {key: json.loads(value) for key, value in graph.items()}
+    make_image = {"webp": animated_webp, "apng": animated_png, "gif": animated_gif}[image_format]
+    return make_image(parameters, frame_count=frame_count)
@@ -1,41 +1,20 @@
 """
 experimental - try to parse video generation metadata
 
-uses only the ComfyUI parser for now
+reads the metadata tags of MP4/MOV and WebM/MKV videos, as written by ComfyUI video nodes
 structured parsing will most likely return unusable data - check raw_parameters instead.
-
-your system needs ffmpeg installed for this to work
-
-install ffmpeg support with:
-pip3 install ffmpeg-python
 """
 
-import json
-import ffmpeg
 import sys
 from pprint import pprint
 
-from sd_parsers.exceptions import ParserError
-from sd_parsers.parsers import ComfyUIParser
+from sd_parsers import ParserManager
 
-parser = ComfyUIParser()
+parser_manager = ParserManager()
 
 
 def parse_video(video_file: str):
-    res = ffmpeg.probe(video_file)
-
-    try:
-        comment = res["format"]["tags"]["comment"]
-        parameters = json.loads(comment)
-    except (KeyError, TypeError, json.JSONDecodeError):
-        return None
-
-    try:
-        return parser.parse(parameters)
-    except ParserError as error:
-        print("error in parser: ", error)
-
-    return None
+    return parser_manager.parse(video_file)
 
 
 if __name__ == "__main__":
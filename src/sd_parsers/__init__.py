@@ -18,7 +18,51 @@ def main():
         print(prompt_info)
 """
 
-from ._parser_manager import ParserManager
-from .extractors import Eagerness
+import importlib as _importlib
+import typing as _typing
 
-__all__ = ["ParserManager", "Eagerness"]
+if _typing.TYPE_CHECKING:
+    from ._cache import ParseCache
+    from ._instrumentation import MetricsAggregator, ParseRecord
+    from ._interning import InternPool
+    from ._parser_manager import Detection, ParserManager
+    from ._serialization import NDJSONWriter
+    from .extractors import Eagerness
+
+# public names, imported from their modules on first access to keep `import sd_parsers` fast
+_LAZY_ATTRIBUTES = {
+    "ParserManager": "._parser_manager",
+    "Detection": "._parser_manager",
+    "ParseCache": "._cache",
+    "InternPool": "._interning",
+    "NDJSONWriter": "._serialization",
+    "MetricsAggregator": "._instrumentation",
+    "ParseRecord": "._instrumentation",
+    "Eagerness": ".extractors",
+}
+
+
+def __getattr__(name: str) -> _typing.Any:
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = globals()[name] = getattr(_importlib.import_module(module, __name__), name)
+    return value
+
+
+def __dir__() -> _typing.List[str]:
+    return sorted(set(globals()) | set(__all__))
+
+
+__all__ = [
+    "ParserManager",
+    "Detection",
+    "ParseCache",
+    "InternPool",
+    "NDJSONWriter",
+    "MetricsAggregator",
+    "ParseRecord",
+    "Eagerness",
+]
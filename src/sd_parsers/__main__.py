@@ -1,14 +1,275 @@
+"""
+Command line interface.
+
+usage:
+    python3 -m sd_parsers <filenames>
+        print the parsed metadata of the given files
+
+    python3 -m sd_parsers scan [options] <files or directories>
+        scan files and directories, writing one JSON record per line (see --help)
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
 import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from . import MetricsAggregator, NDJSONWriter, ParseCache, ParserManager
+from .extractors import Eagerness
+
+DEFAULT_EXTENSIONS = (
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".webp",
+    ".gif",
+    ".mp4",
+    ".mov",
+    ".m4v",
+    ".webm",
+    ".mkv",
+)
+
+FILE_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n"),
+    (0, b"\xff\xd8\xff"),
+    (8, b"WEBP"),
+    (0, b"GIF8"),
+    (4, b"ftyp"),
+    (0, b"\x1a\x45\xdf\xa3"),
+)
+
+
+def _has_known_signature(path: str) -> bool:
+    try:
+        with open(path, "rb") as file:
+            header = file.read(12)
+    except OSError:
+        return False
+    return any(header[offset : offset + len(magic)] == magic for offset, magic in FILE_SIGNATURES)
+
+
+class _Scanner:
+    """Collects the files to parse, remembering their sizes for the summary."""
+
+    def __init__(self, extensions: Optional[Iterable[str]], check_signature: bool, recursive: bool):
+        self.extensions = tuple(extension.lower() for extension in extensions or ())
+        self.check_signature = check_signature
+        self.recursive = recursive
+        self.sizes: Dict[str, int] = {}
+
+    def _accept(self, path: str, size: int) -> bool:
+        if self.extensions and not path.lower().endswith(self.extensions):
+            return False
+        if self.check_signature and not _has_known_signature(path):
+            return False
+        self.sizes[path] = size
+        return True
+
+    def _walk(self, directory: str) -> Iterator[str]:
+        stack = [directory]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    stack.append(entry.path)
+                            elif entry.is_file() and self._accept(entry.path, entry.stat().st_size):
+                                yield entry.path
+                        except OSError:
+                            continue
+            except OSError as error:
+                print(f"error reading directory: {error}", file=sys.stderr)
+
+    def scan(self, paths: Iterable[str]) -> Iterator[str]:
+        for path in paths:
+            if os.path.isdir(path):
+                yield from self._walk(path)
+                continue
+
+            # explicitly named files are not filtered by extension
+            try:
+                self.sizes[path] = os.path.getsize(path)
+            except OSError:
+                self.sizes[path] = 0
+            yield path
+
 
-from . import ParserManager
+def _read_null_delimited(stream) -> Iterator[str]:
+    """Read a NUL-delimited list of filenames (i.e. from `find -print0`)."""
+    remainder = b""
+    for block in iter(lambda: stream.read(1 << 16), b""):
+        *names, remainder = (remainder + block).split(b"\0")
+        for name in names:
+            if name:
+                yield os.fsdecode(name)
+    if remainder:
+        yield os.fsdecode(remainder)
 
 
-def main():
+def _write_summary(
+    stream: TextIO, elapsed: float, files: int, size: int, errors: int, generators: Counter
+):
+    elapsed = max(elapsed, 1e-9)
+    hits = sum(generators.values())
+
+    print(
+        f"{files} files ({size / 1e6:.1f} MB) in {elapsed:.2f}s: "
+        f"{files / elapsed:.1f} files/s, {size / 1e6 / elapsed:.2f} MB/s, "
+        f"{hits} with metadata, {errors} errors",
+        file=stream,
+    )
+    for generator, count in generators.most_common():
+        print(f"  {generator}: {count} ({count / max(files, 1):.1%})", file=stream)
+
+
+def scan(argv: List[str]) -> int:
+    argument_parser = argparse.ArgumentParser(
+        prog="python3 -m sd_parsers scan",
+        description="Parse image files and directories, writing one JSON record per line.",
+    )
+    argument_parser.add_argument("paths", nargs="*", help="files or directories to scan")
+    argument_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="scan directories recursively"
+    )
+    argument_parser.add_argument(
+        "-0",
+        "--null",
+        action="store_true",
+        help="read a NUL-delimited list of files from stdin (i.e. from find -print0)",
+    )
+    argument_parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="number of workers (default: automatic)"
+    )
+    argument_parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        default="process",
+        help="run workers as threads or processes (default: process)",
+    )
+    argument_parser.add_argument(
+        "-e",
+        "--eagerness",
+        choices=[e.name.lower() for e in Eagerness],
+        default=Eagerness.DEFAULT.name.lower(),
+        help="metadata searching effort (default: default)",
+    )
+    argument_parser.add_argument(
+        "--extensions",
+        default=",".join(DEFAULT_EXTENSIONS),
+        help="comma separated file extensions to include when scanning directories "
+        "(empty to include all files, default: %(default)s)",
+    )
+    argument_parser.add_argument(
+        "--magic",
+        action="store_true",
+        help="only include files with a known image or video signature when scanning directories",
+    )
+    argument_parser.add_argument(
+        "--all", action="store_true", help="also write records for files without metadata"
+    )
+    argument_parser.add_argument(
+        "-o", "--output", help="write records to this file instead of stdout"
+    )
+    argument_parser.add_argument(
+        "--no-raw",
+        action="store_true",
+        help="leave out the unprocessed metadata (raw_parameters) of the records",
+    )
+    argument_parser.add_argument(
+        "--binary",
+        choices=["base64", "drop"],
+        default="base64",
+        help="write binary metadata values base64 encoded, or leave them out (default: base64)",
+    )
+    argument_parser.add_argument(
+        "--cache", help="keep parsing results in this SQLite database to speed up rescans"
+    )
+    argument_parser.add_argument(
+        "--cache-hash",
+        action="store_true",
+        help="identify cached files by their content instead of path and modification time",
+    )
+    argument_parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print stage timings and per-generator latency histograms to stderr",
+    )
+    args = argument_parser.parse_args(argv)
+
+    if not args.paths and not args.null:
+        argument_parser.error("no files or directories given")
+
+    scanner = _Scanner(
+        [extension for extension in args.extensions.split(",") if extension],
+        args.magic,
+        args.recursive,
+    )
+
+    def sources() -> Iterator[str]:
+        yield from scanner.scan(args.paths)
+        if args.null:
+            yield from scanner.scan(_read_null_delimited(sys.stdin.buffer))
+
+    metrics = MetricsAggregator() if args.metrics else None
+    parser_manager = ParserManager(
+        eagerness=Eagerness[args.eagerness.upper()],
+        cache=ParseCache(args.cache, content_hash=args.cache_hash) if args.cache else None,
+        instrument=metrics,
+    )
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    writer = NDJSONWriter(output, raw_parameters=not args.no_raw, binary=args.binary)
+
+    files = size = errors = 0
+    generators: Counter = Counter()
+    start = time.perf_counter()
+
+    try:
+        for path, result in parser_manager.parse_many(
+            sources(), workers=args.workers, executor=args.executor, ordered=False
+        ):
+            files += 1
+            size += scanner.sizes.pop(path, 0)
+
+            if isinstance(result, Exception):
+                errors += 1
+                writer.write({"file": path, "error": f"{type(result).__name__}: {result}"})
+            elif result is None:
+                if args.all:
+                    writer.write({"file": path, "prompt_info": None})
+            else:
+                generators[result.generator.value] += 1
+                writer.write({"file": path, "prompt_info": result})
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+        _write_summary(sys.stderr, time.perf_counter() - start, files, size, errors, generators)
+        if metrics:
+            metrics.dump(sys.stderr)
+
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+
+    if argv[:1] == ["scan"]:
+        return scan(argv[1:])
+
     p = ParserManager()
 
-    for filename in sys.argv[1:]:
+    for filename in argv:
         print(f"{filename}: {p.parse(filename)}\n")
 
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Concurrent parsing of multiple images, as used by ParserManager.parse_many()."""
+
+from __future__ import annotations
+
+import os
+import pickle
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+if TYPE_CHECKING:
+    from ._instrumentation import ParseRecord
+    from ._interning import InternPool
+    from ._parser_manager import ParserManager
+    from .data import PromptInfo
+    from .extractors import Eagerness
+
+BatchResult = Tuple[Any, "PromptInfo | None | Exception"]
+"""A source as given to `parse_many()`, along with its parsing result or the error raised."""
+
+EXECUTORS = ("thread", "process")
+
+# ParserManager instance of a worker process
+_worker_manager: Optional[ParserManager] = None
+
+# instrumentation records of a worker process, to be passed on to the main process
+_worker_records: List[ParseRecord] = []
+
+
+def _parse_safely(
+    manager: ParserManager, image: Any, eagerness: Optional[Eagerness]
+) -> PromptInfo | None | Exception:
+    try:
+        # results are interned by the main thread
+        return manager._parse_recorded(image, eagerness)
+    except Exception as error:
+        return error
+
+
+def _init_worker(config: Dict[str, Any], instrumented: bool):
+    """Set up the ParserManager used by a worker process."""
+    global _worker_manager
+    from ._parser_manager import ParserManager
+
+    if instrumented:
+        config = {**config, "instrument": _worker_records.append}
+
+    _worker_manager = ParserManager(**config)
+
+
+def _portable_error(error: Exception) -> Exception:
+    """Return the error if it survives the trip back to the main process, or a RuntimeError."""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def _pack(result: PromptInfo | None | Exception) -> Any:
+    from .data import PromptInfo
+    from .data._packing import pack_prompt_info
+
+    if not isinstance(result, PromptInfo):
+        return result
+    try:
+        return pack_prompt_info(result)
+    except Exception as error:  # i.e. parsing a lazy result
+        return _portable_error(error)
+
+
+def _unpack(result: Any) -> PromptInfo | None | Exception:
+    from .data._packing import unpack_prompt_info
+
+    if not isinstance(result, tuple):
+        return result
+    return unpack_prompt_info(result)
+
+
+def _parse_in_worker(image: Any, eagerness: Optional[Eagerness]) -> Tuple[Any, List[ParseRecord]]:
+    result = _parse_safely(_worker_manager, image, eagerness)  # type: ignore
+
+    if isinstance(result, Exception):
+        result = _portable_error(result)
+    else:
+        result = _pack(result)
+
+    records = _worker_records[:]
+    _worker_records.clear()
+    return result, records
+
+
+def _default_workers(executor: str) -> int:
+    cpu_count = os.cpu_count() or 1
+    return min(32, cpu_count + 4) if executor == "thread" else cpu_count
+
+
+def parse_many(
+    manager: ParserManager,
+    images: Iterable[Any],
+    *,
+    workers: Optional[int],
+    executor: str,
+    ordered: bool,
+    eagerness: Optional[Eagerness],
+    max_pending: Optional[int],
+    intern_pool: Optional[InternPool] = None,
+) -> Iterator[BatchResult]:
+    """See `ParserManager.parse_many()`."""
+    if executor not in EXECUTORS:
+        raise ValueError(f"unknown executor: {executor} (expected one of {', '.join(EXECUTORS)})")
+
+    workers = workers or _default_workers(executor)
+    return _run(
+        manager,
+        images,
+        workers,
+        executor,
+        ordered,
+        eagerness,
+        max_pending or workers * 4,
+        manager.intern_pool if intern_pool is None else intern_pool,
+    )
+
+
+def _run(
+    manager: ParserManager,
+    images: Iterable[Any],
+    workers: int,
+    executor: str,
+    ordered: bool,
+    eagerness: Optional[Eagerness],
+    max_pending: int,
+    intern_pool: Optional[InternPool],
+) -> Iterator[BatchResult]:
+    pool: Executor
+    submit: Callable[[Any], Future]
+    collect: Callable[[Any], PromptInfo | None | Exception]
+
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        def submit(image):
+            return pool.submit(_parse_safely, manager, image, eagerness)
+
+        def collect(result):
+            return _intern(intern_pool, result)
+
+    else:
+        instrument = manager._instrument
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(manager._worker_config, instrument is not None),
+        )
+
+        def submit(image):
+            return pool.submit(_parse_in_worker, image, eagerness)
+
+        def collect(result):
+            result, records = result
+            for record in records:
+                instrument(record)  # type: ignore
+            return _intern(intern_pool, _unpack(result))
+
+    try:
+        if ordered:
+            yield from _iter_ordered(submit, collect, iter(images), max_pending)
+        else:
+            yield from _iter_completed(submit, collect, iter(images), max_pending)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _intern(intern_pool: Optional[InternPool], result: Any) -> Any:
+    if intern_pool is None or isinstance(result, Exception):
+        return result
+    return intern_pool.intern_result(result)
+
+
+def _take(images: Iterator[Any], count: int) -> Iterator[Any]:
+    """Take up to `count` items from the given iterator."""
+    for _ in range(count):
+        try:
+            yield next(images)
+        except StopIteration:
+            return
+
+
+def _iter_ordered(
+    submit: Callable[[Any], Future],
+    collect: Callable[[Any], Any],
+    images: Iterator[Any],
+    max_pending: int,
+) -> Iterator[BatchResult]:
+    pending: Deque[Tuple[Any, Future]] = deque()
+
+    while True:
+        for image in _take(images, max_pending - len(pending)):
+            pending.append((image, submit(image)))
+
+        if not pending:
+            return
+
+        image, future = pending.popleft()
+        yield image, collect(future.result())
+
+
+def _iter_completed(
+    submit: Callable[[Any], Future],
+    collect: Callable[[Any], Any],
+    images: Iterator[Any],
+    max_pending: int,
+) -> Iterator[BatchResult]:
+    pending: Dict[Future, Any] = {}
+
+    while True:
+        for image in _take(images, max_pending - len(pending)):
+            pending[submit(image)] = image
+
+        if not pending:
+            return
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), collect(future.result())
@@ -0,0 +1,197 @@
+"""Provides the ParseCache class."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import pickle
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Optional, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    from .data import PromptInfo
+    from .extractors import Eagerness
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT NOT NULL,
+    eagerness INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version TEXT NOT NULL,
+    result BLOB,
+    PRIMARY KEY (key, eagerness)
+)
+"""
+
+_MISSING = object()
+
+# globals stored results may refer to, besides builtin types
+_ALLOWED_GLOBALS: Set[Tuple[str, str]] = set()
+
+
+class _ResultUnpickler(pickle.Unpickler):
+    """Restores stored results, refusing to load any classes or functions not needed for these."""
+
+    def find_class(self, module, name):
+        if (module, name) not in _ALLOWED_GLOBALS:
+            raise pickle.UnpicklingError(f"unexpected global in cached result: {module}.{name}")
+        return super().find_class(module, name)
+
+
+def _load_result(data: bytes) -> object:
+    """Restore a stored result, returning `_MISSING` if it can't be restored."""
+    from .data._packing import unpack_prompt_info
+
+    try:
+        return unpack_prompt_info(_ResultUnpickler(io.BytesIO(data)).load())
+    except Exception:
+        # corrupted, or written by a different version
+        return _MISSING
+
+
+def _package_version() -> str:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # pragma: no cover
+        return "unknown"
+
+    try:
+        return version("sd-parsers")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class ParseCache:
+    """
+    Persistent cache for parsing results, backed by an SQLite database.
+
+    Entries are keyed by file path, size and modification time; or, with `content_hash` enabled,
+    by a hash of the file contents (surviving renames and copies, but reading every file).
+
+    Along with the result, the eagerness level used and a version string (sd-parsers version and
+    parser configuration) are stored. Entries of a different version are ignored.
+    Negative results (no metadata found) are cached as well.
+
+    Results are stored in a compact form only referring to builtin types. Entries which can't be
+    restored (i.e. corrupted ones, or ones referring to other classes) are treated as missing.
+
+    The database runs in WAL mode and may be shared by multiple processes.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], *, content_hash: bool = False):
+        """
+        Initializes a ParseCache object.
+
+        Parameters:
+            path: location of the database file (created if missing).
+            content_hash: identify files by a hash of their contents instead of path & mtime.
+        """
+        self.path = os.fspath(path)
+        self.content_hash = content_hash
+        self.version = _package_version()
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # connections are not shared between processes
+        return {"path": self.path, "content_hash": self.content_hash, "version": self.version}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections may not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=60)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        """Close the database connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _file_key(self, filename: str) -> Tuple[str, int, int]:
+        stat = os.stat(filename)
+
+        if not self.content_hash:
+            return os.path.abspath(filename), stat.st_size, stat.st_mtime_ns
+
+        digest = hashlib.blake2b(digest_size=32)
+        with open(filename, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return f"blake2b:{digest.hexdigest()}", stat.st_size, stat.st_mtime_ns
+
+    def get(self, filename: str, eagerness: Eagerness, config: str = "") -> object:
+        """
+        Look up the cached result for a file.
+
+        Returns the cached `PromptInfo` or None, or `ParseCache.MISSING` if no usable entry exists.
+
+        A result found at a lower eagerness level is also valid for higher levels (lower levels
+        are always tried first), while "no metadata" found at a higher eagerness level
+        is also valid for lower levels.
+        """
+        key, size, mtime_ns = self._file_key(filename)
+        version = f"{self.version}:{config}"
+
+        rows = self._connection.execute(
+            "SELECT eagerness, size, mtime_ns, version, result FROM results WHERE key = ?",
+            (key,),
+        ).fetchall()
+
+        for row_eagerness, row_size, row_mtime_ns, row_version, result in rows:
+            if row_version != version or row_size != size:
+                continue
+            if not self.content_hash and row_mtime_ns != mtime_ns:
+                continue
+
+            if result is not None and row_eagerness <= eagerness.value:
+                return _load_result(result)
+            if result is None and row_eagerness >= eagerness.value:
+                return None
+
+        return _MISSING
+
+    def set(
+        self,
+        filename: str,
+        eagerness: Eagerness,
+        result: Optional[PromptInfo],
+        config: str = "",
+    ):
+        """Store the result of parsing the given file."""
+        key, size, mtime_ns = self._file_key(filename)
+        version = f"{self.version}:{config}"
+        data = None
+        if result is not None:
+            from .data._packing import pack_prompt_info
+
+            data = pickle.dumps(pack_prompt_info(result), pickle.HIGHEST_PROTOCOL)
+
+        with self._connection as connection:
+            # drop entries for outdated file versions
+            connection.execute(
+                "DELETE FROM results"
+                " WHERE key = ? AND (size != ? OR mtime_ns != ? OR version != ?)",
+                (key, size, mtime_ns, version),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, eagerness.value, size, mtime_ns, version, data),
+            )
+
+    MISSING = _MISSING
+    """Returned by `get()` if there is no usable cache entry."""
@@ -0,0 +1,276 @@
+"""Timing and counters of single parse() calls, as reported by ParserManager(instrument=...)."""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    TypeVar,
+)
+
+from .data import Generators
+
+if TYPE_CHECKING:
+    from .extractors import Eagerness
+
+T = TypeVar("T")
+
+
+def callable_name(function: Callable) -> str:
+    """Name of a function, falling back to its repr() for callables without a name."""
+    return (
+        getattr(function, "__qualname__", None)
+        or getattr(function, "__name__", None)
+        or repr(function)
+    )
+
+
+current_record: ContextVar[Optional[ParseRecord]] = ContextVar("parse_record", default=None)
+"""The record of the parse() call in progress, if instrumentation is enabled."""
+
+
+@dataclass
+class ParseRecord:
+    """
+    Describes a single `ParserManager.parse()` call.
+
+    Stage timings (in seconds) are stored in `stages`:
+     - open: opening and identifying the image
+     - extract: extractor calls
+     - dispatch: finding the parsers to try on extracted metadata
+     - parse: `Parser.parse()` calls (including normalize)
+     - normalize: `Parser.normalize_parameters()` calls
+     - total: the whole parse() call
+    """
+
+    source: Optional[str]
+    """The filename of the parsed image, if known."""
+
+    eagerness: Eagerness
+    """The eagerness level used."""
+
+    image_format: Optional[str] = None
+    generator: Optional[Generators] = None
+    """Generator of the parsing result; None if no metadata was found."""
+
+    extractor: Optional[str] = None
+    """Name of the extractor which provided the parsed metadata."""
+
+    parser: Optional[str] = None
+    """Name of the parser which produced the result."""
+
+    metadata_errors: int = 0
+    """Number of MetadataErrors raised by extractors."""
+
+    parser_errors: int = 0
+    """Number of ParserErrors raised by parsers before finding a result."""
+
+    bytes_read: Optional[int] = None
+    """Number of bytes read from the image file (None when given an already opened image)."""
+
+    cached: bool = False
+    """The result was taken from the ParseCache."""
+
+    error: Optional[str] = None
+    """The exception raised by parse(), if any."""
+
+    stages: Dict[str, float] = field(default_factory=dict)
+    """Wall time spent in each stage."""
+
+    calls: Dict[str, float] = field(default_factory=dict)
+    """Wall time spent in each extractor and parser."""
+
+    def add_time(self, stage: str, seconds: float, name: Optional[str] = None):
+        """Add to the time spent in a stage (and, if given, in the named function)."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        if name is not None:
+            self.calls[name] = self.calls.get(name, 0.0) + seconds
+
+    def timed(self, stage: str, function: Callable[..., T], *args) -> T:
+        """Call a function, adding the time spent to the given stage."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.add_time(stage, time.perf_counter() - start, callable_name(function))
+
+
+def timed_stage(stage: str):
+    """Decorator adding the time spent in the decorated function to the current ParseRecord."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            record = current_record.get()
+            if record is None:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record.add_time(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class CountingReader:
+    """Wraps a binary file object, counting the bytes read from it."""
+
+    def __init__(self, fp: IO[bytes], record: ParseRecord):
+        self._fp = fp
+        self._record = record
+        record.bytes_read = record.bytes_read or 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fp.read(size)
+        self._record.bytes_read += len(data)  # type: ignore
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self._fp.readinto(buffer)  # type: ignore
+        self._record.bytes_read += count or 0  # type: ignore
+        return count
+
+    def readline(self, size: int = -1) -> bytes:
+        data = self._fp.readline(size)
+        self._record.bytes_read += len(data)  # type: ignore
+        return data
+
+    def __getattr__(self, name: str):
+        return getattr(self._fp, name)
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _bucket_label(bound: Optional[float]) -> str:
+    if bound is None:
+        return "+inf"
+    return f"<={bound * 1000:g}ms"
+
+
+class MetricsAggregator:
+    """
+    Collects ParseRecords, keeping counters and a latency histogram per generator.
+
+    Pass an instance as `instrument` to a ParserManager, then use `summary()` or `dump()`.
+    Files without metadata are counted under "none". Thread safe.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initializes a MetricsAggregator object.
+
+        Parameters:
+            buckets: upper bounds of the histogram buckets, in seconds.
+        """
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+
+        self.files = 0
+        self.errors = 0
+        self.cached = 0
+        self.metadata_errors = 0
+        self.parser_errors = 0
+        self.bytes_read = 0
+        self.stages: Counter = Counter()
+        self.extractor_hits: Counter = Counter()
+        self.parser_hits: Counter = Counter()
+        self._histograms: Dict[str, List[int]] = {}
+        self._latencies: Counter = Counter()
+
+    def __call__(self, record: ParseRecord):
+        key = "error" if record.error else record.generator.value if record.generator else "none"
+        total = record.stages.get("total", 0.0)
+
+        with self._lock:
+            self.files += 1
+            self.errors += record.error is not None
+            self.cached += record.cached
+            self.metadata_errors += record.metadata_errors
+            self.parser_errors += record.parser_errors
+            self.bytes_read += record.bytes_read or 0
+            self.stages.update(record.stages)
+
+            if record.extractor:
+                self.extractor_hits[record.extractor] += 1
+            if record.parser:
+                self.parser_hits[record.parser] += 1
+
+            histogram = self._histograms.setdefault(key, [0] * (len(self.buckets) + 1))
+            histogram[bisect.bisect_left(self.buckets, total)] += 1
+            self._latencies[key] += total
+
+    def histogram(self) -> Dict[str, Dict[str, int]]:
+        """Return the number of parse() calls per latency bucket, for each generator."""
+        labels = [_bucket_label(bound) for bound in [*self.buckets, None]]
+        with self._lock:
+            return {
+                key: dict(zip(labels, counts)) for key, counts in sorted(self._histograms.items())
+            }
+
+    def summary(self) -> Dict[str, Any]:
+        """Return all collected figures as a dictionary."""
+        histogram = self.histogram()
+        with self._lock:
+            return {
+                "files": self.files,
+                "errors": self.errors,
+                "cached": self.cached,
+                "metadata_errors": self.metadata_errors,
+                "parser_errors": self.parser_errors,
+                "bytes_read": self.bytes_read,
+                "stages": dict(self.stages),
+                "extractor_hits": dict(self.extractor_hits),
+                "parser_hits": dict(self.parser_hits),
+                "mean_latency": {
+                    key: self._latencies[key] / sum(counts.values())
+                    for key, counts in histogram.items()
+                },
+                "histogram": histogram,
+            }
+
+    def dump(self, stream: TextIO = sys.stdout):
+        """Write a human readable report, including the latency histograms."""
+        summary = self.summary()
+
+        print(
+            f"files: {summary['files']}, errors: {summary['errors']}, cached: {summary['cached']}, "
+            f"bytes read: {summary['bytes_read']}",
+            file=stream,
+        )
+        print(
+            f"rejections: {summary['metadata_errors']} metadata errors, "
+            f"{summary['parser_errors']} parser errors",
+            file=stream,
+        )
+
+        print("time per stage:", file=stream)
+        for stage, seconds in sorted(summary["stages"].items()):
+            print(f"  {stage}: {seconds:.3f}s", file=stream)
+
+        for key, counts in summary["histogram"].items():
+            mean = summary["mean_latency"][key] * 1000
+            print(f"{key} ({sum(counts.values())} files, mean {mean:.2f}ms):", file=stream)
+            width = max(counts.values())
+            for label, count in counts.items():
+                bar = "#" * round(40 * count / width) if width else ""
+                print(f"  {label:>10} {count:8} {bar}", file=stream)
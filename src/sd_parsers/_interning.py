@@ -0,0 +1,109 @@
+"""Sharing of equal Prompt and Model objects between parsing results."""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, TypeVar
+
+from .data import LazyPromptInfo, PromptInfo
+
+T = TypeVar("T")
+
+
+class InternPool:
+    """
+    A size-bounded pool of Prompt and Model objects.
+
+    Equal prompts and models of different results are replaced by a single shared instance,
+    saving memory and letting duplicates be found by identity.
+    The least recently used entries are dropped once `max_size` entries are held. Thread safe.
+    """
+
+    def __init__(self, max_size: Optional[int] = 100_000):
+        """
+        Initializes an InternPool object.
+
+        Parameters:
+            max_size: maximum number of objects to keep (None for no limit).
+        """
+        self.max_size = max_size
+        self._pool: OrderedDict[Any, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def intern(self, value: T) -> T:
+        """Return the pooled object equal to `value`, adding `value` to the pool if not found."""
+        with self._lock:
+            try:
+                pooled = self._pool[value]
+            except KeyError:
+                self.misses += 1
+                self._pool[value] = value
+                if self.max_size is not None and len(self._pool) > self.max_size:
+                    self._pool.popitem(last=False)
+                    self.evictions += 1
+                return value
+
+            self.hits += 1
+            self._pool.move_to_end(value)
+            return pooled
+
+    def intern_result(self, prompt_info: Optional[PromptInfo]) -> Optional[PromptInfo]:
+        """
+        Replace the prompts and models of a parsing result with pooled objects (in place).
+
+        LazyPromptInfo results are interned when they get parsed.
+        """
+        if prompt_info is None:
+            return None
+
+        if isinstance(prompt_info, LazyPromptInfo) and not prompt_info.materialized:
+            prompt_info._parse = _interning(self, prompt_info._parse)
+            return prompt_info
+
+        samplers = prompt_info.samplers
+        for index, sampler in enumerate(samplers):
+            sampler.prompts[:] = map(self.intern, sampler.prompts)
+            sampler.negative_prompts[:] = map(self.intern, sampler.negative_prompts)
+
+            if sampler.model is not None:
+                model = self.intern(sampler.model)
+                if model is not sampler.model:
+                    samplers[index] = dataclasses.replace(sampler, model=model)
+
+        return prompt_info
+
+    def statistics(self) -> Dict[str, Any]:
+        """Return the number of pooled objects, hits, misses, evictions and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._pool),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Remove all pooled objects and reset the counters."""
+        with self._lock:
+            self._pool.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+def _interning(pool: InternPool, parse):
+    @functools.wraps(parse)
+    def wrapper(parameters):
+        return pool.intern_result(parse(parameters))
+
+    return wrapper
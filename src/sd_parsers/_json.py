@@ -0,0 +1,141 @@
+"""JSON decoding used by parsers and extractors, preferring a fast backend if installed."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JSONDecodeError = json.JSONDecodeError
+
+ENVIRONMENT_VARIABLE = "SD_PARSERS_JSON"
+"""Environment variable selecting the default backend ("auto", "orjson", "ujson" or "json")."""
+
+BACKENDS = ("orjson", "ujson", "json")
+"""Available backends."""
+
+AUTO_BACKENDS = ("orjson", "json")
+"""Backends tried by "auto", in order of preference.
+
+ujson is left out, as it accepts some malformed documents (i.e. numbers with leading zeros).
+"""
+
+# maps digits to "0", anything else to " "
+_DIGITS = bytes(0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256))
+
+
+def _orjson_loads() -> Callable[[Any], Any]:
+    import orjson
+
+    def loads(value: Any) -> Any:
+        # orjson decodes integers beyond 64 bit (i.e. below -2**63, 19 digits) as floats
+        data = value.encode("utf-8", "surrogatepass") if isinstance(value, str) else value
+        if b"0" * 19 in data.translate(_DIGITS):
+            raise ValueError("integer might exceed 64 bit")
+        return orjson.loads(data)
+
+    return loads
+
+
+def _import_loads(name: str) -> Callable[[Any], Any]:
+    if name == "orjson":
+        return _orjson_loads()
+    if name == "ujson":
+        import ujson
+
+        return ujson.loads
+    if name == "json":
+        return json.loads
+    raise ValueError(f"unknown JSON backend: {name!r} (expected 'auto' or one of {BACKENDS})")
+
+
+_loaded: Dict[str, Tuple[str, Callable[[Any], Any]]] = {}
+
+
+def get_backend(name: str = "auto") -> Tuple[str, Callable[[Any], Any]]:
+    """
+    Return the name and loads() function of a JSON backend.
+
+    "auto" selects the first installed backend of `AUTO_BACKENDS`.
+    Raises ImportError if the requested backend is not installed.
+    """
+    if name not in _loaded:
+        if name == "auto":
+            for backend in AUTO_BACKENDS:
+                try:
+                    _loaded[name] = get_backend(backend)
+                    break
+                except ImportError:
+                    pass
+        else:
+            _loaded[name] = (name, _import_loads(name))
+
+    return _loaded[name]
+
+
+def _default_backend() -> Tuple[str, Callable[[Any], Any]]:
+    name = os.environ.get(ENVIRONMENT_VARIABLE, "auto").strip().lower() or "auto"
+    try:
+        return get_backend(name)
+    except (ImportError, ValueError) as error:
+        logger.warning("%s=%s ignored: %s", ENVIRONMENT_VARIABLE, name, error)
+        return get_backend("auto")
+
+
+# the default backend is imported on first use, not when importing sd_parsers
+_default: Optional[Tuple[str, Callable[[Any], Any]]] = None
+_current: ContextVar[Optional[Tuple[str, Callable[[Any], Any]]]] = ContextVar(
+    "json_backend", default=None
+)
+
+
+def _backend() -> Tuple[str, Callable[[Any], Any]]:
+    global _default
+
+    backend = _current.get()
+    if backend is None:
+        if _default is None:
+            _default = _default_backend()
+        backend = _default
+    return backend
+
+
+def backend_name() -> str:
+    """Return the name of the backend in use."""
+    return _backend()[0]
+
+
+@contextmanager
+def use_backend(name: Optional[str]):
+    """Use the given backend in the current context (None keeps the current one)."""
+    if name is None:
+        yield
+        return
+
+    token = _current.set(get_backend(name))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def loads(value: Any) -> Any:
+    """
+    Decode a JSON document (str or bytes), like `json.loads()`.
+
+    Inputs rejected by a third-party backend are decoded again with the standard library,
+    which then either accepts them (i.e. NaN, large integers, UTF-16 bytes)
+    or raises the same exception `json.loads()` would.
+    """
+    name, backend_loads = _backend()
+    if name != "json":
+        try:
+            return backend_loads(value)
+        except Exception:
+            pass
+    return json.loads(value)
@@ -2,32 +2,188 @@
 
 from __future__ import annotations
 
+import importlib
+import io
 import logging
+import os
+import time
 from contextlib import contextmanager
-from typing import TYPE_CHECKING, List, Optional, Type, Union
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
-from PIL import Image
-
-from .data import PromptInfo
+from . import _json
 from .exceptions import MetadataError, ParserError
-from .parsers import Parser, MANAGED_PARSERS
-from .extractors import METADATA_EXTRACTORS, Eagerness
+from .extractors import METADATA_EXTRACTORS, Eagerness, ExtractionContext
 
 if TYPE_CHECKING:
     from pathlib import Path
 
     from _typeshed import SupportsRead
+    from PIL import Image
+
+    from ._batch import BatchResult
+    from ._cache import ParseCache
+    from ._instrumentation import ParseRecord
+    from ._interning import InternPool
+    from .data import Generators, PromptInfo
+    from .extractors import VideoFile
+    from .parsers import Parser
 
 logger = logging.getLogger(__name__)
 
 
 @contextmanager
-def _get_image(image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image]):
+def _counting_reader(image: Union[str, bytes, Path, SupportsRead[bytes]], record: ParseRecord):
+    from ._instrumentation import CountingReader
+
+    if isinstance(image, (str, bytes, os.PathLike)):
+        with open(image, "rb") as fp:
+            yield CountingReader(fp, record)
+    elif isinstance(image, io.TextIOBase):
+        yield image  # rejected by Image.open()
+    else:
+        yield CountingReader(image, record)  # type: ignore
+
+
+PILLOW_PLUGINS = {
+    "PNG": "PngImagePlugin",
+    "JPEG": "JpegImagePlugin",
+    "WEBP": "WebPImagePlugin",
+    "GIF": "GifImagePlugin",
+}
+"""Pillow plugin modules of the image formats in `METADATA_EXTRACTORS`."""
+
+
+def _open_image(
+    fp: Union[str, bytes, Path, SupportsRead[bytes]],
+) -> Union[Image.Image, VideoFile]:
+    """
+    Open an image, trying the formats of `METADATA_EXTRACTORS` first.
+
+    Only the Pillow plugins of these formats are imported, instead of every plugin Pillow has.
+    Files Pillow can't identify are opened as `VideoFile` if they are videos,
+    images of other formats fall back to a regular `Image.open()`.
+
+    WEBP images are tried last: Pillow reads them as a whole when opening them,
+    animated WEBP images are opened as `VideoFile` instead, reading only their chunk headers.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    formats = []
+    for image_format in METADATA_EXTRACTORS:
+        if image_format not in Image.OPEN:
+            if image_format not in PILLOW_PLUGINS:
+                continue
+            importlib.import_module(f"PIL.{PILLOW_PLUGINS[image_format]}")
+        formats.append(image_format)
+
+    if not isinstance(fp, (str, bytes, os.PathLike)):
+        try:
+            fp.seek(0)  # type: ignore
+        except (AttributeError, io.UnsupportedOperation):
+            # read streams only once, as Image.open() would
+            fp = io.BytesIO(fp.read())
+
+    try:
+        return Image.open(fp, formats=[f for f in formats if f != "WEBP"])
+    except UnidentifiedImageError:
+        pass
+
+    from .extractors._video import open_video
+
+    video = open_video(fp)  # type: ignore
+    if video is not None:
+        return video
+
+    if "WEBP" in formats:
+        try:
+            return Image.open(fp, formats=["WEBP"])
+        except UnidentifiedImageError:
+            pass
+    return Image.open(fp)
+
+
+@contextmanager
+def _get_image(
+    image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image],
+    record: Optional[ParseRecord] = None,
+):
+    from PIL import Image
+
     if isinstance(image, Image.Image):
         yield image
-    else:
-        with Image.open(image) as _image:
+    elif record is None:
+        with _open_image(image) as _image:
             yield _image
+    else:
+        with _counting_reader(image, record) as fp:
+            start = time.perf_counter()
+            with _open_image(fp) as _image:
+                record.add_time("open", time.perf_counter() - start)
+                yield _image
+
+
+def _parse_candidates(
+    candidates: List[Tuple[Parser, Dict[str, Any]]],
+    json_backend: str,
+    debug: bool,
+    _parameters: Dict[str, Any],
+) -> PromptInfo:
+    """Parse the metadata of a LazyPromptInfo, trying the candidate parsers in order."""
+    error = None
+
+    with _json.use_backend(json_backend):
+        for parser, parameters in candidates:
+            try:
+                return parser.parse(parameters)
+            except ParserError as parser_error:
+                error = parser_error
+                if debug:
+                    logger.error("error in parser[%s]: %s", type(parser), error)
+
+    raise error  # type: ignore[misc]
+
+
+class Detection(NamedTuple):
+    """Result of `ParserManager.detect()`."""
+
+    generator: Generators
+    """Image generator which might have produced the image."""
+
+    extractor: str
+    """Name of the extractor which read the metadata, i.e. "png_image_info"."""
+
+    parser: str
+    """Name of the parser class accepting the metadata."""
+
+
+class _Dispatch(NamedTuple):
+    parsers: List[Parser]
+
+    indexed: List[Parser]
+    """Copy of `parsers` as indexed, to notice changes made to the list in place."""
+
+    index: Dict[str, List[Parser]]
+    """Metadata key -> parsers triggered by it."""
+
+    untriggered: List[Parser]
+    """Parsers without trigger keys, tried on any metadata."""
+
+    cache_config: str
 
 
 class ParserManager:
@@ -42,6 +198,12 @@ class ParserManager:
         eagerness: Eagerness = Eagerness.DEFAULT,
         managed_parsers: Optional[List[Type[Parser]]] = None,
         normalize_parameters: bool = True,
+        cache: Optional[ParseCache] = None,
+        instrument: Optional[Callable[[ParseRecord], Any]] = None,
+        json_backend: Optional[str] = None,
+        lazy: bool = False,
+        intern_pool: Optional[InternPool] = None,
+        comfyui_links_from_prompt: bool = False,
     ):
         """
         Initializes a ParserManager object.
@@ -54,14 +216,138 @@ class ParserManager:
              - FAST: cut some corners to save some time
              - DEFAULT: try to ensure all metadata is read (default)
              - EAGER: include additional methods to try and retrieve metadata (computationally expensive!)
+            cache: A ParseCache to store the results of parsing image files in.
+            instrument: A callback receiving a ParseRecord (timings and counters)
+                after every parse() call, i.e. a MetricsAggregator.
+            json_backend: JSON library used to decode metadata: "orjson", "ujson", "json" or
+                "auto" (the fastest one installed). Defaults to the SD_PARSERS_JSON
+                environment variable, or "auto".
+            lazy: Only detect the generator, returning a LazyPromptInfo which parses the
+                metadata on first access of its samplers, prompts, models or metadata.
+                Results stored to the cache or returned by worker processes are parsed right away.
+            intern_pool: An InternPool to share equal prompts and models between results.
+            comfyui_links_from_prompt: Let ComfyUI parsers build the node links from the prompt,
+                without decoding the workflow (prompts might be listed in a different order).
         """
         self._eagerness = eagerness
         self._debug = debug
+        self._cache = cache
+        self._instrument = instrument
+
+        # fail early if the backend is not available
+        if json_backend is not None:
+            _json.get_backend(json_backend)
+        self._json_backend = json_backend
+        self._lazy = lazy
+        self.intern_pool = intern_pool
+
+        # parser modules are imported on first use, see _get_dispatch()
+        self._parser_types = managed_parsers
+        self._normalize_parameters = normalize_parameters
+        self._comfyui_links_from_prompt = comfyui_links_from_prompt
+        self._dispatch: Optional[_Dispatch] = None
+
+        # settings to set up equivalent ParserManager instances in worker processes
+        self._settings = {
+            "debug": debug,
+            "eagerness": eagerness,
+            "normalize_parameters": normalize_parameters,
+            "cache": cache,
+            "json_backend": json_backend,
+            "lazy": lazy,
+            "comfyui_links_from_prompt": comfyui_links_from_prompt,
+        }
+
+    @property
+    def managed_parsers(self) -> List[Parser]:
+        """
+        The managed parser instances.
+
+        The list can be changed in place, or replaced by assigning a list of parser instances.
+        Worker processes of `parse_many(executor="process")` create parsers of the same types,
+        using the settings of the ParserManager.
+        """
+        return self._get_dispatch().parsers
+
+    @managed_parsers.setter
+    def managed_parsers(self, parsers: List[Parser]):
+        self._dispatch = self._setup_parsers(list(parsers))
+
+    @property
+    def _worker_config(self) -> Dict[str, Any]:
+        # the parser types in use: worker processes don't see changes to MANAGED_PARSERS
+        parser_types = [type(parser) for parser in self.managed_parsers]
+        return {**self._settings, "managed_parsers": parser_types}
+
+    @property
+    def _cache_config(self) -> str:
+        return self._get_dispatch().cache_config
+
+    def _get_dispatch(self) -> _Dispatch:
+        dispatch = self._dispatch
+        if dispatch is None:
+            # concurrent first calls might each set up parsers, any of them can be used
+            dispatch = self._dispatch = self._setup_parsers()
+        elif dispatch.parsers != dispatch.indexed:
+            # managed_parsers has been changed in place (i.e. by append())
+            dispatch = self._dispatch = self._setup_parsers(dispatch.parsers)
+        return dispatch
+
+    def _setup_parsers(self, parsers: Optional[List[Parser]] = None) -> _Dispatch:
+        """Index the given parsers, creating the managed parsers if none were given."""
+        if parsers is None:
+            parsers = self._create_parsers()
 
-        self.managed_parsers: List[Parser] = [
-            parser(normalize_parameters=normalize_parameters, debug=debug)
-            for parser in managed_parsers or MANAGED_PARSERS
-        ]
+        options = [f"normalize={self._normalize_parameters}"]
+        if any(getattr(parser, "links_from_prompt", False) for parser in parsers):
+            options.append("comfyui_links_from_prompt=True")
+
+        dispatch = _Dispatch(
+            parsers=parsers,
+            indexed=list(parsers),
+            index={},
+            untriggered=[],
+            # cached results are only valid for the same parser setup
+            cache_config=",".join(
+                [f"{type(parser).__module__}.{type(parser).__qualname__}" for parser in parsers]
+                + options
+            ),
+        )
+
+        for parser in dispatch.parsers:
+            if not parser.trigger_keys:
+                dispatch.untriggered.append(parser)
+
+            for key in set().union(*parser.trigger_keys):
+                dispatch.index.setdefault(key, []).append(parser)
+
+        return dispatch
+
+    def _create_parsers(self) -> List[Parser]:
+        """Create the managed parsers, importing the default ones if none were given."""
+        parser_types = self._parser_types
+        if not parser_types:
+            from .parsers import MANAGED_PARSERS
+
+            parser_types = MANAGED_PARSERS
+
+        comfyui_types: Tuple[type, ...] = ()
+        if self._comfyui_links_from_prompt:
+            from .parsers import ComfyUIParser
+
+            comfyui_types = (ComfyUIParser,)
+
+        parsers = []
+        for parser_type in parser_types:
+            kwargs: Dict[str, Any] = {}
+            if issubclass(parser_type, comfyui_types):
+                kwargs["links_from_prompt"] = True
+            parsers.append(
+                parser_type(
+                    normalize_parameters=self._normalize_parameters, debug=self._debug, **kwargs
+                )
+            )
+        return parsers
 
     def parse(
         self,
@@ -83,51 +369,282 @@ class ParserManager:
         - FileNotFoundError: If the file cannot be found.
         - PIL.UnidentifiedImageError: If the image cannot be opened and identified.
         - ValueError: If a StringIO instance is used for `image`.
+
+        Filenames and file objects of MP4/MOV and Matroska/WebM videos are accepted as well,
+        their metadata tags are read without decoding the video.
+        Animated WEBP, PNG and GIF images are read without decoding (or seeking to) their frames.
+
+        If the ParserManager has a cache, results for filenames and pathlib.Path objects
+        are looked up in and stored to it.
         """
+        result = self._parse_recorded(image, eagerness)
 
+        if self.intern_pool is not None:
+            return self.intern_pool.intern_result(result)
+        return result
+
+    def _parse_recorded(
+        self,
+        image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image],
+        eagerness: Optional[Eagerness] = None,
+    ) -> Optional[PromptInfo]:
         # use specific eagerness when given, otherwise use ParserManager's default
         eagerness = eagerness or self._eagerness
 
-        def get_extractors(image: Image.Image):
-            if image.format is None:
-                if self._debug:
-                    logger.debug("unknown image format")
-                return
+        if self._instrument is None:
+            return self._parse_cached(image, eagerness)
+
+        from ._instrumentation import ParseRecord, current_record
+
+        source = os.fsdecode(image) if isinstance(image, (str, bytes, os.PathLike)) else None
+        record = ParseRecord(source, eagerness)
+        token = current_record.set(record)
+        start = time.perf_counter()
+
+        try:
+            result = self._parse_cached(image, eagerness, record)
+            if result is not None:
+                record.generator = result.generator
+            return result
+        except Exception as error:
+            record.error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            record.stages["total"] = time.perf_counter() - start
+            current_record.reset(token)
+            self._instrument(record)
+
+    def detect(
+        self,
+        image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image],
+        eagerness: Optional[Eagerness] = None,
+    ) -> Optional[Detection]:
+        """
+        Find out which generator might have produced the given image, without parsing its metadata.
+
+        Only the cheap checks of `Parser.accepts()` are run on the extracted metadata,
+        so the result might differ from `parse()` for images with invalid metadata.
+
+        Parameters:
+            image: a PIL Image, filename, pathlib.Path object or a file object.
+            eagerness: metadata searching effort (overrides ParserManager default)
+
+        Raises the same exceptions as `parse()` when opening the image.
+        """
+        from ._instrumentation import callable_name
+
+        eagerness = eagerness or self._eagerness
+        json_backend = _json.use_backend(self._json_backend)
+
+        with json_backend, _get_image(image) as image, ExtractionContext(image):
+            for get_metadata, parser, _ in self._candidates(image, eagerness):
+                return Detection(
+                    parser.generator, callable_name(get_metadata), type(parser).__name__
+                )
+
+        return None
+
+    def _parse_cached(
+        self,
+        image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image],
+        eagerness: Eagerness,
+        record: Optional[ParseRecord] = None,
+    ) -> Optional[PromptInfo]:
+        if self._cache is None or not isinstance(image, (str, os.PathLike)):
+            return self._parse(image, eagerness, record)
+
+        result = self._cache.get(image, eagerness, self._cache_config)
+        if result is not self._cache.MISSING:
+            if record is not None:
+                record.cached = True
+            return result  # type: ignore
+
+        result = self._parse(image, eagerness, record)
+        self._cache.set(image, eagerness, result, self._cache_config)
+        return result
+
+    def _parse(
+        self,
+        image: Union[str, bytes, Path, SupportsRead[bytes], Image.Image],
+        eagerness: Eagerness,
+        record: Optional[ParseRecord] = None,
+    ) -> Optional[PromptInfo]:
+        json_backend = _json.use_backend(self._json_backend)
+
+        with json_backend, _get_image(image, record) as image, ExtractionContext(image):
+            if record is not None:
+                record.image_format = image.format
+
+            if self._lazy:
+                return self._parse_lazy(image, eagerness, record)
+
+            for get_metadata, parser, parameters in self._candidates(image, eagerness, record):
+                try:
+                    if record is None:
+                        return parser.parse(parameters)
 
+                    from ._instrumentation import callable_name
+
+                    prompt_info = record.timed("parse", parser.parse, parameters)
+                    record.extractor = callable_name(get_metadata)
+                    record.parser = type(parser).__name__
+                    return prompt_info
+                except ParserError as error:
+                    if record is not None:
+                        record.parser_errors += 1
+                    if self._debug:
+                        logger.error("error in parser[%s]: %s", type(parser), error)
+
+        return None
+
+    def _parse_lazy(
+        self, image: Image.Image, eagerness: Eagerness, record: Optional[ParseRecord] = None
+    ) -> Optional[PromptInfo]:
+        """Return a LazyPromptInfo for the first extractor with metadata accepted by a parser."""
+        from .data import LazyPromptInfo
+
+        dispatch = self._get_dispatch()
+
+        for get_metadata in self._extractors(image, eagerness):
+            # parsers to fall back to, if the first one fails
+            candidates = list(self._extracted_candidates(dispatch, image, get_metadata, record))
+            if not candidates:
+                continue
+
+            parser, parameters = candidates[0]
+            if record is not None:
+                from ._instrumentation import callable_name
+
+                record.extractor = callable_name(get_metadata)
+                record.parser = type(parser).__name__
+
+            # parsed later on, outside of the JSON backend context
+            parse = partial(_parse_candidates, candidates, _json.backend_name(), self._debug)
+            return LazyPromptInfo(parser.generator, parameters, parse)
+
+        return None
+
+    def _extractors(self, image: Image.Image, eagerness: Eagerness) -> Iterator[Callable]:
+        """Yield the extractors to use on the given image, up to the given eagerness level."""
+        if image.format is None:
+            if self._debug:
+                logger.debug("unknown image format")
+            return
+
+        try:
+            extractors = METADATA_EXTRACTORS[image.format]
+        except KeyError:
+            if self._debug:
+                logger.debug("unsupported image format: %s", image.format)
+            return
+
+        for e in Eagerness:
+            if e.value > eagerness.value:
+                break
+
+            if e not in extractors:
+                continue
+
+            yield from extractors[e]
+
+    def _candidates(
+        self, image: Image.Image, eagerness: Eagerness, record: Optional[ParseRecord] = None
+    ) -> Iterator[Tuple[Callable, Parser, Dict[str, Any]]]:
+        """Yield (extractor, parser, metadata) for each parser accepting the extracted metadata."""
+        dispatch = self._get_dispatch()
+
+        for get_metadata in self._extractors(image, eagerness):
+            for parser, parameters in self._extracted_candidates(
+                dispatch, image, get_metadata, record
+            ):
+                yield get_metadata, parser, parameters
+
+    def _extracted_candidates(
+        self,
+        dispatch: _Dispatch,
+        image: Image.Image,
+        get_metadata: Callable,
+        record: Optional[ParseRecord] = None,
+    ) -> Iterator[Tuple[Parser, Dict[str, Any]]]:
+        """Yield (parser, metadata) for each parser accepting the metadata of one extractor."""
+        routed_parameters, candidates = None, set()
+
+        for parser in dispatch.parsers:
             try:
-                extractors = METADATA_EXTRACTORS[image.format]
-            except KeyError:
+                if record is None:
+                    parameters = get_metadata(image, parser.generator)
+                else:
+                    parameters = record.timed("extract", get_metadata, image, parser.generator)
+            except MetadataError:
+                if record is not None:
+                    record.metadata_errors += 1
                 if self._debug:
-                    logger.debug("unsupported image format: %s", image.format)
+                    logger.exception("error reading metadata")
                 return
 
-            for e in Eagerness:
-                if e.value > eagerness.value:
-                    break
+            if parameters is None:
+                continue
 
-                if e not in extractors:
-                    continue
+            # extractors usually return the same metadata for every parser
+            if parameters is not routed_parameters:
+                if record is None:
+                    candidates = self._route(dispatch, parameters)
+                else:
+                    candidates = record.timed("dispatch", self._route, dispatch, parameters)
+                routed_parameters = parameters
 
-                for get_metadata in extractors[e]:
-                    yield get_metadata
+            if parser in candidates:
+                yield parser, parameters
 
-        with _get_image(image) as image:
-            for get_metadata in get_extractors(image):
-                for parser in self.managed_parsers:
-                    try:
-                        parameters = get_metadata(image, parser.generator)
-                    except MetadataError:
-                        if self._debug:
-                            logger.exception("error reading metadata")
-                        break
+    def _route(self, dispatch: _Dispatch, parameters: Dict[str, Any]) -> Set[Parser]:
+        """Find the parsers that might be able to parse the given metadata."""
+        candidates = set(dispatch.untriggered)
 
-                    if parameters is None:
-                        continue
+        for key, parsers in dispatch.index.items():
+            if key in parameters:
+                candidates.update(parsers)
 
-                    try:
-                        return parser.parse(parameters)
-                    except ParserError as error:
-                        if self._debug:
-                            logger.error("error in parser[%s]: %s", type(parser), error)
+        return {parser for parser in candidates if parser.accepts(parameters)}
 
-        return None
+    def parse_many(
+        self,
+        images: Iterable[Union[str, bytes, Path, SupportsRead[bytes], Image.Image]],
+        *,
+        workers: Optional[int] = None,
+        executor: str = "thread",
+        ordered: bool = True,
+        eagerness: Optional[Eagerness] = None,
+        max_pending: Optional[int] = None,
+        intern_pool: Optional[InternPool] = None,
+    ) -> Iterator[BatchResult]:
+        """
+        Parse multiple images concurrently.
+
+        Returns a lazy iterator of `(image, result)` tuples, where `result` is either the
+        `PromptInfo` returned by `parse()`, None, or the exception raised while parsing the image.
+
+        Parameters:
+            images: an iterable of sources as accepted by `parse()`.
+            workers: number of worker threads/processes (default depends on the executor).
+            executor: "thread" (suited for I/O bound workloads, i.e. network storage)
+                or "process" (for CPU bound workloads; images need to be picklable, i.e. filenames).
+                Each worker process sets up its own ParserManager using this manager's settings.
+            ordered: return results in input order (True) or in order of completion (False).
+            eagerness: metadata searching effort (overrides ParserManager default)
+            max_pending: maximum number of images in flight at any time (default: 4 x workers).
+                The `images` iterable is consumed only as far as needed to keep this many
+                images pending, keeping memory usage flat for arbitrarily large inputs.
+            intern_pool: an InternPool used for this batch only (overrides ParserManager's pool).
+        """
+        from . import _batch
+
+        return _batch.parse_many(
+            self,
+            images,
+            workers=workers,
+            executor=executor,
+            ordered=ordered,
+            eagerness=eagerness,
+            max_pending=max_pending,
+            intern_pool=intern_pool,
+        )
@@ -0,0 +1,113 @@
+"""Writing parsing results as newline delimited JSON (NDJSON)."""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Optional, TextIO, Tuple
+
+from .data import Model, Prompt, PromptInfo, Sampler
+
+BINARY_MODES = ("base64", "drop")
+
+_BINARY_TYPES = (bytes, bytearray, memoryview)
+
+# field names of data classes, in output order
+_FIELDS: Dict[type, Tuple[str, ...]] = {
+    cls: tuple(field.name for field in fields(cls)) for cls in (Sampler, Prompt, Model)
+}
+
+
+def _field_names(value: Any) -> Optional[Tuple[str, ...]]:
+    try:
+        return _FIELDS[type(value)]
+    except KeyError:
+        if not is_dataclass(value) or isinstance(value, type):
+            return None
+        names = _FIELDS[type(value)] = tuple(field.name for field in fields(value))
+        return names
+
+
+class NDJSONWriter:
+    """
+    Writes records containing PromptInfo objects to a text stream, one JSON document per line.
+
+    PromptInfo objects are written in the same form as `PromptInfo.to_json()`, but without
+    copying them first: the data classes are converted one at a time while encoding.
+    """
+
+    def __init__(
+        self,
+        stream: TextIO,
+        *,
+        raw_parameters: bool = True,
+        binary: str = "base64",
+        **kwargs,
+    ):
+        """
+        Initializes a NDJSONWriter object.
+
+        Parameters:
+            stream: the text stream to write to.
+            raw_parameters: include the `raw_parameters` of PromptInfo objects.
+            binary: how to write binary values (i.e. "icc_profile" or "exif" image info):
+             - base64: as base64 encoded string
+             - drop: leave out raw parameters with binary values, write other binary values as null
+            kwargs: passed on to `json.JSONEncoder` (i.e. ensure_ascii=False).
+        """
+        if binary not in BINARY_MODES:
+            raise ValueError(
+                f"unknown binary mode: {binary} (expected one of {', '.join(BINARY_MODES)})"
+            )
+
+        self.stream = stream
+        self.raw_parameters = raw_parameters
+        self.binary = binary
+        self._encode: Callable[[Any], str] = json.JSONEncoder(
+            default=self._default, **kwargs
+        ).encode
+
+    def write(self, record: Any):
+        """Write a single record: a PromptInfo, or i.e. a dictionary containing one."""
+        self.stream.write(self._encode(record))
+        self.stream.write("\n")
+
+    def _default(self, value: Any) -> Any:
+        if isinstance(value, PromptInfo):
+            return self._prompt_info(value)
+
+        names = _field_names(value)
+        if names is not None:
+            return {name: getattr(value, name) for name in names}
+
+        if isinstance(value, _BINARY_TYPES):
+            if self.binary == "drop":
+                return None
+            return base64.b64encode(value).decode("ascii")
+
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+
+        return str(value)
+
+    def _prompt_info(self, prompt_info: PromptInfo) -> Dict[str, Any]:
+        record = {
+            "full_prompt": prompt_info.full_prompt,
+            "full_negative_prompt": prompt_info.full_negative_prompt,
+            "generator": prompt_info.generator,
+            "samplers": prompt_info.samplers,
+            "metadata": prompt_info.metadata,
+        }
+
+        if self.raw_parameters:
+            raw_parameters = prompt_info.raw_parameters
+            if self.binary == "drop":
+                raw_parameters = {
+                    key: value
+                    for key, value in raw_parameters.items()
+                    if not isinstance(value, _BINARY_TYPES)
+                }
+            record["raw_parameters"] = raw_parameters
+
+        return record
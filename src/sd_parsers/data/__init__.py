@@ -1,7 +1,7 @@
 from .generators import Generators
 from .model import Model
-from .prompt_info import PromptInfo
+from .prompt_info import LazyPromptInfo, PromptInfo
 from .prompt import Prompt
 from .sampler import Sampler
 
-__all__ = ["Generators", "Model", "PromptInfo", "Prompt", "Sampler"]
+__all__ = ["Generators", "Model", "PromptInfo", "LazyPromptInfo", "Prompt", "Sampler"]
@@ -0,0 +1,112 @@
+"""A compact form of PromptInfo objects, for sending or storing them (i.e. with pickle)."""
+
+from dataclasses import fields
+from typing import Any, Dict, Tuple
+
+from .generators import Generators
+from .model import Model
+from .prompt import Prompt
+from .prompt_info import PromptInfo
+from .sampler import Sampler
+
+PackedPromptInfo = Tuple[Any, ...]
+
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _plain(value: Any) -> Any:
+    """
+    Convert a value to builtin types only.
+
+    Metadata read by Pillow can hold subclasses of builtin types (i.e. PngImagePlugin.iTXt),
+    which pickle would store as references to their classes.
+    """
+    if type(value) in _PLAIN_TYPES:
+        return value
+    if isinstance(value, dict):
+        return {_plain(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    return str(value)
+
+
+def pack_prompt_info(prompt_info: PromptInfo) -> PackedPromptInfo:
+    """
+    Convert a PromptInfo into nested tuples of its field values.
+
+    Leaves out the class references and attribute names pickle would store for every object.
+    Prompts and models used by multiple samplers are packed once, and all values are converted
+    to builtin types, so they can be restored without importing any other classes.
+    """
+    packed: Dict[int, Tuple[Any, ...]] = {}
+
+    def pack(value):
+        if value is None:
+            return None
+        try:
+            return packed[id(value)]
+        except KeyError:
+            values = packed[id(value)] = tuple(
+                _plain(getattr(value, field.name)) for field in fields(value)
+            )
+            return values
+
+    samplers = [
+        (
+            _plain(sampler.name),
+            _plain(sampler.parameters),
+            _plain(sampler.sampler_id),
+            pack(sampler.model),
+            [pack(prompt) for prompt in sampler.prompts],
+            [pack(prompt) for prompt in sampler.negative_prompts],
+        )
+        for sampler in prompt_info.samplers
+    ]
+    return (
+        prompt_info.generator.value,
+        samplers,
+        _plain(prompt_info.metadata),
+        _plain(prompt_info.raw_parameters),
+    )
+
+
+def unpack_prompt_info(packed: PackedPromptInfo) -> PromptInfo:
+    """Restore a PromptInfo converted by `pack_prompt_info()`."""
+    unpacked: Dict[int, Any] = {}
+
+    def unpack(cls, values):
+        if values is None:
+            return None
+        try:
+            return unpacked[id(values)]
+        except KeyError:
+            value = unpacked[id(values)] = cls(*values)
+            return value
+
+    generator, samplers, metadata, raw_parameters = packed
+    return PromptInfo(
+        Generators(generator),
+        [
+            Sampler(
+                name,
+                parameters,
+                sampler_id,
+                unpack(Model, model),
+                [unpack(Prompt, prompt) for prompt in prompts],
+                [unpack(Prompt, prompt) for prompt in negative_prompts],
+            )
+            for name, parameters, sampler_id, model, prompts, negative_prompts in samplers
+        ],
+        metadata,
+        raw_parameters,
+    )
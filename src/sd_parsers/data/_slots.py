@@ -0,0 +1,65 @@
+"""Helpers keeping the data classes small in memory."""
+
+from dataclasses import fields
+from typing import Any, Dict, TypeVar
+
+T = TypeVar("T", bound=type)
+
+
+def add_slots(cls: T) -> T:
+    """
+    Recreate a dataclass using `__slots__` instead of a per-instance `__dict__`.
+
+    Equivalent to `@dataclass(slots=True)`, which needs Python 3.10.
+    Additional slots can be declared with a `__slots__` class attribute.
+    Instances of frozen dataclasses stay picklable.
+    """
+    cls_dict = dict(cls.__dict__)
+    extra_slots = tuple(cls_dict.pop("__slots__", ()))
+    field_names = tuple(field.name for field in fields(cls))
+
+    # only add slots for fields not defined by base classes
+    inherited = {name for base in cls.__mro__[1:] for name in getattr(base, "__slots__", ())}
+    slots = tuple(name for name in field_names + extra_slots if name not in inherited)
+
+    # keep instances weak referenceable, as they were with a __dict__
+    if not any(base.__weakrefoffset__ for base in cls.__bases__):
+        slots += ("__weakref__",)
+
+    # field defaults are kept by __init__, class attributes would conflict with the slots
+    for name in slots:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    cls_dict["__slots__"] = slots
+
+    if "__getstate__" not in cls_dict:
+        cls_dict["__getstate__"] = _getstate
+        cls_dict["__setstate__"] = _setstate
+
+    new_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls  # type: ignore
+
+
+def _all_slots(obj):
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name != "__weakref__":
+                yield name
+
+
+def _getstate(self) -> Dict[str, Any]:
+    state = {}
+    for name in _all_slots(self):
+        try:
+            state[name] = getattr(self, name)
+        except AttributeError:
+            pass
+    return state
+
+
+def _setstate(self, state: Dict[str, Any]):
+    # object.__setattr__ circumvents frozen dataclasses
+    for name, value in state.items():
+        object.__setattr__(self, name, value)
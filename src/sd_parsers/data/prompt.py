@@ -1,7 +1,10 @@
 from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
 
+from ._slots import add_slots
 
+
+@add_slots
 @dataclass(frozen=True)
 class Prompt:
     """Represents an image generation prompt."""
@@ -15,7 +18,7 @@ class Prompt:
     metadata: Dict[Any, Any] = field(default_factory=dict)
     """
     Additional generator-specific information.
-    
+
     Highly dependent on the respective image generator.
     """
 
@@ -4,19 +4,23 @@ from __future__ import annotations
 
 import itertools
 import json
-from dataclasses import dataclass, asdict
-from typing import Any, Dict, Iterable, List
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
+from ._slots import add_slots
 from .generators import Generators
 from .model import Model
 from .prompt import Prompt
 from .sampler import Sampler
 
 
+@add_slots
 @dataclass
 class PromptInfo:
     """Contains structured image generation parameters."""
 
+    __slots__ = ("_prompts", "_negative_prompts", "_models")
+
     generator: Generators
     """Image generator which might have produced the parsed image."""
 
@@ -35,6 +39,11 @@ class PromptInfo:
         Unprocessed parameters as found in the parsed image.
     """
 
+    def __post_init__(self):
+        self._prompts: Optional[List[Prompt]] = None
+        self._negative_prompts: Optional[List[Prompt]] = None
+        self._models: Optional[Set[Model]] = None
+
     @property
     def full_prompt(self) -> str:
         """
@@ -61,8 +70,6 @@ class PromptInfo:
         except KeyError:
             return ", ".join(map(str, self.negative_prompts))
 
-    _prompts = None
-
     @property
     def prompts(self) -> List[Prompt]:
         """Prompts used in generating the parsed image."""
@@ -81,8 +88,6 @@ class PromptInfo:
 
         return self._prompts
 
-    _negative_prompts = None
-
     @property
     def negative_prompts(self) -> List[Prompt]:
         """Negative prompts used in generating the parsed image."""
@@ -101,8 +106,6 @@ class PromptInfo:
 
         return self._negative_prompts
 
-    _models = None
-
     @property
     def models(self) -> Iterable[Model]:
         """Models used in generating the parsed image."""
@@ -117,5 +120,70 @@ class PromptInfo:
             **asdict(self),
         }
 
-    def to_json(self):
-        return json.dumps(self.asdict())
+    def to_json(self, **kwargs):
+        """Serialize to JSON; keyword arguments are passed on to `json.dumps()`."""
+        return json.dumps(self.asdict(), **kwargs)
+
+
+class LazyPromptInfo(PromptInfo):
+    """
+    A PromptInfo returned by `ParserManager(lazy=True)`.
+
+    Only `generator` and `raw_parameters` are known up front. The metadata is parsed
+    on first access of any other property, and the result is kept for later accesses.
+    `raw_parameters` holds all the metadata read from the image, while some parsers
+    (i.e. InvokeAI) only keep the entries they used in the raw_parameters of their result.
+
+    If the parser fails, the other parsers accepting the same metadata are tried in turn,
+    which might change `generator`. Unlike `ParserManager.parse()`, the metadata of other
+    extractors is not read anymore: if no parser succeeds, a ParserError is raised
+    on first access (including comparisons), where `parse()` might have returned
+    the result of another extractor, or None.
+    Pickling (i.e. for the ParseCache or worker processes) stores the parsed PromptInfo.
+    """
+
+    __slots__ = ("_parse", "_result")
+
+    def __init__(
+        self,
+        generator: Generators,
+        raw_parameters: Dict[str, Any],
+        parse: Callable[[Dict[str, Any]], PromptInfo],
+    ):
+        self.generator = generator
+        self.raw_parameters = raw_parameters
+        self._parse = parse
+        self._result: Optional[PromptInfo] = None
+        self.__post_init__()
+
+    @property
+    def materialized(self) -> bool:
+        """The metadata has already been parsed."""
+        return self._result is not None
+
+    def materialize(self) -> PromptInfo:
+        """Parse the metadata (if not done yet) and return the resulting PromptInfo."""
+        if self._result is None:
+            self._result = self._parse(self.raw_parameters)
+            self.generator = self._result.generator
+        return self._result
+
+    @property
+    def samplers(self) -> List[Sampler]:  # type: ignore[override]
+        return self.materialize().samplers
+
+    @property
+    def metadata(self) -> Dict[Any, Any]:  # type: ignore[override]
+        return self.materialize().metadata
+
+    def __eq__(self, other):
+        return self.materialize() == other
+
+    def __repr__(self):
+        if self._result is None:
+            return f"{type(self).__name__}(generator={self.generator!r}, <not parsed yet>)"
+        return repr(self._result)
+
+    def __reduce__(self):
+        result = self.materialize()
+        return type(result), tuple(getattr(result, field.name) for field in fields(result))
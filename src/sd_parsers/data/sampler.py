@@ -1,10 +1,12 @@
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional
 
+from ._slots import add_slots
 from .model import Model
 from .prompt import Prompt
 
 
+@add_slots
 @dataclass(frozen=True)
 class Sampler:
     """Represents a sampler used during image generation."""
@@ -1,19 +1,58 @@
+import importlib as _importlib
+import sys as _sys
 import typing as _typing
 from enum import Enum as _Enum
 
-from PIL.Image import Image as _Image
+if _typing.TYPE_CHECKING:
+    from PIL.Image import Image as _Image
 
-from sd_parsers.data.generators import Generators as _Generators
+    from sd_parsers.data.generators import Generators as _Generators
 
-from ._jpeg_usercomment import jpeg_usercomment
-from ._png_image_info import png_image_info
-from ._png_image_text import png_image_text
-from ._png_stenographic_alpha import png_stenographic_alpha
+    from ._context import ExtractionContext, get_context
+    from ._gif_comments import gif_comment, gif_comment_extensions
+    from ._jpeg_usercomment import jpeg_usercomment
+    from ._png_image_info import png_image_info
+    from ._png_image_text import png_image_text
+    from ._png_stenographic_alpha import STEALTH_STATISTICS, png_stenographic_alpha
+    from ._png_text_chunks import png_text_chunks
+    from ._video import VideoFile, video_metadata
+    from ._webp_metadata import webp_metadata
 
 _ExtractorType = _typing.Callable[
-    [_Image, _Generators], _typing.Optional[_typing.Dict[str, _typing.Any]]
+    ["_Image", "_Generators"], _typing.Optional[_typing.Dict[str, _typing.Any]]
 ]
 
+# public names, imported from their modules on first access
+_LAZY_ATTRIBUTES = {
+    "ExtractionContext": "._context",
+    "get_context": "._context",
+    "gif_comment": "._gif_comments",
+    "gif_comment_extensions": "._gif_comments",
+    "jpeg_usercomment": "._jpeg_usercomment",
+    "png_image_info": "._png_image_info",
+    "png_image_text": "._png_image_text",
+    "png_stenographic_alpha": "._png_stenographic_alpha",
+    "STEALTH_STATISTICS": "._png_stenographic_alpha",
+    "png_text_chunks": "._png_text_chunks",
+    "VideoFile": "._video",
+    "video_metadata": "._video",
+    "webp_metadata": "._webp_metadata",
+}
+
+
+def __getattr__(name: str) -> _typing.Any:
+    try:
+        module = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+    value = globals()[name] = getattr(_importlib.import_module(module, __name__), name)
+    return value
+
+
+def __dir__() -> _typing.List[str]:
+    return sorted(set(globals()) | set(__all__))
+
 
 class Eagerness(_Enum):
     FAST = 1
@@ -21,19 +60,76 @@ class Eagerness(_Enum):
     EAGER = 3
 
 
+class _LazyExtractor:
+    """Stands in for an extractor function, importing its module on the first call."""
+
+    __slots__ = ("__name__", "__qualname__", "_function")
+
+    def __init__(self, name: str):
+        self.__name__ = self.__qualname__ = name
+        self._function: _typing.Optional[_ExtractorType] = None
+
+    def __call__(self, image: "_Image", generator: "_Generators"):
+        function = self._function
+        if function is None:
+            function = self._function = getattr(_sys.modules[__name__], self.__name__)
+        return function(image, generator)
+
+    def __repr__(self) -> str:
+        return f"<extractor {self.__name__}>"
+
+
 METADATA_EXTRACTORS: _typing.Dict[str, _typing.Dict[Eagerness, _typing.List[_ExtractorType]]] = {
     "PNG": {
-        Eagerness.FAST: [png_image_info],
-        Eagerness.DEFAULT: [png_image_text],
-        Eagerness.EAGER: [png_stenographic_alpha],
+        Eagerness.FAST: [_LazyExtractor("png_image_info")],
+        Eagerness.DEFAULT: [_LazyExtractor("png_text_chunks")],
+        Eagerness.EAGER: [_LazyExtractor("png_stenographic_alpha")],
     },
     "JPEG": {
-        Eagerness.FAST: [jpeg_usercomment],
+        Eagerness.FAST: [_LazyExtractor("jpeg_usercomment")],
     },
     "WEBP": {
-        Eagerness.FAST: [jpeg_usercomment],
+        Eagerness.FAST: [_LazyExtractor("jpeg_usercomment"), _LazyExtractor("webp_metadata")],
+    },
+    "GIF": {
+        Eagerness.FAST: [_LazyExtractor("gif_comment")],
+        Eagerness.DEFAULT: [_LazyExtractor("gif_comment_extensions")],
+    },
+    "MP4": {
+        Eagerness.FAST: [_LazyExtractor("video_metadata")],
+    },
+    "MOV": {
+        Eagerness.FAST: [_LazyExtractor("video_metadata")],
+    },
+    "WEBM": {
+        Eagerness.FAST: [_LazyExtractor("video_metadata")],
+    },
+    "MATROSKA": {
+        Eagerness.FAST: [_LazyExtractor("video_metadata")],
     },
 }
 """
 A list of retrieval functions to provide multiple metadata entrypoints for each parser module.
+
+Keys are image formats as reported by Pillow, or the format of a `VideoFile`
+(animated WEBP images are opened as `VideoFile` as well, using the "WEBP" format).
+The built-in extractors are imported on their first call.
 """
+
+__all__ = [
+    "METADATA_EXTRACTORS",
+    "STEALTH_STATISTICS",
+    "Eagerness",
+    "ExtractionContext",
+    "get_context",
+    "gif_comment",
+    "gif_comment_extensions",
+    "jpeg_usercomment",
+    "png_image_info",
+    "png_image_text",
+    "png_stenographic_alpha",
+    "png_text_chunks",
+    "VideoFile",
+    "video_metadata",
+    "webp_metadata",
+]
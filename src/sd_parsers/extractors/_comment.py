@@ -0,0 +1,20 @@
+from typing import Any, Dict
+
+from sd_parsers import _json
+
+
+def comment_parameters(comment: str) -> Dict[str, Any]:
+    """
+    Return the parameters stored in a comment.
+
+    Video nodes and some image writers store the prompt and workflow as one JSON object:
+    its members are returned. Any other comment is returned as "comment".
+    """
+    try:
+        decoded = _json.loads(comment)
+    except ValueError:
+        decoded = None
+
+    if isinstance(decoded, dict):
+        return decoded
+    return {"comment": comment}
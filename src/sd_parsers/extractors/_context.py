@@ -0,0 +1,78 @@
+"""Provides the ExtractionContext class."""
+
+from __future__ import annotations
+
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, TypeVar
+
+if TYPE_CHECKING:
+    from PIL.Image import Image
+
+T = TypeVar("T")
+
+_current_context: ContextVar[Optional["ExtractionContext"]] = ContextVar(
+    "extraction_context", default=None
+)
+
+
+class ExtractionContext:
+    """
+    Holds the data extracted from a single image during one `ParserManager.parse()` call.
+
+    Extractors are called once for every managed parser. Using `get_context(image).memoize()`,
+    the underlying metadata is read and decoded only once per image.
+
+    The context is activated with a `with` statement; being stored in a context variable,
+    concurrent parse calls in different threads each use their own context.
+    """
+
+    def __init__(self, image: Image):
+        self.image = image
+        self._values: Dict[Hashable, Any] = {}
+        self._errors: Dict[Hashable, Exception] = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_context.set(self))
+        return self
+
+    def __exit__(self, *_):
+        _current_context.reset(self._tokens.pop())
+
+    def memoize(self, key: Hashable, read: Callable[[], T]) -> T:
+        """
+        Return the value stored under `key`, calling `read()` to produce it on first access.
+
+        Exceptions raised by `read()` are stored as well and raised again on further calls.
+        """
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        try:
+            raise self._errors[key]
+        except KeyError:
+            pass
+
+        try:
+            value = read()
+        except Exception as error:
+            self._errors[key] = error
+            raise
+
+        self._values[key] = value
+        return value
+
+
+def get_context(image: Image) -> ExtractionContext:
+    """
+    Return the active extraction context for the given image.
+
+    When called outside of a context for this image (i.e. when calling an extractor directly),
+    a new context is returned, which is not shared with any further calls.
+    """
+    context = _current_context.get()
+    if context is None or context.image is not image:
+        return ExtractionContext(image)
+    return context
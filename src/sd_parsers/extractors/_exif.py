@@ -0,0 +1,200 @@
+"""
+Minimal EXIF support: locate the EXIF block inside JPEG and WEBP files and read single tags,
+without building a complete EXIF structure.
+"""
+
+import struct
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from ._webp_chunks import iter_chunks
+
+EXIF_HEADER = b"Exif\0\0"
+
+EXIF_IFD_POINTER = 0x8769
+USER_COMMENT = 0x9286
+
+# field type of text values
+ASCII = 2
+
+# byte sizes of the TIFF field types
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+# JPEG markers without a length field
+_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+_SOS, _EOI, _APP1 = 0xDA, 0xD9, 0xE1
+
+
+def read_jpeg_exif(fp: BinaryIO) -> Optional[bytes]:
+    """
+    Read the TIFF structure of the first EXIF APP1 segment of a JPEG file.
+
+    Walks the marker segments using their length fields, stopping at the image data.
+    """
+    fp.seek(0)
+    if fp.read(2) != b"\xff\xd8":
+        raise ValueError("not a JPEG file")
+
+    while True:
+        byte = fp.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            raise ValueError("invalid JPEG marker")
+
+        marker = fp.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = fp.read(1)
+        if not marker:
+            return None
+
+        marker_type = marker[0]
+        if marker_type in _STANDALONE_MARKERS:
+            continue
+        if marker_type in (_SOS, _EOI):
+            return None
+
+        (length,) = struct.unpack(">H", fp.read(2))
+        if length < 2:
+            raise ValueError("invalid JPEG segment length")
+
+        if marker_type == _APP1:
+            data = fp.read(length - 2)
+            if data.startswith(EXIF_HEADER):
+                return data[len(EXIF_HEADER) :]
+        else:
+            fp.seek(length - 2, 1)
+
+
+def read_webp_exif(fp: BinaryIO) -> Optional[bytes]:
+    """
+    Read the TIFF structure of the EXIF chunk of a WEBP file.
+
+    Walks the RIFF chunks using their size fields, skipping the image data.
+    """
+    for fourcc, size in iter_chunks(fp):
+        if fourcc == b"EXIF":
+            data = fp.read(size)
+            return data[len(EXIF_HEADER) :] if data.startswith(EXIF_HEADER) else data
+    return None
+
+
+def read_exif(fp: BinaryIO) -> Optional[bytes]:
+    """Read the TIFF structure holding the EXIF data of a JPEG or WEBP file."""
+    fp.seek(0)
+    magic = fp.read(12)
+    if magic.startswith(b"\xff\xd8"):
+        return read_jpeg_exif(fp)
+    if magic.startswith(b"RIFF") and magic[8:] == b"WEBP":
+        return read_webp_exif(fp)
+    raise ValueError("unsupported file format")
+
+
+class TiffData:
+    """Reads single tags out of a TIFF structure (as found in EXIF data)."""
+
+    def __init__(self, data: bytes):
+        if data.startswith(EXIF_HEADER):
+            data = data[len(EXIF_HEADER) :]
+
+        if data[:4] == b"II*\0":
+            self.byte_order = "little"
+            self._prefix = "<"
+        elif data[:4] == b"MM\0*":
+            self.byte_order = "big"
+            self._prefix = ">"
+        else:
+            raise ValueError("invalid TIFF header")
+
+        self.data = data
+        (self.ifd0_offset,) = self._unpack("I", 4)
+
+    def _unpack(self, fmt: str, offset: int):
+        return struct.unpack_from(self._prefix + fmt, self.data, offset)
+
+    def _find_entry(self, ifd_offset: int, tag: int) -> Optional[bytes]:
+        (entry_count,) = self._unpack("H", ifd_offset)
+
+        for index in range(entry_count):
+            entry_offset = ifd_offset + 2 + index * 12
+            (entry_tag,) = self._unpack("H", entry_offset)
+            if entry_tag == tag:
+                return self.value(entry_offset)
+
+        return None
+
+    def value(self, entry_offset: int) -> bytes:
+        """Return the raw value of the IFD entry at the given offset."""
+        field_type, count = self._unpack("HI", entry_offset + 2)
+
+        size = _TYPE_SIZES.get(field_type, 1) * count
+        if size <= 4:
+            value_offset = entry_offset + 8
+        else:
+            (value_offset,) = self._unpack("I", entry_offset + 8)
+
+        value = self.data[value_offset : value_offset + size]
+        if len(value) < size:
+            raise ValueError("truncated TIFF data")
+        return value
+
+    def entries(self, ifd_offset: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield tag, field type and offset of the entries of an IFD (IFD0 by default).
+
+        Values are read with `value()`. Entries beyond the end of the data are left out.
+        """
+        if ifd_offset is None:
+            ifd_offset = self.ifd0_offset
+
+        (entry_count,) = self._unpack("H", ifd_offset)
+        for index in range(entry_count):
+            entry_offset = ifd_offset + 2 + index * 12
+            if entry_offset + 12 > len(self.data):
+                return
+            tag, field_type = self._unpack("HH", entry_offset)
+            yield tag, field_type, entry_offset
+
+    def get_tag(self, tag: int, ifd_pointer: Optional[int] = None) -> Optional[bytes]:
+        """
+        Return the raw value of a tag.
+
+        Looks at IFD0, or at the IFD referenced by the `ifd_pointer` tag in IFD0.
+        """
+        ifd_offset = self.ifd0_offset
+
+        if ifd_pointer is not None:
+            pointer = self._find_entry(ifd_offset, ifd_pointer)
+            if pointer is None or len(pointer) != 4:
+                return None
+            ifd_offset = int.from_bytes(pointer, self.byte_order)
+
+        return self._find_entry(ifd_offset, tag)
+
+
+def decode_user_comment(value: bytes) -> str:
+    """
+    Decode an EXIF UserComment, honoring its 8 byte character code prefix.
+
+    Values without a known prefix are decoded as UTF-8.
+    """
+    prefix, text = value[:8], value[8:]
+
+    if prefix == b"UNICODE\0":
+        if text[:2] in (b"\xfe\xff", b"\xff\xfe"):
+            decoded = text.decode("utf_16")
+        else:
+            # writers usually ignore the TIFF byte order (piexif always writes big endian):
+            # guess it from the position of zero bytes, falling back to big endian
+            even_zeros, odd_zeros = text[0::2].count(0), text[1::2].count(0)
+            decoded = text.decode("utf_16_le" if odd_zeros > even_zeros else "utf_16_be")
+
+    elif prefix in (b"ASCII\0\0\0", b"\0" * 8):
+        decoded = text.decode("utf-8", "replace")
+
+    elif prefix == b"JIS\0\0\0\0\0":
+        decoded = text.decode("shift_jis", "replace")
+
+    else:
+        decoded = value.decode("utf-8", "replace")
+
+    return decoded.rstrip("\0")
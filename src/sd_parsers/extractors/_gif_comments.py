@@ -0,0 +1,107 @@
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from PIL import Image
+
+from sd_parsers.exceptions import MetadataError
+
+from ._comment import comment_parameters
+from ._context import get_context
+from ._image_file import image_file
+
+_EXTENSION, _IMAGE_DESCRIPTOR, _TRAILER = 0x21, 0x2C, 0x3B
+_COMMENT_LABEL = 0xFE
+_COLOR_TABLE_FLAG = 0x80
+
+
+def _skip_sub_blocks(fp: BinaryIO):
+    while True:
+        size = fp.read(1)
+        if not size or size[0] == 0:
+            return
+        fp.seek(size[0], 1)
+
+
+def _read_sub_blocks(fp: BinaryIO) -> bytes:
+    data = []
+    while True:
+        size = fp.read(1)
+        if not size or size[0] == 0:
+            return b"".join(data)
+        data.append(fp.read(size[0]))
+
+
+def _skip_color_table(fp: BinaryIO, flags: int):
+    if flags & _COLOR_TABLE_FLAG:
+        fp.seek(3 << ((flags & 0x07) + 1), 1)
+
+
+def read_gif_comments(fp: BinaryIO) -> List[bytes]:
+    """
+    Read the comment extensions of a GIF file, wherever they are placed between the frames.
+
+    GIF files don't store the size of the image data: the data sub-blocks are skipped one by one,
+    reading only their length bytes.
+    """
+    fp.seek(0)
+    header = fp.read(13)
+    if len(header) < 13 or header[:6] not in (b"GIF87a", b"GIF89a"):
+        raise ValueError("not a GIF file")
+    _skip_color_table(fp, header[10])
+
+    comments = []
+    while True:
+        block = fp.read(1)
+        if not block or block[0] == _TRAILER:
+            return comments
+
+        if block[0] == _EXTENSION:
+            label = fp.read(1)
+            if label and label[0] == _COMMENT_LABEL:
+                comments.append(_read_sub_blocks(fp))
+            else:
+                _skip_sub_blocks(fp)
+
+        elif block[0] == _IMAGE_DESCRIPTOR:
+            descriptor = fp.read(9)
+            if len(descriptor) < 9:
+                return comments
+            _skip_color_table(fp, descriptor[8])
+            fp.seek(1, 1)  # LZW minimum code size
+            _skip_sub_blocks(fp)
+
+        else:
+            raise ValueError(f"invalid GIF block: {block[0]:#x}")
+
+
+def _parameters(comments: List[Union[bytes, str]]) -> Optional[Dict[str, Any]]:
+    parameters: Dict[str, Any] = {}
+    for comment in comments:
+        if isinstance(comment, bytes):
+            comment = comment.decode("utf-8", "replace")
+        for key, value in comment_parameters(comment).items():
+            parameters.setdefault(key, value)
+    return parameters or None
+
+
+def gif_comment(image: Image.Image, _) -> Optional[Dict[str, Any]]:
+    """use the comment in front of the first frame, as read by Pillow"""
+    comment = image.info.get("comment")
+    if not comment:
+        return None
+    return get_context(image).memoize(gif_comment, lambda: _parameters([comment]))
+
+
+def _read_comments(image: Image.Image) -> Optional[Dict[str, Any]]:
+    with image_file(image) as fp:
+        if fp is None:
+            return None
+
+        try:
+            return _parameters(read_gif_comments(fp))
+        except (ValueError, OSError) as error:
+            raise MetadataError("error reading GIF comments") from error
+
+
+def gif_comment_extensions(image: Image.Image, _) -> Optional[Dict[str, Any]]:
+    """read all comment extensions straight from the file, without decoding the frames"""
+    return get_context(image).memoize(gif_comment_extensions, lambda: _read_comments(image))
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from PIL.Image import Image
+
+
+@contextmanager
+def image_file(image: Image) -> Iterator[Optional[BinaryIO]]:
+    """
+    Provide the file an image has been read from.
+
+    Uses the still opened file object of the image if possible, otherwise reopens the file.
+    The position of an already opened file object is restored afterwards.
+
+    Yields None if the image is not backed by a (still accessible) file.
+    """
+    fp = getattr(image, "fp", None)
+    if fp is not None:
+        try:
+            position = fp.tell()
+        except (AttributeError, OSError, ValueError):
+            fp = None
+        else:
+            try:
+                yield fp
+            finally:
+                fp.seek(position)
+            return
+
+    filename = getattr(image, "filename", None)
+    if filename:
+        try:
+            fp = open(filename, "rb")
+        except OSError:
+            pass
+        else:
+            with fp:
+                yield fp
+            return
+
+    yield None
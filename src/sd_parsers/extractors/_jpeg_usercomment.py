@@ -1,33 +1,56 @@
-from PIL import Image
+import struct
 from typing import Any, Dict, Optional
 
+from PIL import Image
+
 from sd_parsers.data import Generators
 from sd_parsers.exceptions import MetadataError
-from ._get_exif_value import get_exif_value
 
-_image_id = None
-_usercomment = None
+from ._context import get_context
+from ._exif import EXIF_IFD_POINTER, USER_COMMENT, TiffData, decode_user_comment, read_exif
+from ._image_file import image_file
+
+
+def _read_usercomment(image: Image.Image) -> Optional[str]:
+    # Pillow already keeps the raw EXIF data of JPEG and WEBP images in image.info
+    exif = image.info.get("exif")
+    if exif is None:
+        with image_file(image) as fp:
+            if fp is None:
+                return None
+            exif = read_exif(fp)
+        if exif is None:
+            return None
+
+    tiff = TiffData(exif)
+
+    # look in the EXIF IFD first, some writers put the UserComment into IFD0 instead
+    value = tiff.get_tag(USER_COMMENT, EXIF_IFD_POINTER)
+    if value is None:
+        value = tiff.get_tag(USER_COMMENT)
+    if value is None:
+        return None
 
+    return decode_user_comment(value)
 
-def jpeg_usercomment(image: Image.Image, generator: Generators) -> Optional[Dict[str, Any]]:
-    """use image.info"""
-    global _image_id, _usercomment
 
-    # cache the last image data to prevent multiple extractions of the same instance
-    image_id = id(image)
-    if image_id != _image_id:
-        _image_id = image_id
-        _usercomment = None
+def _extract_usercomment(image: Image.Image) -> str:
+    try:
+        usercomment = _read_usercomment(image)
+    except (ValueError, OSError, struct.error) as error:
+        raise MetadataError("error reading UserComment") from error
 
-        try:
-            _usercomment = get_exif_value(image, "UserComment")
-        except (KeyError, ValueError) as error:
-            raise MetadataError("error reading UserComment") from error
+    if usercomment is None:
+        raise MetadataError("no UserComment found")
 
-    if _usercomment is None:
-        return None
+    return usercomment
+
+
+def jpeg_usercomment(image: Image.Image, generator: Generators) -> Optional[Dict[str, Any]]:
+    """read the UserComment EXIF tag"""
+    usercomment = get_context(image).memoize(jpeg_usercomment, lambda: _extract_usercomment(image))
 
     if generator in (Generators.AUTOMATIC1111, Generators.FOOOCUS):
-        return {"parameters": _usercomment}
+        return {"parameters": usercomment}
 
     return None
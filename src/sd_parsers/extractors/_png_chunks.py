@@ -0,0 +1,98 @@
+"""Low-level access to the chunks of a PNG file, without decoding any image data."""
+
+import struct
+import zlib
+from contextlib import suppress
+from typing import BinaryIO, Dict, Iterator, Tuple
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+TEXT_CHUNK_TYPES = (b"tEXt", b"zTXt", b"iTXt")
+
+MAX_TEXT_SIZE = 64 * 1024 * 1024
+"""Upper limit for the decompressed size of a single text chunk."""
+
+_CHUNK_HEADER = struct.Struct(">I4s")
+
+
+def iter_chunks(fp: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+    """
+    Walk the chunk table of a PNG file, yielding type and data length of each chunk.
+
+    On each iteration the file is positioned at the start of the chunk data;
+    callers may read as much of it as they need, the rest is skipped without being read.
+
+    Raises a ValueError if the file does not start with a PNG signature.
+    """
+    fp.seek(0)
+    if fp.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+        raise ValueError("not a PNG file")
+
+    while True:
+        header = fp.read(_CHUNK_HEADER.size)
+        if len(header) < _CHUNK_HEADER.size:
+            return
+
+        length, chunk_type = _CHUNK_HEADER.unpack(header)
+        start = fp.tell()
+        yield chunk_type, length
+
+        if chunk_type == b"IEND":
+            return
+
+        # skip the remaining data and the CRC
+        fp.seek(start + length + 4)
+
+
+def _decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj()
+    result = decompressor.decompress(data, MAX_TEXT_SIZE)
+    if decompressor.unconsumed_tail:
+        raise ValueError("decompressed text chunk too large")
+    return result
+
+
+def decode_text_chunk(chunk_type: bytes, data: bytes) -> Tuple[str, str]:
+    """
+    Decode the contents of a tEXt, zTXt or iTXt chunk into a key/value pair.
+
+    Raises a ValueError (or zlib.error) for malformed chunks.
+    """
+    key, _, value = data.partition(b"\0")
+
+    if chunk_type == b"tEXt":
+        return key.decode("latin-1"), value.decode("latin-1")
+
+    if chunk_type == b"zTXt":
+        if value[:1] != b"\0":
+            raise ValueError("unknown compression method")
+        return key.decode("latin-1"), _decompress(value[1:]).decode("latin-1")
+
+    if chunk_type == b"iTXt":
+        compression_flag, compression_method = value[0], value[1]
+        _language, _, value = value[2:].partition(b"\0")
+        _translated_key, _, value = value.partition(b"\0")
+        if compression_flag:
+            if compression_method != 0:
+                raise ValueError("unknown compression method")
+            value = _decompress(value)
+        return key.decode("latin-1"), value.decode("utf-8")
+
+    raise ValueError(f"not a text chunk: {chunk_type!r}")
+
+
+def read_text_chunks(fp: BinaryIO) -> Dict[str, str]:
+    """
+    Read all tEXt, zTXt and iTXt chunks of a PNG file.
+
+    Only the text chunks are read, all other chunks (including the image data) are skipped.
+    Malformed text chunks are ignored.
+    """
+    text = {}
+    for chunk_type, length in iter_chunks(fp):
+        if chunk_type in TEXT_CHUNK_TYPES:
+            data = fp.read(length)
+            with suppress(ValueError, IndexError, zlib.error):
+                key, value = decode_text_chunk(chunk_type, data)
+                text[key] = value
+    return text
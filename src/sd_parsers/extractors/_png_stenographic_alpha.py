@@ -1,53 +1,234 @@
 import gzip
-import json
+import struct
+import threading
+import zlib
 from contextlib import suppress
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, List, Optional
 
 from PIL.Image import Image
 
+from sd_parsers import _json
 from sd_parsers.data.generators import Generators
 from sd_parsers.exceptions import MetadataError
 
+from ._context import get_context
+from ._image_file import image_file
+from ._png_chunks import iter_chunks
+
 STEALTH_HEADER = "stealth_pngcomp"
 
+# the magic header, followed by the 32 bit payload length (in bits)
+HEADER_BITS = (len(STEALTH_HEADER) + 4) * 8
+
+# maps every byte value to the ascii digit of its least significant bit (b"0" or b"1")
+_LSB_DIGITS = bytes(0x30 | (value & 1) for value in range(256))
+
+
+@lru_cache(maxsize=None)
+def _import_numpy():
+    """numpy is optional, use it when available"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def pack_lsb(alpha: bytes, width: int, height: int) -> bytes:
+    """
+    Pack the least significant bits of a row-major alpha channel buffer into bytes.
+
+    The bits are read column by column, starting at the top left pixel.
+    Trailing bits not filling up a whole byte are discarded.
+    """
+    if len(alpha) != width * height:
+        raise ValueError("alpha channel size does not match the image dimensions")
+
+    byte_count = width * height // 8
+    if byte_count == 0:
+        return b""
+
+    numpy = _import_numpy()
+    if numpy is not None:
+        plane = numpy.frombuffer(alpha, dtype=numpy.uint8).reshape(height, width).T & 1
+        return numpy.packbits(plane, axis=None)[:byte_count].tobytes()
+
+    # without numpy: gather the columns using strided slices and let int() do the bit packing
+    columns = b"".join(alpha[col::width] for col in range(width))
+    bits = columns[: byte_count * 8].translate(_LSB_DIGITS)
+    return int(bits, 2).to_bytes(byte_count, byteorder="big")
+
+
+class StealthStatistics:
+    """Counts header probes and full decodes done by the `png_stenographic_alpha` extractor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.probes = 0
+        self.full_decodes = 0
+
+    @property
+    def rejections(self) -> int:
+        """Number of images rejected by the header probe alone."""
+        return self.probes - self.full_decodes
+
+    def count_probe(self):
+        with self._lock:
+            self.probes += 1
+
+    def count_full_decode(self):
+        with self._lock:
+            self.full_decodes += 1
+
+    def reset(self):
+        with self._lock:
+            self.probes = 0
+            self.full_decodes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(probes={self.probes}, full_decodes={self.full_decodes}, "
+            f"rejections={self.rejections})"
+        )
+
+
+STEALTH_STATISTICS = StealthStatistics()
+"""Probe vs. full decode counts of the stealth metadata extractor."""
+
+
+def _paeth(left: int, up: int, up_left: int) -> int:
+    estimate = left + up - up_left
+    distance_left = abs(estimate - left)
+    distance_up = abs(estimate - up)
+    distance_up_left = abs(estimate - up_left)
+    if distance_left <= distance_up and distance_left <= distance_up_left:
+        return left
+    if distance_up <= distance_up_left:
+        return up
+    return up_left
+
+
+def _unfilter_prefix(raw: bytes, stride: int, rows: int, length: int) -> List[bytearray]:
+    """
+    Reverse the PNG scanline filters for the first `length` bytes of each row (4 bytes per pixel).
+
+    As filters only refer to pixels to the left and above, a row prefix can be restored
+    without touching the rest of the row.
+    """
+    result = []
+    previous = bytearray(length)
+
+    for row in range(rows):
+        start = row * stride
+        filter_type = raw[start]
+        current = bytearray(raw[start + 1 : start + 1 + length])
+
+        for i in range(length):
+            left = current[i - 4] if i >= 4 else 0
+            if filter_type == 1:
+                current[i] = (current[i] + left) & 0xFF
+            elif filter_type == 2:
+                current[i] = (current[i] + previous[i]) & 0xFF
+            elif filter_type == 3:
+                current[i] = (current[i] + ((left + previous[i]) >> 1)) & 0xFF
+            elif filter_type == 4:
+                up_left = previous[i - 4] if i >= 4 else 0
+                current[i] = (current[i] + _paeth(left, previous[i], up_left)) & 0xFF
+            elif filter_type != 0:
+                raise ValueError(f"unknown filter type: {filter_type}")
+
+        result.append(current)
+        previous = current
+
+    return result
+
+
+def _read_leading_alpha_png(fp: BinaryIO, columns: int, rows: int) -> Optional[bytes]:
+    """
+    Read the alpha values of the top left `columns` x `rows` pixels straight from a PNG file.
+
+    Only the compressed data up to the last needed scanline is decompressed.
+    Returns None for PNG variants not handled here (anything but non-interlaced 8 bit RGBA).
+    """
+    chunks = iter_chunks(fp)
+
+    chunk_type, length = next(chunks)
+    if chunk_type != b"IHDR" or length < 13:
+        return None
+
+    width, _, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", fp.read(13))
+    if (bit_depth, color_type, interlace) != (8, 6, 0) or columns > width:
+        return None
+
+    stride = 1 + width * 4
+    needed = stride * rows
+    decompressor = zlib.decompressobj()
+    raw = bytearray()
+
+    for chunk_type, length in chunks:
+        if chunk_type != b"IDAT":
+            if raw:
+                break  # IDAT chunks are consecutive
+            continue
+
+        while length > 0 and len(raw) < needed:
+            block = fp.read(min(length, 1 << 16))
+            if not block:
+                break
+            length -= len(block)
+            raw += decompressor.decompress(block, needed - len(raw))
+
+        if len(raw) >= needed:
+            break
+
+    if len(raw) < needed:
+        return None
+
+    return b"".join(row[3::4] for row in _unfilter_prefix(raw, stride, rows, columns * 4))
+
+
+def _read_leading_alpha(image: Image, columns: int, rows: int) -> bytes:
+    """Read the alpha values of the top left `columns` x `rows` pixels as row-major buffer."""
+    # images not loaded yet: try to decode only the leading scanlines
+    if getattr(image, "tile", None) and image.format == "PNG":
+        with image_file(image) as fp:
+            if fp is not None:
+                with suppress(ValueError, OSError, struct.error, zlib.error, StopIteration):
+                    alpha = _read_leading_alpha_png(fp, columns, rows)
+                    if alpha is not None:
+                        return alpha
+
+    return image.crop((0, 0, columns, rows)).getchannel("A").tobytes()
+
+
+def _probe_header(image: Image) -> bytes:
+    """Read the bytes holding the stealth header and the payload length."""
+    width, height = image.size
+    if width * height < HEADER_BITS:
+        raise ValueError("image too small to contain stealth metadata")
+
+    columns = -(-HEADER_BITS // height)
+    rows = min(height, HEADER_BITS)
+
+    alpha = _read_leading_alpha(image, columns, rows)
+    return pack_lsb(alpha, columns, rows)[: HEADER_BITS // 8]
+
 
 class LSBExtractor:
+    """Reads data hidden in the least significant bits of an image's alpha channel."""
+
     def __init__(self, img: Image):
-        self.data = list(img.getdata())
         self.width, self.height = img.size
-        self.data = [self.data[i * self.width : (i + 1) * self.width] for i in range(self.height)]
-        self.dim = 4
-        self.bits = 0
-        self.byte = 0
-        self.row = 0
-        self.col = 0
-
-    def _extract_next_bit(self):
-        if self.row < self.height and self.col < self.width:
-            bit = self.data[self.row][self.col][self.dim - 1] & 1
-            self.bits += 1
-            self.byte <<= 1
-            self.byte |= bit
-            self.row += 1
-            if self.row == self.height:
-                self.row = 0
-                self.col += 1
+        self.data = pack_lsb(img.getchannel("A").tobytes(), self.width, self.height)
+        self.pos = 0
 
     def get_one_byte(self):
-        while self.bits < 8:
-            self._extract_next_bit()
-        byte = bytearray([self.byte])
-        self.bits = 0
-        self.byte = 0
-        return byte
+        return self.get_next_n_bytes(1)
 
     def get_next_n_bytes(self, n):
-        bytes_list = bytearray()
-        for _ in range(n):
-            byte = self.get_one_byte()
-            if not byte:
-                break
-            bytes_list.extend(byte)
+        bytes_list = bytearray(self.data[self.pos : self.pos + n])
+        self.pos += len(bytes_list)
         return bytes_list
 
     def read_32bit_integer(self):
@@ -60,15 +241,25 @@ class LSBExtractor:
 
     @classmethod
     def extract_from(cls, image: Image):
-        extractor = cls(image)
+        # probe for the stealth header before decoding the whole image
+        STEALTH_STATISTICS.count_probe()
+        header = _probe_header(image)
 
-        read_magic = extractor.get_next_n_bytes(len(STEALTH_HEADER)).decode("utf-8")
+        read_magic = header[: len(STEALTH_HEADER)].decode("utf-8")
         if STEALTH_HEADER != read_magic:
             raise ValueError(
                 f'Header "{read_magic}" does not match the expected value of "{STEALTH_HEADER}"'
             )
 
-        read_len = extractor.read_32bit_integer() // 8  # type: ignore
+        read_len = int.from_bytes(header[len(STEALTH_HEADER) :], byteorder="big") // 8
+
+        # only the columns holding the payload need to be unpacked
+        STEALTH_STATISTICS.count_full_decode()
+        width, height = image.size
+        columns = min(width, -(-(HEADER_BITS + read_len * 8) // height))
+        extractor = cls(image.crop((0, 0, columns, height)))
+        extractor.pos = len(header)
+
         raw_bytes = extractor.get_next_n_bytes(read_len)
 
         decompressed_bytes = gzip.decompress(raw_bytes).decode("utf-8")
@@ -76,39 +267,32 @@ class LSBExtractor:
         return decompressed_bytes
 
 
-_image_id = None
-_decompressed_bytes = None
-_json_decoded = None
+def _extract_stealth(image: Image):
+    try:
+        decompressed_bytes = LSBExtractor.extract_from(image)
+    except Exception as error:
+        raise MetadataError("error reading metadata") from error
+
+    json_decoded = None
+    with suppress(TypeError, _json.JSONDecodeError):
+        json_decoded = _json.loads(decompressed_bytes)
+
+    return decompressed_bytes, json_decoded
 
 
 def png_stenographic_alpha(image: Image, generator: Generators) -> Optional[Dict[str, Any]]:
     """try to read stealth metadata from image"""
-    global _image_id, _decompressed_bytes, _json_decoded
-
     if image.mode != "RGBA":
         raise MetadataError("image mode is not RGBA")
 
-    image_id = id(image)
-
-    # cache the last image data to prevent multiple extractions of the same instance
-    if image_id != _image_id:
-        _image_id = image_id
-        _decompressed_bytes = None
-        _json_decoded = None
-
-        try:
-            _decompressed_bytes = LSBExtractor.extract_from(image)
-
-            with suppress(TypeError, json.JSONDecodeError):
-                _json_decoded = json.loads(_decompressed_bytes)
-
-        except Exception as error:
-            raise MetadataError("error reading metadata") from error
+    decompressed_bytes, json_decoded = get_context(image).memoize(
+        png_stenographic_alpha, lambda: _extract_stealth(image)
+    )
 
     if generator == Generators.NOVELAI:
-        return _json_decoded
+        return json_decoded
 
     elif generator == Generators.AUTOMATIC1111:
-        return {"parameters": _decompressed_bytes} if _decompressed_bytes else None
+        return {"parameters": decompressed_bytes} if decompressed_bytes else None
 
     return None
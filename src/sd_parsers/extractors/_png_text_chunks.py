@@ -0,0 +1,28 @@
+import struct
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+from sd_parsers.exceptions import MetadataError
+
+from ._context import get_context
+from ._image_file import image_file
+from ._png_chunks import read_text_chunks
+from ._png_image_text import png_image_text
+
+
+def _read_text(image: Image.Image) -> Optional[Dict[str, Any]]:
+    with image_file(image) as fp:
+        if fp is None:
+            # not backed by a file: let Pillow read the chunks
+            return png_image_text(image, None)
+
+        try:
+            return read_text_chunks(fp)
+        except (ValueError, OSError, struct.error) as error:
+            raise MetadataError("error reading text chunks") from error
+
+
+def png_text_chunks(image: Image.Image, _) -> Optional[Dict[str, Any]]:
+    """read iTXt, tEXt and zTXt chunks straight from the file, without loading the image data"""
+    return get_context(image).memoize(png_text_chunks, lambda: _read_text(image))
@@ -0,0 +1,485 @@
+"""
+Read the metadata tags of videos, i.e. the workflow JSON stored by ComfyUI video nodes.
+
+Supports ISO base media files (MP4/MOV) and Matroska/WebM files. Boxes and elements are
+located by their sizes, seeking past everything but the tags: the encoded video data
+(the "mdat" box or Matroska clusters) is never read.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import struct
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from sd_parsers.data.generators import Generators
+from sd_parsers.exceptions import MetadataError
+
+from ._comment import comment_parameters
+from ._context import get_context
+from ._image_file import image_file
+from ._webp_chunks import is_animated_webp, read_webp_info
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+VIDEO_FORMATS = ("MP4", "MOV", "WEBM", "MATROSKA")
+
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+# major brands of MP4 and QuickTime files (HEIF, AVIF or 3GP files use the same boxes)
+_MP4_BRANDS = {
+    *(b"iso%d" % version for version in range(2, 10)),
+    b"isom",
+    b"mp41",
+    b"mp42",
+    b"mmp4",
+    b"avc1",
+    b"M4V ",
+    b"M4VP",
+    b"dash",
+    b"MSNV",
+    b"XAVC",
+    b"f4v ",
+}
+_QUICKTIME_BRAND = b"qt  "
+
+# names of the iTunes style metadata items
+_ITEM_NAMES = {
+    b"\xa9cmt": "comment",
+    b"\xa9nam": "title",
+    b"\xa9too": "encoder",
+    b"desc": "description",
+}
+
+# data types of metadata item values
+_UTF8, _UTF16 = 1, 2
+
+# Matroska element ids
+_EBML, _DOC_TYPE = 0x1A45DFA3, 0x4282
+_SEGMENT, _SEEK_HEAD, _SEEK, _SEEK_ID, _SEEK_POSITION = (
+    0x18538067,
+    0x114D9B74,
+    0x4DBB,
+    0x53AB,
+    0x53AC,
+)
+_CLUSTER, _TAGS, _TAG, _TARGETS, _SIMPLE_TAG, _TAG_NAME, _TAG_STRING = (
+    0x1F43B675,
+    0x1254C367,
+    0x7373,
+    0x63C0,
+    0x67C8,
+    0x45A3,
+    0x4487,
+)
+# target ids restricting a Matroska tag to a track, edition, chapter or attachment
+_TARGET_UIDS = {0x63C5, 0x63C9, 0x63C4, 0x63C6}
+
+
+class VideoFile:
+    """
+    Stands in for a PIL image when parsing a video file or an animated WEBP image.
+
+    Provides the attributes used by the ParserManager and the extractors:
+    `format` (one of `VIDEO_FORMATS`, or "WEBP"), `info`, `filename` and `fp`.
+    For animated WEBP images, `info` holds the "exif" and "xmp" chunks, as Pillow would provide.
+    """
+
+    def __init__(self, fp: BinaryIO, video_format: str, filename: str = "", exclusive=False):
+        self.fp: Optional[BinaryIO] = fp
+        self.format = video_format
+        self.filename = filename
+        self.info: Dict[str, Any] = {}
+        self._exclusive = exclusive
+
+    def close(self):
+        if self._exclusive and self.fp is not None:
+            self.fp.close()
+        self.fp = None
+
+    def __enter__(self) -> VideoFile:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} format={self.format} filename={self.filename!r}>"
+
+
+def open_video(source: Union[str, bytes, Path, BinaryIO]) -> Optional[VideoFile]:
+    """
+    Open a video file or an animated WEBP image, given a filename or a seekable binary file object.
+
+    Pillow reads WEBP images as a whole when opening them: for animated images only the chunk
+    headers are read instead, skipping the frames.
+
+    Returns None if the file is not a supported video file or animated WEBP image.
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        fp: BinaryIO = open(source, "rb")
+        filename, exclusive = os.fsdecode(source), True
+    else:
+        fp, filename, exclusive = source, "", False
+
+    try:
+        fp.seek(0)
+        video_format = _identify(fp.read(64))
+        fp.seek(0)
+    except BaseException:
+        if exclusive:
+            fp.close()
+        raise
+
+    if video_format is None:
+        if exclusive:
+            fp.close()
+        return None
+
+    video = VideoFile(fp, video_format, filename, exclusive)
+    if video_format == "WEBP":
+        try:
+            video.info = read_webp_info(fp)
+        except (ValueError, OSError):
+            pass  # left to the extractors, reading the file again
+    return video
+
+
+def _identify(header: bytes) -> Optional[str]:
+    if is_animated_webp(header):
+        return "WEBP"
+
+    if header[4:8] == b"ftyp":
+        if header[8:12] == _QUICKTIME_BRAND:
+            return "MOV"
+        if header[8:12] in _MP4_BRANDS:
+            return "MP4"
+        return None
+
+    if header.startswith(_EBML_MAGIC):
+        return "WEBM" if _doc_type(io.BytesIO(header)) == "webm" else "MATROSKA"
+
+    return None
+
+
+def _doc_type(fp: BinaryIO) -> Optional[str]:
+    """Read the DocType of a (usually small) EBML header."""
+    try:
+        for element_id, _, start, end in _elements(fp, 0, None):
+            if element_id != _EBML or end is None:
+                return None
+            for child_id, _, child_start, child_end in _elements(fp, start, end):
+                if child_id == _DOC_TYPE and child_end is not None:
+                    fp.seek(child_start)
+                    return fp.read(child_end - child_start).decode("ascii", "replace")
+    except ValueError:
+        pass  # header longer than the data read
+    return None
+
+
+def _boxes(fp: BinaryIO, start: int, end: Optional[int]) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield type, data offset and end offset of the ISO boxes between `start` and `end`."""
+    position = start
+    while end is None or position + 8 <= end:
+        fp.seek(position)
+        header = fp.read(8)
+        if len(header) < 8:
+            return
+
+        size, box_type = struct.unpack(">I4s", header)
+        offset = position + 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", fp.read(8))
+            offset += 8
+        elif size == 0:
+            # the last box extends to the end of the file
+            size = (end if end is not None else fp.seek(0, os.SEEK_END)) - position
+
+        box_end = position + size
+        if box_end < offset or (end is not None and box_end > end):
+            raise ValueError(f"invalid size of box {box_type!r}")
+
+        yield box_type, offset, box_end
+        position = box_end
+
+
+def _read_string(fp: BinaryIO, data_type: int, size: int) -> Optional[str]:
+    if data_type == _UTF8:
+        return fp.read(size).decode("utf-8", "replace")
+    if data_type == _UTF16:
+        return fp.read(size).decode("utf-16-be", "replace")
+    return None
+
+
+def read_mp4_tags(fp: BinaryIO) -> Dict[str, str]:
+    """Read the text metadata of an MP4/MOV file, found in the "moov" box."""
+    tags: Dict[str, str] = {}
+
+    for box_type, start, end in _boxes(fp, 0, None):
+        if box_type == b"moov":
+            for child_type, child_start, child_end in _boxes(fp, start, end):
+                if child_type == b"udta":
+                    _read_udta(fp, child_start, child_end, tags)
+                elif child_type == b"meta":
+                    _read_meta(fp, child_start, child_end, tags)
+            break
+
+    return tags
+
+
+def _read_udta(fp: BinaryIO, start: int, end: int, tags: Dict[str, str]):
+    for box_type, box_start, box_end in _boxes(fp, start, end):
+        if box_type == b"meta":
+            _read_meta(fp, box_start, box_end, tags)
+        elif box_type[:1] == b"\xa9" and box_end - box_start >= 4:
+            # QuickTime user data text: length, language code and text
+            fp.seek(box_start)
+            length, _ = struct.unpack(">HH", fp.read(4))
+            if length <= box_end - box_start - 4:
+                name = _ITEM_NAMES.get(box_type, box_type.decode("latin-1"))
+                tags.setdefault(name, fp.read(length).decode("utf-8", "replace"))
+
+
+def _read_meta(fp: BinaryIO, start: int, end: int, tags: Dict[str, str]):
+    # ISO files use a "full box" with version and flags, QuickTime files don't
+    fp.seek(start + 4)
+    if fp.read(4) != b"hdlr":
+        start += 4
+
+    keys: List[str] = []
+    for box_type, box_start, box_end in _boxes(fp, start, end):
+        if box_type == b"keys":
+            keys = _read_keys(fp, box_start, box_end)
+        elif box_type == b"ilst":
+            _read_ilst(fp, box_start, box_end, keys, tags)
+
+
+def _read_keys(fp: BinaryIO, start: int, end: int) -> List[str]:
+    """Read the names of the metadata items of the "mdta" handler."""
+    fp.seek(start + 4)
+    (count,) = struct.unpack(">I", fp.read(4))
+
+    keys = []
+    position = start + 8
+    for _ in range(count):
+        fp.seek(position)
+        size, _namespace = struct.unpack(">I4s", fp.read(8))
+        if size < 8 or position + size > end:
+            raise ValueError("invalid metadata key size")
+        keys.append(fp.read(size - 8).decode("utf-8", "replace"))
+        position += size
+
+    return keys
+
+
+def _read_ilst(fp: BinaryIO, start: int, end: int, keys: List[str], tags: Dict[str, str]):
+    for item_type, item_start, item_end in _boxes(fp, start, end):
+        if keys:
+            # items of the "mdta" handler are numbered by their key (starting at 1)
+            index = int.from_bytes(item_type, "big") - 1
+            if not 0 <= index < len(keys):
+                continue
+            name = keys[index]
+        else:
+            name = _ITEM_NAMES.get(item_type, item_type.decode("latin-1"))
+
+        for box_type, data_start, data_end in _boxes(fp, item_start, item_end):
+            if box_type != b"data" or data_end - data_start < 8:
+                continue
+
+            # data type (after a version byte), locale and value
+            fp.seek(data_start)
+            data_type = int.from_bytes(fp.read(4)[1:], "big")
+            fp.seek(4, os.SEEK_CUR)
+
+            value = _read_string(fp, data_type, data_end - data_start - 8)
+            if value is not None:
+                tags.setdefault(name, value)
+                break
+
+
+def _read_vint(fp: BinaryIO, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """Read an EBML variable size integer, returning its value (None if unknown) and length."""
+    first = fp.read(1)
+    if not first:
+        raise EOFError
+    if not first[0]:
+        raise ValueError("invalid EBML variable size integer")
+
+    length = 9 - first[0].bit_length()
+    data = first + fp.read(length - 1)
+    if len(data) < length:
+        raise EOFError
+
+    value = int.from_bytes(data, "big")
+    if keep_marker:
+        return value, length
+
+    value &= (1 << (7 * length)) - 1
+    if value == (1 << (7 * length)) - 1:
+        return None, length  # all ones: unknown size
+    return value, length
+
+
+def _elements(
+    fp: BinaryIO, start: int, end: Optional[int]
+) -> Iterator[Tuple[int, int, int, Optional[int]]]:
+    """
+    Yield id, start offset, data offset and end offset of the EBML elements
+    between `start` and `end`.
+
+    Stops after an element of unknown size (end offset None), as its end can't be found by seeking.
+    """
+    position = start
+    while end is None or position < end:
+        fp.seek(position)
+        try:
+            element_id, id_length = _read_vint(fp, keep_marker=True)
+            size, size_length = _read_vint(fp, keep_marker=False)
+        except EOFError:
+            return
+
+        offset = position + id_length + size_length
+        if size is None:
+            yield element_id, position, offset, None  # type: ignore
+            return
+
+        element_end = offset + size
+        if end is not None and element_end > end:
+            raise ValueError(f"invalid size of element {element_id:#x}")
+
+        yield element_id, position, offset, element_end  # type: ignore
+        position = element_end
+
+
+def _read_unsigned(fp: BinaryIO, start: int, end: int) -> int:
+    fp.seek(start)
+    return int.from_bytes(fp.read(end - start), "big")
+
+
+def read_matroska_tags(fp: BinaryIO) -> Dict[str, str]:
+    """
+    Read the global tags of a Matroska/WebM file.
+
+    Tag elements behind the first cluster are found through the seek head, if there is one.
+    Otherwise the clusters are skipped one by one, using their sizes.
+    """
+    tags: Dict[str, str] = {}
+
+    segment = next(
+        (
+            (start, end)
+            for element_id, _, start, end in _elements(fp, 0, None)
+            if element_id == _SEGMENT
+        ),
+        None,
+    )
+    if segment is None:
+        return tags
+    start, end = segment
+
+    tags_positions: List[int] = []
+    visited = set()
+
+    for element_id, element_start, data_start, data_end in _elements(fp, start, end):
+        if element_id == _SEEK_HEAD and data_end is not None:
+            tags_positions.extend(
+                start + offset for offset in _read_seek_head(fp, data_start, data_end)
+            )
+        elif element_id == _TAGS and data_end is not None:
+            visited.add(element_start)
+            _read_tags(fp, data_start, data_end, tags)
+        elif element_id == _CLUSTER and tags_positions:
+            break
+
+    for position in tags_positions:
+        if position in visited:
+            continue
+        for element_id, _, data_start, data_end in _elements(fp, position, end):
+            if element_id == _TAGS and data_end is not None:
+                _read_tags(fp, data_start, data_end, tags)
+            break
+
+    return tags
+
+
+def _read_seek_head(fp: BinaryIO, start: int, end: int) -> Iterator[int]:
+    """Yield the positions of Tags elements (relative to the segment data) of a seek head."""
+    for element_id, _, seek_start, seek_end in _elements(fp, start, end):
+        if element_id != _SEEK or seek_end is None:
+            continue
+
+        seek_id = position = None
+        for child_id, _, child_start, child_end in _elements(fp, seek_start, seek_end):
+            if child_id == _SEEK_ID and child_end is not None:
+                seek_id = _read_unsigned(fp, child_start, child_end)
+            elif child_id == _SEEK_POSITION and child_end is not None:
+                position = _read_unsigned(fp, child_start, child_end)
+
+        if seek_id == _TAGS and position is not None:
+            yield position
+
+
+def _read_tags(fp: BinaryIO, start: int, end: int, tags: Dict[str, str]):
+    for element_id, _, tag_start, tag_end in _elements(fp, start, end):
+        if element_id != _TAG or tag_end is None:
+            continue
+
+        simple_tags = []
+        for child_id, _, child_start, child_end in _elements(fp, tag_start, tag_end):
+            if child_end is None:
+                break
+            if child_id == _TARGETS and _has_target_uid(fp, child_start, child_end):
+                break  # not a global tag
+            if child_id == _SIMPLE_TAG:
+                simple_tags.append((child_start, child_end))
+        else:
+            for simple_start, simple_end in simple_tags:
+                _read_simple_tag(fp, simple_start, simple_end, tags)
+
+
+def _has_target_uid(fp: BinaryIO, start: int, end: int) -> bool:
+    return any(element_id in _TARGET_UIDS for element_id, _, _, _ in _elements(fp, start, end))
+
+
+def _read_simple_tag(fp: BinaryIO, start: int, end: int, tags: Dict[str, str]):
+    name = value = None
+    for element_id, _, data_start, data_end in _elements(fp, start, end):
+        if data_end is None:
+            break
+        if element_id in (_TAG_NAME, _TAG_STRING):
+            fp.seek(data_start)
+            text = fp.read(data_end - data_start).decode("utf-8", "replace")
+            if element_id == _TAG_NAME:
+                name = text.lower()
+            else:
+                value = text
+
+    if name is not None and value is not None:
+        tags.setdefault(name, value)
+
+
+def _extract_video_metadata(video: VideoFile) -> Optional[Dict[str, Any]]:
+    try:
+        with image_file(video) as fp:  # type: ignore
+            if fp is None:
+                return None
+            if video.format in ("MP4", "MOV"):
+                tags: Dict[str, Any] = read_mp4_tags(fp)
+            else:
+                tags = read_matroska_tags(fp)
+    except (ValueError, OSError, struct.error) as error:
+        raise MetadataError("error reading video metadata") from error
+
+    comment = tags.pop("comment", None)
+    if comment is not None:
+        tags.update(comment_parameters(comment))
+
+    return tags or None
+
+
+def video_metadata(video: VideoFile, _: Generators) -> Optional[Dict[str, Any]]:
+    """read the metadata tags of MP4/MOV and Matroska/WebM videos"""
+    return get_context(video).memoize(video_metadata, lambda: _extract_video_metadata(video))
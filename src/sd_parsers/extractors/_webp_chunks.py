@@ -0,0 +1,62 @@
+"""Low-level access to the RIFF chunks of a WEBP file, without decoding any image data."""
+
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, Tuple
+
+# feature flags of the VP8X chunk
+_ANIMATION_FLAG = 0x02
+
+_CHUNK_HEADER = struct.Struct("<4sI")
+
+
+def is_animated_webp(header: bytes) -> bool:
+    """Check the first 21 bytes of a file for an animated WEBP image."""
+    return (
+        header[:4] == b"RIFF"
+        and header[8:16] == b"WEBPVP8X"
+        and len(header) > 20
+        and bool(header[20] & _ANIMATION_FLAG)
+    )
+
+
+def iter_chunks(fp: BinaryIO) -> Iterator[Tuple[bytes, int]]:
+    """
+    Walk the chunks of a WEBP file, yielding fourcc and data size of each chunk.
+
+    On each iteration the file is positioned at the start of the chunk data;
+    callers may read as much of it as they need, the rest is skipped without being read.
+    The frames of animated images ("ANMF" chunks) are skipped as a whole.
+
+    Raises a ValueError if the file is not a WEBP file.
+    """
+    fp.seek(0)
+    header = fp.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:] != b"WEBP":
+        raise ValueError("not a WEBP file")
+
+    while True:
+        chunk_header = fp.read(_CHUNK_HEADER.size)
+        if len(chunk_header) < _CHUNK_HEADER.size:
+            return
+
+        fourcc, size = _CHUNK_HEADER.unpack(chunk_header)
+        start = fp.tell()
+        yield fourcc, size
+
+        # chunks are padded to an even size
+        fp.seek(start + size + (size & 1))
+
+
+def read_webp_info(fp: BinaryIO) -> Dict[str, Any]:
+    """
+    Read the "EXIF" and "XMP " chunks of a WEBP file.
+
+    Returns them as `image.info` of a WEBP image opened by Pillow would: as "exif" and "xmp".
+    """
+    info = {}
+    for fourcc, size in iter_chunks(fp):
+        if fourcc == b"EXIF":
+            info["exif"] = fp.read(size)
+        elif fourcc == b"XMP ":
+            info["xmp"] = fp.read(size)
+    return info
@@ -0,0 +1,62 @@
+import struct
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+from sd_parsers.exceptions import MetadataError
+
+from ._context import get_context
+from ._exif import ASCII, TiffData, read_webp_exif
+from ._image_file import image_file
+
+# IFD0 text tags used by ComfyUI for "name:value" pairs:
+# the prompt in Model (0x0110), further values downwards from Make (0x010F)
+_PARAMETER_TAGS = range(0x0100, 0x0111)
+
+
+def _read_exif(image: Image.Image) -> Optional[bytes]:
+    exif = image.info.get("exif")
+    if exif is None:
+        with image_file(image) as fp:
+            if fp is None:
+                return None
+            exif = read_webp_exif(fp)
+    return exif
+
+
+def _read_parameters(exif: bytes) -> Dict[str, Any]:
+    tiff = TiffData(exif)
+    parameters = {}
+    for tag, field_type, entry_offset in tiff.entries():
+        if tag not in _PARAMETER_TAGS or field_type != ASCII:
+            continue
+
+        # a broken entry (i.e. of another writer) doesn't invalidate the others
+        try:
+            value = tiff.value(entry_offset)
+        except ValueError:
+            continue
+
+        name, separator, text = value.decode("utf-8", "replace").rstrip("\0").partition(":")
+        if separator and name.isidentifier():
+            parameters.setdefault(name, text)
+    return parameters
+
+
+def _extract_metadata(image: Image.Image) -> Optional[Dict[str, Any]]:
+    try:
+        exif = _read_exif(image)
+        parameters = _read_parameters(exif) if exif else {}
+    except (ValueError, OSError, struct.error) as error:
+        raise MetadataError("error reading EXIF data") from error
+
+    xmp = image.info.get("xmp")
+    if xmp:
+        parameters["xmp"] = xmp.decode("utf-8", "replace") if isinstance(xmp, bytes) else xmp
+
+    return parameters or None
+
+
+def webp_metadata(image: Image.Image, _) -> Optional[Dict[str, Any]]:
+    """read "name:value" pairs from EXIF IFD0 text tags (as written by ComfyUI) and the XMP data"""
+    return get_context(image).memoize(webp_metadata, lambda: _extract_metadata(image))
@@ -1,22 +1,64 @@
 """
 Specialized parser classes for different image generators.
 
-Metadata keys used as "trigger" for the different parsers are:
-    * "parameters" or .jpeg with json data & version == "Fooocus *" -> Fooocus
+Metadata keys used as "trigger" for the different parsers (see `Parser.trigger_keys`) are:
+    * "parameters" or .jpeg with json data -> Fooocus
     * "parameters" or .jpeg -> automatic1111
-    * "prompt" & "workflow" -> comfyui
+    * "prompt" (& "workflow") -> comfyui
     * "invokeai_metadata" or "sd-metadata" or "Dream" -> invokeai
-    * "Description" & "Software" & "Source" & "Comment" -> novelai
+    * "Description" & "Source" & "Comment" -> novelai
 """
 
-from ._automatic1111 import AUTOMATIC1111Parser
-from ._comfyui import ComfyUIParser
-from ._fooocus import FooocusParser
-from ._invokeai import InvokeAIParser
-from ._novelai import NovelAIParser
-from ._parser import Parser
+import importlib as _importlib
+import typing as _typing
+
+if _typing.TYPE_CHECKING:
+    from ._automatic1111 import AUTOMATIC1111Parser
+    from ._comfyui import ComfyUIParser
+    from ._fooocus import FooocusParser
+    from ._invokeai import InvokeAIParser
+    from ._novelai import NovelAIParser
+    from ._parser import Parser
+
+    MANAGED_PARSERS: _typing.List[_typing.Type[Parser]]
+
+# public names, imported from their modules on first access
+_LAZY_ATTRIBUTES = {
+    "Parser": "._parser",
+    "AUTOMATIC1111Parser": "._automatic1111",
+    "ComfyUIParser": "._comfyui",
+    "FooocusParser": "._fooocus",
+    "InvokeAIParser": "._invokeai",
+    "NovelAIParser": "._novelai",
+}
+
+# parsers managed by default, in the order they are tried
+_MANAGED_PARSER_NAMES = (
+    "FooocusParser",
+    "AUTOMATIC1111Parser",
+    "ComfyUIParser",
+    "InvokeAIParser",
+    "NovelAIParser",
+)
+
+
+def __getattr__(name: str) -> _typing.Any:
+    if name == "MANAGED_PARSERS":
+        value = [__getattr__(parser) for parser in _MANAGED_PARSER_NAMES]
+    else:
+        try:
+            module = _LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+        value = getattr(_importlib.import_module(module, __name__), name)
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> _typing.List[str]:
+    return sorted(set(globals()) | set(__all__))
 
-MANAGED_PARSERS = [FooocusParser, AUTOMATIC1111Parser, ComfyUIParser, InvokeAIParser, NovelAIParser]
 
 __all__ = [
     "Parser",
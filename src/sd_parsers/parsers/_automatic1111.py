@@ -1,10 +1,9 @@
 """Parser for images generated by AUTOMATIC1111's stable-diffusion-webui or similar."""
 
-import json
 import re
-from contextlib import suppress
 from typing import Any, Dict
 
+from sd_parsers import _json
 from sd_parsers.data import Generators, Model, Prompt, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -20,6 +19,11 @@ class AUTOMATIC1111Parser(Parser):
 
     generator = Generators.AUTOMATIC1111
 
+    trigger_keys = (frozenset({"parameters"}),)
+
+    def accepts(self, parameters: Dict[str, Any]) -> bool:
+        return isinstance(parameters.get("parameters"), str)
+
     def parse(self, parameters: Dict[str, Any]) -> PromptInfo:
         try:
             lines = parameters["parameters"].split("\n")
@@ -57,7 +61,12 @@ class AUTOMATIC1111Parser(Parser):
 
 
 def _get_sampler_info(lines):
-    for index, line in reversed(list(enumerate(lines))):
+    # the settings line starts with "Steps:"; look for it from the bottom
+    for index in range(len(lines) - 1, -1, -1):
+        line = lines[index]
+        if "Steps:" not in line:
+            continue
+
         metadata = _extract_metadata(line)
         sampler_info = dict(pop_keys(SAMPLER_PARAMS, metadata))
         if len(sampler_info) >= 3:
@@ -66,22 +75,52 @@ def _get_sampler_info(lines):
     raise ParserError("no sampler information found")
 
 
-def _extract_metadata(line: str) -> Dict[str, str]:
-    metadata = {}
-
-    # try to extract hashes
-    match = re.search(r"(?:,\s*)?Hashes:\s*(\{[^\}]*\})\s*", line)
-    if match:
-        with suppress(TypeError, json.JSONDecodeError):
-            metadata["Hashes"] = json.loads(match.group(1))
-        start, end = match.span(0)
-        line = line[:start] + line[end:]
+# key: value pairs separated by commas; values may be quoted strings or JSON objects
+_SETTING = re.compile(
+    r"""
+    \s*(?P<key>[^,:\s](?:[^,:]*[^,:\s])?)\s*:\s*
+    (?:
+        (?P<quoted>"(?:\\.|[^\\"])*")
+      | (?P<object>\{[^{}]*\})
+      | (?P<value>(?:[^,\s]|\s+[^,\s])*)
+    )
+    \s*(?:,|$)
+    """,
+    re.VERBOSE,
+)
+
+
+def _extract_metadata(line: str) -> Dict[str, Any]:
+    metadata: Dict[str, Any] = {}
+
+    # plain settings: no need for the tokenizer
+    if '"' not in line and "{" not in line:
+        for item in line.split(","):
+            key, colon, value = item.partition(":")
+            key = key.strip()
+            if colon and key:
+                metadata[key] = value.strip()
+        return metadata
+
+    position, end = 0, len(line)
+    while position < end:
+        match = _SETTING.match(line, position)
+        if match is None:
+            # not a setting: skip to the next item
+            position = line.find(",", position) + 1 or end
+            continue
+
+        position = match.end()
+        key, quoted, json_object, value = match.groups()
+
+        if value is not None:
+            metadata[key] = value
+            continue
 
-    for item in line.split(","):
+        # i.e. 'Lora hashes: "a: 1, b: 2"' or 'Hashes: {"vae": "c6a580b13a"}'
         try:
-            key, value = map(str.strip, item.split(":"))
-            metadata[key] = value
-        except ValueError:
-            pass
+            metadata[key] = _json.loads(quoted or json_object)
+        except (TypeError, _json.JSONDecodeError):
+            metadata[key] = quoted or json_object
 
     return metadata
@@ -2,11 +2,13 @@
 
 import json
 import logging
+import re
 from collections import defaultdict
 from contextlib import suppress
-from typing import Any, Dict, Generator, List, Optional, Set, Tuple
+from typing import Any, Dict, Generator, Iterator, List, Optional, Set, Tuple
 
 
+from sd_parsers import _json
 from sd_parsers.data import Generators, Model, Prompt, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -24,21 +26,138 @@ NEGATIVE_PROMPT_KEYS = ["text", "negative"]
 IGNORE_LINK_TYPES_PROMPT = ["CLIP"]
 IGNORE_CLASS_TYPES = ["ConditioningCombine"]
 
+# separator between a member name and its value
+_MEMBER_VALUE = re.compile(r"\s*:\s*")
+
+# JSON string, including escaped characters
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+_Trace = Optional[Tuple[str, "_Trace"]]
+"""A path through the node graph, as a linked list of node ids (last node first)."""
+
+
+def _unwind(trace: _Trace) -> List[str]:
+    """Return the node ids of a path through the node graph, from its first node on."""
+    node_ids = []
+    while trace is not None:
+        node_id, trace = trace
+        node_ids.append(node_id)
+    node_ids.reverse()
+    return node_ids
+
+
+def _find_member(text: str, key: str) -> Optional[int]:
+    """
+    Find the position of the value stored as `key` in the top level object of a JSON string.
+
+    The text is searched from its end, as top level members usually follow the nested ones.
+    """
+    quoted_key = f'"{key}"'
+    depth = 0
+    end = len(text)
+    position = text.rfind(quoted_key)
+
+    while position >= 0:
+        # quotes inside of strings are escaped
+        backslashes = 0
+        while text[position - backslashes - 1 : position - backslashes] == "\\":
+            backslashes += 1
+
+        match = _MEMBER_VALUE.match(text, position + len(quoted_key))
+        if match and backslashes % 2 == 0:
+            # nesting depth of the member, skipping brackets inside of strings
+            segment = _STRING.sub("", text[position:end])
+            depth += segment.count("}") + segment.count("]")
+            depth -= segment.count("{") + segment.count("[")
+            end = position
+
+            if depth == 1:
+                return match.end()
+
+        position = text.rfind(quoted_key, 0, position)
+
+    return None
+
+
+def _decode_workflow(workflow: str) -> Dict[str, Any]:
+    """
+    Decode the parts of the workflow needed by the parser: the "links" array.
+
+    Only the links array is decoded, skipping the (usually much larger) node layout data.
+    Falls back to decoding the whole workflow if the top level links can not be read.
+    """
+    if isinstance(workflow, str):
+        # node outputs and subgraphs contain "links" as well, only the top level ones are used
+        position = _find_member(workflow, "links")
+        if position is not None:
+            try:
+                links, _ = json.JSONDecoder().raw_decode(workflow, position)
+            except json.JSONDecodeError:
+                links = None
+
+            # [link_id, output_id, output_slot, input_id, input_slot, link_type]
+            if isinstance(links, list) and all(
+                isinstance(link, list) and len(link) == 6 for link in links
+            ):
+                return {"links": links}
+
+    return _json.loads(workflow)
+
+
+def _is_link(value: Any) -> bool:
+    """Check if a node input value is a reference to another node's output."""
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], (str, int))
+        and isinstance(value[1], int)
+        and not isinstance(value[1], bool)
+    )
+
 
 class ComfyUIParser(Parser):
     """Parser for images generated by ComfyUI"""
 
     generator = Generators.COMFYUI
 
+    trigger_keys = (frozenset({"prompt"}),)
+
+    def __init__(
+        self,
+        normalize_parameters: bool = True,
+        debug: bool = False,
+        links_from_prompt: bool = False,
+    ):
+        """
+        Optional Parameters:
+            links_from_prompt: Build the node links from the input references of the prompt,
+                without decoding the workflow. Saves decoding the (usually much larger) workflow,
+                but prompts reached through nodes with multiple inputs may be listed
+                in a different order. Images without a workflow always use the prompt.
+        """
+        super().__init__(normalize_parameters, debug)
+        self.links_from_prompt = links_from_prompt
+
+    def accepts(self, parameters: Dict[str, Any]) -> bool:
+        # the prompt is stored as JSON object of nodes with a class_type
+        prompt = parameters.get("prompt")
+        if isinstance(prompt, dict):
+            return any(isinstance(node, dict) and "class_type" in node for node in prompt.values())
+        if isinstance(prompt, str):
+            return prompt.lstrip()[:1] == "{" and '"class_type"' in prompt
+        if isinstance(prompt, bytes):
+            return prompt.lstrip()[:1] == b"{" and b'"class_type"' in prompt
+        return False
+
     def parse(self, parameters: Dict[str, Any]) -> PromptInfo:
         try:
             prompt = parameters["prompt"]
             if not isinstance(prompt, dict):
-                prompt = json.loads(prompt)
+                prompt = _json.loads(prompt)
 
-            workflow = parameters["workflow"]
-            if not isinstance(workflow, dict):
-                workflow = json.loads(workflow)
+            workflow = None if self.links_from_prompt else parameters.get("workflow")
+            if workflow is not None and not isinstance(workflow, dict):
+                workflow = _decode_workflow(workflow)
         except Exception as error:
             raise ParserError("error reading parameters") from error
 
@@ -51,16 +170,25 @@ class _ImageContext:
     parser: ComfyUIParser
     prompt: Dict[str, Dict[str, Any]]
     links: Dict[str, Dict[str, Set[str]]]
+    sampler_candidates: List[str]
     processed_nodes: Set[str]
+    models: Dict[str, Optional[Model]]
+    prompts: Dict[Tuple[str, Tuple[str, ...]], List[Prompt]]
 
     @property
     def _debug(self):
         return self.parser._debug
 
-    def __init__(self, parser: ComfyUIParser, prompt: Dict, workflow: Dict):
+    def __init__(self, parser: ComfyUIParser, prompt: Dict, workflow: Optional[Dict]):
         self.parser = parser
         self.processed_nodes = set()
 
+        # models and prompts found upstream of a node, shared by all samplers using them
+        # (keyed by the node a sampler links to: shared chains reached through different
+        # nodes are walked again, as the path taken ends up in the metadata of the results)
+        self.models = {}
+        self.prompts = {}
+
         # ensure that prompt keys are strings
         try:
             self.prompt = {str(k): v for k, v in prompt.items()}
@@ -69,15 +197,44 @@ class _ImageContext:
 
         # build links dictionary (dict[input_id, dict[output_id, set[link_type]]])
         self.links = defaultdict(lambda: defaultdict(set))
-        try:
-            for _, output_id, _, input_id, _, link_type in workflow["links"]:
-                self.links[str(input_id)][str(output_id)].add(link_type)
-        except (TypeError, KeyError, ValueError) as error:
-            raise ParserError("workflow has unexpected format") from error
+        if workflow is None:
+            self._links_from_prompt()
+        else:
+            try:
+                for _, output_id, _, input_id, _, link_type in workflow["links"]:
+                    self.links[str(input_id)][str(output_id)].add(link_type)
+            except (TypeError, KeyError, ValueError) as error:
+                raise ParserError("workflow has unexpected format") from error
+
+        # nodes that might contain sampler data, in prompt order
+        self.sampler_candidates = []
+        for node_id, node in self.prompt.items():
+            try:
+                if node["class_type"] in SAMPLER_TYPES or SAMPLER_PARAMS.issubset(node["inputs"]):
+                    self.sampler_candidates.append(node_id)
+            except (KeyError, TypeError):
+                continue
+
+    def _links_from_prompt(self):
+        """
+        Build the links dictionary from the `[node_id, slot]` input references of the prompt.
+
+        The prompt does not contain link types: these are inferred from the input names
+        (i.e. "CLIP" for "clip" inputs).
+        """
+        for input_id, node in self.prompt.items():
+            try:
+                inputs = node["inputs"].items()
+            except (KeyError, TypeError, AttributeError):
+                continue
+
+            for input_name, value in inputs:
+                if _is_link(value):
+                    self.links[input_id][str(value[0])].add(input_name.upper())
 
     @classmethod
     def extract(
-        cls, parser: ComfyUIParser, prompt: Dict, workflow: Dict
+        cls, parser: ComfyUIParser, prompt: Dict, workflow: Optional[Dict]
     ) -> Tuple[List[Sampler], Dict[str, List[Dict[str, Any]]]]:
         """Extract samplers with their child parameters aswell as metadata"""
         context = cls(parser, prompt, workflow)
@@ -85,8 +242,8 @@ class _ImageContext:
         metadata = defaultdict(list)
 
         # Pass 1: get samplers and related data
-        for node_id, node in context.prompt.items():
-            sampler = context._try_get_sampler(node_id, node)
+        for node_id in context.sampler_candidates:
+            sampler = context._try_get_sampler(node_id, context.prompt[node_id])
             if sampler:
                 samplers.append(sampler)
 
@@ -178,7 +335,14 @@ class _ImageContext:
         return Sampler(**sampler)
 
     def _get_model(self, initial_node_id: str) -> Optional[Model]:
-        """Get the first model reached from the given node_id"""
+        """Get the first model reached from the given node_id, walking upstream once per node_id"""
+        try:
+            return self.models[initial_node_id]
+        except KeyError:
+            model = self.models[initial_node_id] = self._find_model(initial_node_id)
+            return model
+
+    def _find_model(self, initial_node_id: str) -> Optional[Model]:
         if self._debug:
             logger.debug("looking for model: #%s", initial_node_id)
 
@@ -196,7 +360,7 @@ class _ImageContext:
                     logger.debug("found model #%s: %s", node_id, ckpt_name)
 
                 metadata = self._get_input_values(inputs)
-                metadata.update(self._get_trace_metadata(trace))
+                metadata.update(self._get_trace_metadata(_unwind(trace)))
 
                 model = Model(model_id=node_id, name=ckpt_name, metadata=metadata)
                 return model
@@ -204,14 +368,23 @@ class _ImageContext:
         return None
 
     def _get_prompts(self, initial_node_id: str, text_keys: List[str]) -> List[Prompt]:
-        """Get all prompts reachable from a given node_id."""
+        """Get all prompts reachable from a given node_id, walking upstream once per node_id."""
+        key = (initial_node_id, tuple(text_keys))
+        try:
+            prompts = self.prompts[key]
+        except KeyError:
+            prompts = self.prompts[key] = self._find_prompts(initial_node_id, text_keys)
+        return list(prompts)
+
+    def _find_prompts(self, initial_node_id: str, text_keys: List[str]) -> List[Prompt]:
         if self._debug:
             logger.debug("looking for prompts: %s", initial_node_id)
 
         prompts = []
 
-        def check_inputs(node_id: str, inputs: Dict, trace: List[str]) -> bool:
+        def check_inputs(node_id: str, inputs: Dict, trace: _Trace) -> bool:
             found_prompt = False
+            trace_ids = None
             for key in text_keys:
                 try:
                     text = inputs.pop(key)
@@ -222,8 +395,11 @@ class _ImageContext:
                     if self._debug:
                         logger.debug("found prompt %s#%s: %s", key, node_id, text)
 
+                    if trace_ids is None:
+                        trace_ids = _unwind(trace)
+
                     metadata = self._get_input_values(inputs)
-                    metadata.update(self._get_trace_metadata(trace))
+                    metadata.update(self._get_trace_metadata(trace_ids))
 
                     prompts.append(
                         Prompt(
@@ -235,7 +411,7 @@ class _ImageContext:
                     found_prompt = True
 
             if found_prompt:
-                self.processed_nodes.update([node_id], trace)
+                self.processed_nodes.update([node_id], trace_ids)  # type: ignore
                 return False
             return True
 
@@ -257,29 +433,48 @@ class _ImageContext:
 
     def _traverse(
         self, node_id: str, ignored_link_types: Optional[List[str]] = None
-    ) -> Generator[Tuple[str, Any, List[str]], Optional[bool], None]:
-        """Traverse backwards through node tree, starting at a given node_id"""
+    ) -> Generator[Tuple[str, Any, _Trace], Optional[bool], None]:
+        """
+        Traverse backwards through node tree, starting at a given node_id.
+
+        Yields the visited nodes in depth-first order, along with the path leading to them.
+        Sending False skips the inputs of the current node.
+        """
         visited = set()
         ignore_links = set(ignored_link_types) if ignored_link_types else set()
 
-        def traverse_inner(node_id: str, trace: List[str]):
-            visited.add(node_id)
+        # the nodes on the current path, with iterators over their remaining inputs
+        stack: List[Tuple[Tuple[str, _Trace], Iterator[Tuple[str, Set[str]]]]] = []
+        next_node: Optional[Tuple[str, _Trace]] = (node_id, None)
 
-            with suppress(KeyError):
-                recurse = yield node_id, self.prompt[node_id], trace[:-1]
-                if recurse is False:
-                    return
-
-            with suppress(KeyError, RecursionError):
-                for link_id, link_types in self.links[node_id].items():
-                    if link_id not in visited and link_types - ignore_links:
-                        if self._debug:
-                            logger.debug(
-                                "%s->%s, %s%s", node_id, link_id, "." * len(trace), link_types
-                            )
-                        yield from traverse_inner(link_id, trace + [link_id])
-
-        yield from traverse_inner(node_id, [node_id])
+        while True:
+            if next_node is not None:
+                node_id, parent = next_node
+                visited.add(node_id)
+
+                recurse = None
+                with suppress(KeyError):
+                    recurse = yield node_id, self.prompt[node_id], parent
+
+                if recurse is not False:
+                    stack.append(((node_id, parent), iter(self.links[node_id].items())))
+
+            if not stack:
+                return
+
+            trace, inputs = stack[-1]
+            next_node = None
+
+            for link_id, link_types in inputs:
+                if link_id not in visited and link_types - ignore_links:
+                    if self._debug:
+                        logger.debug(
+                            "%s->%s, %s%s", trace[0], link_id, "." * len(stack), link_types
+                        )
+                    next_node = (link_id, trace)
+                    break
+            else:
+                stack.pop()
 
     def _get_trace_metadata(self, trace: List[str]):
         metadata = {}
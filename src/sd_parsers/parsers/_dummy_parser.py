@@ -15,6 +15,9 @@ class DummyParser(Parser):
 
     generator = Generators.UNKNOWN
 
+    # metadata keys needed by this parser; the ParserManager skips the parser for other metadata
+    trigger_keys = (frozenset({"sampler name"}),)
+
     def parse(self, parameters: Dict[str, Any]) -> PromptInfo:
         """
         Process the generation parameters returned by `read_parameters()`.
@@ -1,8 +1,8 @@
 """Parser for images generated by AUTOMATIC1111's stable-diffusion-webui or similar."""
 
-import json
 from typing import Any, Dict
 
+from sd_parsers import _json
 from sd_parsers.data import Generators, Model, Prompt, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -18,10 +18,17 @@ class FooocusParser(Parser):
 
     generator = Generators.FOOOCUS
 
+    trigger_keys = (frozenset({"parameters"}),)
+
+    def accepts(self, parameters: Dict[str, Any]) -> bool:
+        # Fooocus stores its parameters as JSON object
+        value = parameters.get("parameters")
+        return isinstance(value, (str, bytes)) and value.lstrip()[:1] in ("{", b"{")
+
     def parse(self, _parameters: Dict[str, Any]) -> PromptInfo:
         try:
-            parameters = json.loads(_parameters["parameters"])
-        except (KeyError, TypeError, json.JSONDecodeError) as error:
+            parameters = _json.loads(_parameters["parameters"])
+        except (KeyError, TypeError, _json.JSONDecodeError) as error:
             raise ParserError("error decoding parameter data") from error
 
         try:
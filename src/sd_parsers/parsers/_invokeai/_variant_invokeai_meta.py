@@ -2,10 +2,10 @@
 
 from __future__ import annotations
 
-import json
 from contextlib import suppress
 from typing import Any, Dict, TYPE_CHECKING
 
+from sd_parsers import _json
 from sd_parsers.data import Model, Prompt, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -19,8 +19,8 @@ def _parse_invokeai_meta(parser: InvokeAIParser, parameters: Dict[str, Any]) ->
     """Read generation parameters from the newest InvokeAI metadata format."""
 
     try:
-        metadata = json.loads(parameters["invokeai_metadata"])
-    except (KeyError, TypeError, json.JSONDecodeError) as error:
+        metadata = _json.loads(parameters["invokeai_metadata"])
+    except (KeyError, TypeError, _json.JSONDecodeError) as error:
         raise ParserError("error reading metadata") from error
 
     # sampler
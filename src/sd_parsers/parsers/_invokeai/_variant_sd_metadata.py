@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-import json
 from typing import Any, Dict, TYPE_CHECKING
 
+from sd_parsers import _json
 from sd_parsers.data import Model, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -18,8 +18,8 @@ def _parse_sd_metadata(parser: InvokeAIParser, parameters: Dict[str, Any]) -> Pr
     """Read generation parameters for an image containing a `sd-metadata` field."""
 
     try:
-        metadata = json.loads(parameters["sd-metadata"])
-    except (KeyError, TypeError, json.JSONDecodeError) as error:
+        metadata = _json.loads(parameters["sd-metadata"])
+    except (KeyError, TypeError, _json.JSONDecodeError) as error:
         raise ParserError("error reading metadata") from error
 
     try:
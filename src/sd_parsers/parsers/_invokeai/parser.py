@@ -49,6 +49,12 @@ class InvokeAIParser(Parser):
 
     generator = Generators.INVOKEAI
 
+    trigger_keys = (
+        frozenset({"sd-metadata"}),
+        frozenset({"Dream"}),
+        frozenset({"invokeai_metadata"}),
+    )
+
     def parse(self, metadata: Dict[str, Any]) -> PromptInfo:
         for variant in VARIANT_PARSERS:
             try:
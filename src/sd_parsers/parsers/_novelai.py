@@ -1,10 +1,10 @@
 """Parser for images generated by NovelAI or similar."""
 
-import json
 import re
 from contextlib import suppress
 from typing import Any, Dict
 
+from sd_parsers import _json
 from sd_parsers.data import Generators, Model, Prompt, Sampler, PromptInfo
 from sd_parsers.exceptions import ParserError
 
@@ -19,9 +19,11 @@ class NovelAIParser(Parser):
 
     generator = Generators.NOVELAI
 
+    trigger_keys = (frozenset({"Comment", "Description", "Source"}),)
+
     def parse(self, parameters: Dict[str, Any]) -> PromptInfo:
         try:
-            metadata = json.loads(parameters["Comment"])
+            metadata = _json.loads(parameters["Comment"])
             params = parameters["Description"]
             source = parameters["Source"]
         except Exception as error:
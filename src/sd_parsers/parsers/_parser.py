@@ -4,8 +4,9 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from contextlib import suppress
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
 
+from sd_parsers._instrumentation import timed_stage
 from sd_parsers.data import Generators, PromptInfo
 
 FormatField = Tuple[str, Tuple[List[str], str]]
@@ -24,14 +25,33 @@ class Parser(ABC):
 
     generator = Generators.UNKNOWN
 
+    trigger_keys: Tuple[FrozenSet[str], ...] = ()
+    """
+    Metadata keys this parser depends on.
+
+    The parser is only tried on metadata containing all keys of at least one of the given sets.
+    If empty, the parser is tried on any metadata.
+    """
+
     def __init__(self, normalize_parameters: bool = True, debug: bool = False):
         self.do_normalization_pass = normalize_parameters
         self._debug = debug
 
+    def accepts(self, parameters: Dict[str, Any]) -> bool:
+        """
+        Cheaply check if the given metadata might be parseable by this parser.
+
+        Returning False skips `parse()` for this metadata.
+        """
+        if not self.trigger_keys:
+            return True
+        return any(all(key in parameters for key in keys) for keys in self.trigger_keys)
+
     @abstractmethod
     def parse(self, parameters: Dict[str, Any]) -> PromptInfo:
         """Extract image generation information from the image metadata."""
 
+    @timed_stage("normalize")
     def normalize_parameters(
         self,
         parameters: Union[Dict[str, Any], Iterable[Tuple[str, Any]]],
@@ -77,3 +77,27 @@ def test_hashes():
         "Size": "512x400",
         "Hashes": {"model": "c0d1994c73", "vae": "c6a580b13a"},
     }
+
+
+def test_quoted_values():
+    parameters = (
+        "photo of a duck, Steps: 3\nSteps: 15, Sampler: UniPC, CFG scale: 5, Seed: 235284042, "
+        'Lora hashes: "duck: 0123456789ab, pond: ba9876543210", '
+        'ADetailer prompt: "a duck, \\"quacking\\"", Template: {"a": 1}, Version: v1.9.0'
+    )
+
+    info_index, sampler_info, metadata = _automatic1111._get_sampler_info(parameters.split("\n"))
+
+    assert info_index == 1
+    assert sampler_info == {
+        "CFG scale": "5",
+        "Sampler": "UniPC",
+        "Seed": "235284042",
+        "Steps": "15",
+    }
+    assert metadata == {
+        "Lora hashes": "duck: 0123456789ab, pond: ba9876543210",
+        "ADetailer prompt": 'a duck, "quacking"',
+        "Template": {"a": 1},
+        "Version": "v1.9.0",
+    }
@@ -0,0 +1,18 @@
+import json
+
+from benchmarks.__main__ import main
+
+
+def test_benchmarks(tmp_path):
+    output = tmp_path / "results.json"
+
+    arguments = ["-k", "eagerness/FAST", "-k", "synthetic/comfyui/10_", "--scale", "0.01"]
+    exit_code = main(arguments + ["--min-time", "0", "-o", str(output)])
+
+    assert exit_code == 0
+    results = json.loads(output.read_text(encoding="utf-8"))
+    assert results["environment"]["python"]
+    assert set(results["results"]) == {"eagerness/FAST", "synthetic/comfyui/10_nodes"}
+    for result in results["results"].values():
+        assert result["rounds"] >= 3
+        assert result["median"] > 0
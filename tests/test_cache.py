@@ -0,0 +1,146 @@
+import os
+import pickle
+import shutil
+
+import pytest
+from PIL import Image, PngImagePlugin
+from sd_parsers import ParseCache, ParserManager
+from sd_parsers.extractors import Eagerness
+
+from tests.tools import RESOURCE_PATH
+
+IMAGE = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+EMPTY_IMAGE = RESOURCE_PATH / "bad_images" / "empty_image.png"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ParseCache(tmp_path / "cache.sqlite")
+    yield cache
+    cache.close()
+
+
+def _count_parses(monkeypatch, parser_manager):
+    calls = []
+    parse = parser_manager._parse
+
+    def counting_parse(image, *args):
+        calls.append(image)
+        return parse(image, *args)
+
+    monkeypatch.setattr(parser_manager, "_parse", counting_parse)
+    return calls
+
+
+def test_cache_hit(cache, monkeypatch):
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    first = parser_manager.parse(IMAGE)
+    second = parser_manager.parse(str(IMAGE))
+
+    assert first is not None
+    assert second == first
+    assert len(calls) == 1
+
+
+def test_cache_hit_itxt(cache, monkeypatch, tmp_path):
+    # Pillow reads iTXt chunks as PngImagePlugin.iTXt, a subclass of str
+    with Image.open(IMAGE) as image:
+        pnginfo = PngImagePlugin.PngInfo()
+        pnginfo.add_itxt("parameters", image.info["parameters"])
+        image.save(tmp_path / "itxt.png", pnginfo=pnginfo)
+
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    first = parser_manager.parse(tmp_path / "itxt.png")
+    assert isinstance(first.raw_parameters["parameters"], PngImagePlugin.iTXt)
+    assert parser_manager.parse(tmp_path / "itxt.png") == first
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize(
+    "stored",
+    [
+        pytest.param(b"not a pickle", id="corrupted"),
+        pytest.param(pickle.dumps(os.system), id="unexpected_global"),
+    ],
+)
+def test_cache_unreadable_entry(cache, monkeypatch, stored):
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    first = parser_manager.parse(IMAGE)
+    with cache._connection as connection:
+        connection.execute("UPDATE results SET result = ?", (stored,))
+
+    # parsed again, replacing the entry
+    assert parser_manager.parse(IMAGE) == first
+    assert parser_manager.parse(IMAGE) == first
+    assert len(calls) == 2
+
+
+def test_cache_eagerness(cache, monkeypatch):
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    # results found with lower effort are valid for higher eagerness levels
+    assert parser_manager.parse(IMAGE, Eagerness.FAST) is not None
+    assert parser_manager.parse(IMAGE, Eagerness.EAGER) is not None
+    assert len(calls) == 1
+
+    # negative results only for lower eagerness levels
+    assert parser_manager.parse(EMPTY_IMAGE, Eagerness.DEFAULT) is None
+    assert parser_manager.parse(EMPTY_IMAGE, Eagerness.FAST) is None
+    assert len(calls) == 2
+    assert parser_manager.parse(EMPTY_IMAGE, Eagerness.EAGER) is None
+    assert parser_manager.parse(EMPTY_IMAGE, Eagerness.DEFAULT) is None
+    assert len(calls) == 3
+
+
+def test_cache_invalidation(cache, monkeypatch, tmp_path):
+    image = tmp_path / "image.png"
+    shutil.copy(IMAGE, image)
+
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    parser_manager.parse(image)
+    stat = image.stat()
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    parser_manager.parse(image)
+    assert len(calls) == 2
+
+    # different parser setup or package version
+    other_manager = ParserManager(cache=cache, normalize_parameters=False)
+    other_calls = _count_parses(monkeypatch, other_manager)
+    other_manager.parse(image)
+    assert len(other_calls) == 1
+
+    cache.version = "0.0.0"
+    parser_manager.parse(image)
+    assert len(calls) == 3
+
+
+def test_cache_content_hash(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path / "cache.sqlite", content_hash=True)
+    parser_manager = ParserManager(cache=cache)
+    calls = _count_parses(monkeypatch, parser_manager)
+
+    copied = tmp_path / "copied.png"
+    shutil.copy(IMAGE, copied)
+
+    assert parser_manager.parse(IMAGE) == parser_manager.parse(copied)
+    assert len(calls) == 1
+    cache.close()
+
+
+def test_cache_parse_many(cache):
+    parser_manager = ParserManager(cache=cache)
+    sources = sorted((RESOURCE_PATH / "parsers").rglob("*.png"))
+
+    results = list(parser_manager.parse_many(sources, workers=2, executor="process"))
+
+    for source, result in results:
+        assert cache.get(str(source), Eagerness.DEFAULT, parser_manager._cache_config) == result
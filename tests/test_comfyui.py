@@ -1,10 +1,15 @@
 # example image sources:
 # https://github.com/comfyanonymous/ComfyUI_examples
 
+import io
+import json
+
 import pytest
 from PIL import Image
+from sd_parsers import ParserManager
 from sd_parsers.data import Generators
 from sd_parsers.parsers import ComfyUIParser
+from sd_parsers.parsers._comfyui import _ImageContext, _decode_workflow
 from sd_parsers.extractors import METADATA_EXTRACTORS, Eagerness
 
 from tests.resources.parsers.ComfyUI import (
@@ -13,6 +18,8 @@ from tests.resources.parsers.ComfyUI import (
     WanVideoWrapper,
 )
 from tests.tools import RESOURCE_PATH
+from tests.tools.animation import animated_gif, animated_png, animated_webp
+from tests.tools.video import mp4_file, webm_file
 
 testdata = [
     img2img_cropped.PARAM,
@@ -50,3 +57,178 @@ def test_parse_WanVideo(parameters: dict, expected):
 
     assert prompt_info.generator == Generators.COMFYUI
     assert prompt_info.samplers == expected
+
+
+@pytest.mark.parametrize("video_file", [mp4_file, webm_file])
+@pytest.mark.parametrize("parameters, expected", testdata_wanvideo)
+def test_parse_video(video_file, parameters: dict, expected):
+    video = video_file({"comment": json.dumps(parameters)}, payload_size=1_000_000)
+    records = []
+
+    prompt_info = ParserManager(instrument=records.append).parse(io.BytesIO(video))
+
+    assert prompt_info is not None
+    assert prompt_info.generator == Generators.COMFYUI
+    assert prompt_info.samplers == expected
+
+    # the video data is skipped
+    assert records[0].bytes_read < 10_000
+
+
+@pytest.mark.parametrize("animated_image", [animated_webp, animated_png, animated_gif])
+@pytest.mark.parametrize("parameters, expected", testdata_wanvideo)
+def test_parse_animation(animated_image, parameters: dict, expected):
+    data = animated_image(parameters, frame_count=50)
+    records = []
+
+    prompt_info = ParserManager(instrument=records.append).parse(io.BytesIO(data))
+
+    assert prompt_info is not None
+    assert prompt_info.generator == Generators.COMFYUI
+    assert prompt_info.samplers == expected
+
+    # the frames are skipped
+    assert records[0].bytes_read < 10_000
+
+
+def test_parse_deep_graph():
+    chain_length = 5000
+    prompt = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.ckpt"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "a prompt", "clip": ["1", 1]}},
+    }
+    links = [[1, 1, 1, 2, 0, "CLIP"]]
+
+    for node_id in range(3, chain_length + 3):
+        inputs = {"strength": 1.0, "conditioning": [str(node_id - 1), 0]}
+        prompt[str(node_id)] = {"class_type": "ConditioningSetAreaStrength", "inputs": inputs}
+        links.append([len(links) + 1, node_id - 1, 0, node_id, 0, "CONDITIONING"])
+
+    prompt["0"] = {
+        "class_type": "KSampler",
+        "inputs": {
+            "sampler_name": "euler",
+            "steps": 20,
+            "cfg": 7.0,
+            "model": ["1", 0],
+            "positive": [str(chain_length + 2), 0],
+        },
+    }
+    links += [
+        [len(links) + 1, 1, 0, 0, 0, "MODEL"],
+        [len(links) + 2, chain_length + 2, 0, 0, 1, "CONDITIONING"],
+    ]
+
+    prompt_info = ComfyUIParser().parse({"prompt": prompt, "workflow": {"links": links}})
+
+    (sampler,) = prompt_info.samplers
+    assert sampler.model and sampler.model.name == "model.ckpt"
+    (prompt,) = sampler.prompts
+    assert prompt.value == "a prompt"
+    assert len(prompt.metadata["ConditioningSetAreaStrength"]) == chain_length
+    assert not prompt_info.metadata
+
+
+def test_shared_subgraphs(monkeypatch):
+    prompt = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.ckpt"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "a prompt", "clip": ["1", 1]}},
+    }
+    links = [[1, 1, 1, 2, 0, "CLIP"]]
+    for node_id in ("3", "4"):
+        prompt[node_id] = {
+            "class_type": "KSampler",
+            "inputs": {
+                "sampler_name": "euler",
+                "steps": 20,
+                "cfg": 7.0,
+                "model": ["1", 0],
+                "positive": ["2", 0],
+            },
+        }
+        links += [
+            [len(links) + 1, 1, 0, int(node_id), 0, "MODEL"],
+            [len(links) + 2, 2, 0, int(node_id), 1, "CONDITIONING"],
+        ]
+
+    traversals = []
+    traverse = _ImageContext._traverse
+    monkeypatch.setattr(
+        _ImageContext,
+        "_traverse",
+        lambda self, *args: traversals.append(args) or traverse(self, *args),
+    )
+
+    prompt_info = ComfyUIParser().parse({"prompt": prompt, "workflow": {"links": links}})
+
+    first, second = prompt_info.samplers
+    assert first.model is second.model
+    assert first.prompts == second.prompts and first.prompts[0] is second.prompts[0]
+    assert first.prompts is not second.prompts
+    assert len(traversals) == 2
+
+
+@pytest.mark.parametrize("filename, expected", testdata)
+def test_parse_prompt_links(filename: str, expected):
+    expected_samplers, expected_metadata = expected
+
+    with Image.open(RESOURCE_PATH / "parsers/ComfyUI" / filename) as image:
+        params = METADATA_EXTRACTORS["PNG"][Eagerness.FAST][0](image, ComfyUIParser.generator)
+        assert params
+
+    # links are taken from the prompt; the workflow is not read
+    parser = ComfyUIParser(links_from_prompt=True)
+    prompt_info = parser.parse({**params, "workflow": "not decoded"})
+
+    # prompts might be found in a different order
+    assert len(prompt_info.samplers) == len(expected_samplers)
+    for sampler, expected_sampler in zip(prompt_info.samplers, expected_samplers):
+        assert sampler.model == expected_sampler.model
+        assert set(sampler.prompts) == set(expected_sampler.prompts)
+        assert set(sampler.negative_prompts) == set(expected_sampler.negative_prompts)
+    assert prompt_info.metadata == expected_metadata
+
+    # images without a workflow
+    assert ComfyUIParser().parse({"prompt": params["prompt"]}).samplers == prompt_info.samplers
+
+
+def test_parser_manager_prompt_links():
+    (parser,) = ParserManager(
+        managed_parsers=[ComfyUIParser], comfyui_links_from_prompt=True
+    ).managed_parsers
+    assert isinstance(parser, ComfyUIParser) and parser.links_from_prompt
+
+    # the option is not shared between managers
+    (parser,) = ParserManager(managed_parsers=[ComfyUIParser]).managed_parsers
+    assert not parser.links_from_prompt
+
+
+@pytest.mark.parametrize(
+    "workflow",
+    [
+        # links of node outputs and subgraph definitions are skipped
+        '{"nodes": [{"outputs": [{"links": [1, 2]}]}], "links": [[1, 1, 0, 2, 0, "MODEL"]],'
+        ' "definitions": {"subgraphs": [{"links": [{"id": 1}]}]}}',
+        # nested links, or links inside of strings
+        '{"nodes": [{"properties": {"links": [[1, 2, 3, 4, 5, "X"]]}}],'
+        ' "links": [[1, 1, 0, 2, 0, "MODEL"]]}',
+        '{"nodes": [{"properties": {"links": [[1, 2, 3, 4, 5, "X"]]}}], "links": []}',
+        '{"nodes": [{"properties": {"links": [[1, 2, 3, 4, 5, "X"]]}}]}',
+        '{"links": [], "nodes": [{"properties": {"links": [[1, 2, 3, 4, 5, "X"]]}}]}',
+        '{"nodes": [{"widgets_values": ["\\"links\\": [[1, 2, 3, 4, 5, 6]]"]}], "links": []}',
+        '{"nodes": [{"widgets_values": ["{\\"", "[", "\\\\"]}], "links": []}',
+        # not readable: decode the whole workflow
+        '{"links": [[1, 1, 0, 2, 0, "MODEL"], [2, 1, 1, 2, 1]]}',
+        '{"links": null}',
+    ],
+)
+def test_decode_workflow(workflow):
+    assert _decode_workflow(workflow).get("links") == json.loads(workflow).get("links")
+
+
+def test_decode_workflow_resources():
+    for filename in (RESOURCE_PATH / "parsers/ComfyUI").glob("*.png"):
+        with Image.open(filename) as image:
+            workflow = image.info["workflow"]
+
+        assert _decode_workflow(workflow) == {"links": json.loads(workflow)["links"]}
@@ -0,0 +1,52 @@
+import copy
+import pickle
+import weakref
+from dataclasses import FrozenInstanceError
+
+import pytest
+from sd_parsers.data import Generators, Model, Prompt, PromptInfo, Sampler
+
+PROMPT = Prompt("a duck", prompt_id="1", metadata={"weight": 1.2})
+MODEL = Model(name="realistic_realisticVisionV20_v20", hash="c0d1994c73")
+SAMPLER = Sampler(
+    name="UniPC",
+    parameters={"steps": "15"},
+    model=MODEL,
+    prompts=[PROMPT, Prompt("a pond")],
+    negative_prompts=[Prompt("monochrome")],
+)
+PROMPT_INFO = PromptInfo(Generators.AUTOMATIC1111, [SAMPLER], {"Size": "512x400"}, {})
+
+
+@pytest.mark.parametrize("value", [PROMPT, MODEL, SAMPLER, PROMPT_INFO])
+def test_slots(value):
+    assert not hasattr(value, "__dict__")
+    assert pickle.loads(pickle.dumps(value)) == value
+    assert copy.deepcopy(value) == value
+
+
+def test_frozen():
+    with pytest.raises(FrozenInstanceError):
+        PROMPT.value = "a goose"  # type: ignore
+
+
+def test_empty_metadata():
+    prompt = Prompt("a pond")
+    prompt.metadata["weight"] = 1.2
+
+    assert prompt.metadata == {"weight": 1.2}
+    assert Prompt("a pond").metadata == {}
+    assert Model(name="model").metadata == {}
+
+
+@pytest.mark.parametrize("value", [PROMPT, MODEL, SAMPLER, PROMPT_INFO])
+def test_weakref(value):
+    assert weakref.ref(value)() is value
+
+
+def test_prompt_info_properties():
+    assert PROMPT_INFO.prompts == [PROMPT, Prompt("a pond")]
+    assert PROMPT_INFO.negative_prompts == [Prompt("monochrome")]
+    assert PROMPT_INFO.models == {MODEL}
+    assert PROMPT_INFO.full_prompt == "a duck, a pond"
+    assert pickle.loads(pickle.dumps(PROMPT_INFO)).models == {MODEL}
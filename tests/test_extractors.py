@@ -0,0 +1,373 @@
+import io
+import json
+import struct
+
+import pytest
+from PIL import Image, PngImagePlugin
+
+from sd_parsers.data import Generators
+from sd_parsers.exceptions import MetadataError
+from sd_parsers.extractors import (
+    ExtractionContext,
+    _exif,
+    _gif_comments,
+    gif_comment,
+    gif_comment_extensions,
+    _png_stenographic_alpha,
+    _png_text_chunks,
+    jpeg_usercomment,
+    png_stenographic_alpha,
+    png_text_chunks,
+    video_metadata,
+    webp_metadata,
+)
+from sd_parsers.extractors._video import open_video
+
+from tests.tools import RESOURCE_PATH
+from tests.tools.animation import animated_gif, animated_png, animated_webp
+from tests.tools.stealth import embed_stealth
+from tests.tools.video import mp4_file, webm_file
+
+STEALTH_PARAMETERS = "a circle\nNegative prompt: a square\nSteps: 20, Sampler: Euler, CFG scale: 7"
+
+
+@pytest.fixture(params=["numpy", "bytes"])
+def lsb_backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(_png_stenographic_alpha, "_import_numpy", lambda: None)
+    return request.param
+
+
+@pytest.mark.parametrize("size", [(1, 1), (3, 5), (64, 40), (13, 200)])
+def test_pack_lsb(lsb_backend, size):
+    width, height = size
+    alpha = bytes((i * 7 + i // 3) % 256 for i in range(width * height))
+
+    bits = [alpha[row * width + col] & 1 for col in range(width) for row in range(height)]
+    expected = bytes(int("".join(map(str, bits[i : i + 8])), 2) for i in range(0, len(bits) - 7, 8))
+
+    assert _png_stenographic_alpha.pack_lsb(alpha, width, height) == expected
+
+
+@pytest.mark.parametrize("size", [(64, 64), (300, 7)])
+def test_stenographic_alpha(lsb_backend, size):
+    image = embed_stealth(Image.new("RGB", size, "white"), STEALTH_PARAMETERS)
+
+    params = png_stenographic_alpha(image, Generators.AUTOMATIC1111)
+
+    assert params == {"parameters": STEALTH_PARAMETERS}
+
+
+def test_stenographic_alpha_resource(lsb_backend):
+    with Image.open(RESOURCE_PATH / "parsers/AUTOMATIC1111/automatic1111_stealth.png") as image:
+        params = png_stenographic_alpha(image, Generators.AUTOMATIC1111)
+
+    assert params
+    assert params["parameters"].startswith("a circle")
+
+
+def _noisy_image(size):
+    # varying pixel values make the PNG encoder use different scanline filters
+    width, height = size
+    data = bytes((x * 31 + y * 17 + (x * y) % 7) % 256 for y in range(height) for x in range(width))
+    return Image.merge("RGB", [Image.frombytes("L", size, data)] * 3)
+
+
+@pytest.mark.parametrize("size", [(200, 300), (300, 40), (20, 30)])
+def test_stenographic_alpha_probe(tmp_path, size):
+    filename = tmp_path / "stealth.png"
+    embed_stealth(_noisy_image(size), "x").save(filename)
+
+    with Image.open(filename) as image:
+        probed = _png_stenographic_alpha._probe_header(image)
+        assert image.tile, "the probe should not load the image"
+
+        image.load()
+        assert _png_stenographic_alpha._probe_header(image) == probed
+
+    assert probed.startswith(_png_stenographic_alpha.STEALTH_HEADER.encode())
+
+
+def test_stenographic_alpha_statistics(tmp_path):
+    statistics = _png_stenographic_alpha.STEALTH_STATISTICS
+    statistics.reset()
+
+    filename = tmp_path / "plain.png"
+    _noisy_image((64, 64)).convert("RGBA").save(filename)
+    with Image.open(filename) as image:
+        with pytest.raises(MetadataError):
+            png_stenographic_alpha(image, Generators.AUTOMATIC1111)
+
+    image = embed_stealth(_noisy_image((64, 64)), STEALTH_PARAMETERS)
+    assert png_stenographic_alpha(image, Generators.AUTOMATIC1111)
+
+    assert (statistics.probes, statistics.full_decodes, statistics.rejections) == (2, 1, 1)
+
+
+@pytest.mark.parametrize("filter_type", [0, 1, 2, 3, 4])
+def test_unfilter_prefix(filter_type):
+    width, rows = 5, 4
+    stride = 1 + width * 4
+    image_rows = [bytes((x * 13 + y * 101) % 256 for x in range(width * 4)) for y in range(rows)]
+
+    def predict(row, i):
+        left = image_rows[row][i - 4] if i >= 4 else 0
+        up = image_rows[row - 1][i] if row else 0
+        up_left = image_rows[row - 1][i - 4] if row and i >= 4 else 0
+        return [0, left, up, (left + up) >> 1, _png_stenographic_alpha._paeth(left, up, up_left)][
+            filter_type
+        ]
+
+    raw = b"".join(
+        bytes([filter_type])
+        + bytes((image_rows[row][i] - predict(row, i)) % 256 for i in range(width * 4))
+        for row in range(rows)
+    )
+
+    restored = _png_stenographic_alpha._unfilter_prefix(raw, stride, rows, 8)
+
+    assert restored == [row[:8] for row in image_rows]
+
+
+@pytest.mark.parametrize(
+    "filename",
+    [filename for filename in sorted(RESOURCE_PATH.rglob("*.png")) if filename.stat().st_size],
+    ids=lambda filename: filename.name,
+)
+def test_png_text_chunks(filename):
+    with Image.open(filename) as image:
+        text = png_text_chunks(image, Generators.UNKNOWN)
+        assert image.tile, "reading text chunks should not load the image"
+
+        assert text == image.text  # type: ignore
+
+
+def test_png_text_chunks_compressed(tmp_path):
+    pnginfo = PngImagePlugin.PngInfo()
+    pnginfo.add_text("plain", "tEXt value")
+    pnginfo.add_text("compressed", "zTXt value " * 100, zip=True)
+    pnginfo.add_itxt("international", "iTXt välue", lang="de", tkey="übersetzt")
+    pnginfo.add_itxt("international compressed", "iTXt välue " * 100, zip=True)
+
+    filename = tmp_path / "text.png"
+    Image.new("RGB", (4, 4)).save(filename, pnginfo=pnginfo)
+
+    with Image.open(filename) as image:
+        assert png_text_chunks(image, Generators.UNKNOWN) == {
+            "plain": "tEXt value",
+            "compressed": "zTXt value " * 100,
+            "international": "iTXt välue",
+            "international compressed": "iTXt välue " * 100,
+        }
+
+
+def test_png_text_chunks_animated():
+    data = animated_png({"prompt": "{}"}, text_after_frames=True)
+
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.n_frames == 20  # type: ignore
+        assert "prompt" not in image.info
+        assert png_text_chunks(image, Generators.UNKNOWN) == {"prompt": "{}"}
+
+
+USER_COMMENTS = [
+    pytest.param(b"UNICODE\0" + "photo of a dück".encode("utf_16_be"), id="unicode_be"),
+    pytest.param(b"UNICODE\0" + "photo of a dück".encode("utf_16_le"), id="unicode_le"),
+    pytest.param(b"ASCII\0\0\0photo of a d\xc3\xbcck", id="ascii"),
+    pytest.param("photo of a dück".encode("utf-8"), id="no_prefix"),
+]
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "WEBP"])
+@pytest.mark.parametrize("user_comment", USER_COMMENTS)
+@pytest.mark.parametrize("exif_ifd", [True, False], ids=["exif_ifd", "ifd0"])
+def test_jpeg_usercomment(image_format, user_comment, exif_ifd):
+    exif = Image.Exif()
+    if exif_ifd:
+        exif.get_ifd(_exif.EXIF_IFD_POINTER)[_exif.USER_COMMENT] = user_comment
+    else:
+        exif[_exif.USER_COMMENT] = user_comment
+
+    with io.BytesIO() as file:
+        Image.new("RGB", (4, 4)).save(file, image_format, exif=exif)
+
+        with Image.open(file) as image:
+            params = jpeg_usercomment(image, Generators.AUTOMATIC1111)
+
+            assert params == {"parameters": "photo of a dück"}
+            assert _exif.read_exif(file) == _exif.TiffData(image.info["exif"]).data
+
+
+def test_jpeg_usercomment_cjk():
+    # no zero bytes to guess the byte order from: piexif writes big endian in any TIFF byte order
+    comment = b"UNICODE\0" + "猫の写真".encode("utf_16_be")
+    tiff = (
+        b"II*\0"
+        + struct.pack("<IH", 8, 1)
+        + struct.pack("<HHII", _exif.USER_COMMENT, 7, len(comment), 26)
+        + struct.pack("<I", 0)
+        + comment
+    )
+
+    with io.BytesIO() as file:
+        Image.new("RGB", (4, 4)).save(file, "JPEG", exif=_exif.EXIF_HEADER + tiff)
+
+        with Image.open(file) as image:
+            assert jpeg_usercomment(image, Generators.AUTOMATIC1111) == {"parameters": "猫の写真"}
+
+
+def test_jpeg_usercomment_missing():
+    with io.BytesIO() as file:
+        Image.new("RGB", (4, 4)).save(file, "JPEG")
+
+        with Image.open(file) as image:
+            with pytest.raises(MetadataError):
+                jpeg_usercomment(image, Generators.AUTOMATIC1111)
+
+        assert _exif.read_exif(file) is None
+
+
+def test_extraction_context(monkeypatch):
+    reads = []
+    read_text_chunks = _png_text_chunks.read_text_chunks
+    monkeypatch.setattr(
+        _png_text_chunks,
+        "read_text_chunks",
+        lambda fp: reads.append(fp) or read_text_chunks(fp),
+    )
+
+    with Image.open(RESOURCE_PATH / "bad_images/text_after_idat.png") as image:
+        with ExtractionContext(image):
+            first = png_text_chunks(image, Generators.AUTOMATIC1111)
+            second = png_text_chunks(image, Generators.COMFYUI)
+        assert first is second
+        assert len(reads) == 1
+
+        # outside of the context, nothing is shared
+        png_text_chunks(image, Generators.AUTOMATIC1111)
+        assert len(reads) == 2
+
+
+VIDEO_WORKFLOW = {
+    "prompt": {"3": {"class_type": "KSampler", "inputs": {}}},
+    "workflow": {"nodes": []},
+}
+VIDEO_TAGS = {"comment": json.dumps(VIDEO_WORKFLOW), "encoder": "Lavf61.7.100"}
+
+
+@pytest.mark.parametrize(
+    "video, video_format",
+    [
+        pytest.param(mp4_file(VIDEO_TAGS, payload_size=1000), "MP4", id="mp4"),
+        pytest.param(
+            mp4_file(VIDEO_TAGS, payload_size=1000, moov_first=True), "MP4", id="mp4_faststart"
+        ),
+        pytest.param(mp4_file(VIDEO_TAGS, payload_size=1000, layout="mdta"), "MP4", id="mp4_mdta"),
+        pytest.param(mp4_file(VIDEO_TAGS, payload_size=1000, layout="quicktime"), "MOV", id="mov"),
+        pytest.param(webm_file(VIDEO_TAGS, payload_size=1000), "WEBM", id="webm"),
+        pytest.param(
+            webm_file(VIDEO_TAGS, payload_size=1000, seek_head=False), "WEBM", id="webm_no_seek"
+        ),
+        pytest.param(
+            webm_file(VIDEO_TAGS, payload_size=1000, tags_first=True, doc_type="matroska"),
+            "MATROSKA",
+            id="mkv",
+        ),
+    ],
+)
+def test_video_metadata(video, video_format):
+    with open_video(io.BytesIO(video)) as video_file:
+        assert video_file.format == video_format
+        assert video_metadata(video_file, Generators.COMFYUI) == {
+            **VIDEO_WORKFLOW,
+            "encoder": "Lavf61.7.100",
+        }
+
+
+def test_video_metadata_errors():
+    assert open_video(io.BytesIO(b"not a video file")) is None
+
+    # HEIF and AVIF images use the boxes of MP4 files
+    for brand in (b"heic", b"avif"):
+        ftyp = struct.pack(">I4s4sI4s", 20, b"ftyp", brand, 0, b"mif1")
+        assert open_video(io.BytesIO(ftyp + bytes(100))) is None
+
+    with open_video(io.BytesIO(mp4_file({"comment": "a comment"}))) as video_file:
+        assert video_metadata(video_file, Generators.COMFYUI) == {"comment": "a comment"}
+
+    with open_video(io.BytesIO(mp4_file({}))) as video_file:
+        assert video_metadata(video_file, Generators.COMFYUI) is None
+
+    # a box exceeding its parent
+    video = bytearray(mp4_file(VIDEO_TAGS, moov_first=True))
+    video[36:40] = (0xFFFFFF).to_bytes(4, "big")  # size of the first box inside "moov"
+    with open_video(io.BytesIO(video)) as video_file:
+        with pytest.raises(MetadataError):
+            video_metadata(video_file, Generators.COMFYUI)
+
+
+ANIMATION_PARAMETERS = {"prompt": '{"3": {}}', "workflow": '{"nodes": []}'}
+
+
+def test_webp_metadata():
+    data = animated_webp(ANIMATION_PARAMETERS)
+
+    # animated images are read without Pillow
+    with open_video(io.BytesIO(data)) as animation:
+        assert animation.format == "WEBP"
+        assert "exif" in animation.info
+        assert webp_metadata(animation, Generators.COMFYUI) == ANIMATION_PARAMETERS
+
+    with io.BytesIO() as file:
+        exif = Image.Exif()
+        exif[0x0110] = "prompt:{}"
+        exif[0x010F] = "Camera Maker"
+        Image.new("RGB", (4, 4)).save(file, "WEBP", exif=exif, xmp=b"<x:xmpmeta/>")
+
+        assert open_video(file) is None
+        with Image.open(file) as image:
+            assert webp_metadata(image, Generators.COMFYUI) == {
+                "prompt": "{}",
+                "xmp": "<x:xmpmeta/>",
+            }
+
+
+def test_webp_metadata_broken_entries():
+    seed, prompt = b"seed:1\0", b"prompt:{}\0"
+    values = seed + prompt
+    entries = [
+        # a value beyond the end of the data
+        struct.pack("<HHII", 0x010E, 2, 100, 0xFFFF),
+        struct.pack("<HHII", 0x010F, 2, len(seed), 8),
+        struct.pack("<HHII", 0x0110, 2, len(prompt), 8 + len(seed)),
+    ]
+    # the IFD claims one more entry than the data holds
+    ifd = struct.pack("<H", len(entries) + 1) + b"".join(entries)
+    exif = b"II*\0" + struct.pack("<I", 8 + len(values)) + values + ifd
+
+    with io.BytesIO() as file:
+        Image.new("RGB", (4, 4)).save(file, "WEBP", exif=exif)
+        with Image.open(file) as image:
+            assert webp_metadata(image, Generators.COMFYUI) == {"seed": "1", "prompt": "{}"}
+
+
+@pytest.mark.parametrize("comment_after_frames", [False, True], ids=["first", "last"])
+def test_gif_comments(comment_after_frames):
+    data = animated_gif(ANIMATION_PARAMETERS, comment_after_frames=comment_after_frames)
+
+    with Image.open(io.BytesIO(data)) as image:
+        expected = None if comment_after_frames else ANIMATION_PARAMETERS
+        assert gif_comment(image, Generators.COMFYUI) == expected
+        assert gif_comment_extensions(image, Generators.COMFYUI) == ANIMATION_PARAMETERS
+
+
+def test_gif_comments_errors():
+    data = bytearray(animated_gif({}, comment_after_frames=True))
+    assert _gif_comments.read_gif_comments(io.BytesIO(data)) == [b"{}"]
+
+    data[-1:] = b"\x00"  # invalid block in place of the trailer
+    with Image.open(io.BytesIO(data)) as image:
+        with pytest.raises(MetadataError):
+            gif_comment_extensions(image, Generators.COMFYUI)
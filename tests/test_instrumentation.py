@@ -0,0 +1,102 @@
+import functools
+import io
+
+import pytest
+from sd_parsers import MetricsAggregator, ParserManager
+from sd_parsers.data import Generators
+from sd_parsers.exceptions import ParserError
+from sd_parsers.extractors import METADATA_EXTRACTORS, Eagerness, png_image_info
+from sd_parsers.parsers import AUTOMATIC1111Parser, Parser
+
+from tests.tools import RESOURCE_PATH
+
+IMAGE = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+
+
+class FailingParser(Parser):
+    def parse(self, parameters):
+        raise ParserError("always fails")
+
+
+def test_parse_record():
+    records = []
+    parser_manager = ParserManager(instrument=records.append)
+
+    assert parser_manager.parse(IMAGE) is not None
+
+    (record,) = records
+    assert record.source == str(IMAGE)
+    assert record.image_format == "PNG"
+    assert record.generator == Generators.AUTOMATIC1111
+    assert record.extractor == "png_image_info"
+    assert record.parser == "AUTOMATIC1111Parser"
+    assert record.metadata_errors == record.parser_errors == 0
+    assert 0 < record.bytes_read <= IMAGE.stat().st_size
+    assert {"open", "extract", "dispatch", "parse", "normalize", "total"} <= record.stages.keys()
+    assert record.stages["total"] >= record.stages["parse"] >= record.stages["normalize"]
+    assert "AUTOMATIC1111Parser.parse" in record.calls
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_parse_record_unnamed_extractor(monkeypatch, lazy):
+    extractor = functools.partial(png_image_info)
+    monkeypatch.setitem(METADATA_EXTRACTORS, "PNG", {Eagerness.FAST: [extractor]})
+
+    records = []
+    parser_manager = ParserManager(instrument=records.append, lazy=lazy)
+    assert parser_manager.parse(IMAGE) is not None
+
+    (record,) = records
+    assert record.extractor == repr(extractor)
+    assert repr(extractor) in record.calls
+
+
+def test_parse_record_rejections():
+    records = []
+    parser_manager = ParserManager(
+        managed_parsers=[FailingParser, AUTOMATIC1111Parser], instrument=records.append
+    )
+
+    with open(IMAGE, "rb") as file:
+        assert parser_manager.parse(io.BytesIO(file.read())) is not None
+
+    (record,) = records
+    assert record.source is None
+    assert record.parser_errors == 1
+    assert record.parser == "AUTOMATIC1111Parser"
+    assert record.bytes_read
+
+
+def test_parse_record_errors():
+    records = []
+    parser_manager = ParserManager(instrument=records.append)
+
+    assert parser_manager.parse(RESOURCE_PATH / "bad_images" / "empty_image.png") is None
+    with pytest.raises(FileNotFoundError):
+        parser_manager.parse(RESOURCE_PATH / "bad_images" / "missing_file.png")
+
+    assert records[0].generator is None and records[0].error is None
+    assert records[1].error.startswith("FileNotFoundError")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_metrics_aggregator(executor):
+    metrics = MetricsAggregator()
+    parser_manager = ParserManager(instrument=metrics)
+    sources = [
+        *sorted((RESOURCE_PATH / "parsers").rglob("*.png")),
+        RESOURCE_PATH / "bad_images" / "empty_image.png",
+    ]
+
+    results = list(parser_manager.parse_many(sources, workers=2, executor=executor))
+
+    summary = metrics.summary()
+    assert summary["files"] == len(results)
+    assert summary["bytes_read"] > 0
+    assert sum(summary["parser_hits"].values()) == sum(1 for _, result in results if result)
+    assert sum(summary["histogram"]["ComfyUI"].values()) == 4
+    assert sum(summary["histogram"]["none"].values()) == sum(1 for _, res in results if not res)
+
+    report = io.StringIO()
+    metrics.dump(report)
+    assert "ComfyUI (4 files" in report.getvalue()
@@ -0,0 +1,65 @@
+import pytest
+from sd_parsers import InternPool, ParserManager
+from sd_parsers.data import Model, Prompt
+
+from tests.tools import RESOURCE_PATH
+
+IMAGE = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+
+
+def test_intern_pool():
+    pool = InternPool(max_size=2)
+
+    prompt = pool.intern(Prompt("a duck"))
+    assert pool.intern(Prompt("a duck")) is prompt
+    assert pool.intern(Prompt("a duck", prompt_id="1")) is not prompt
+
+    pool.intern(Model(name="model"))
+    assert len(pool) == 2
+    assert pool.intern(Prompt("a duck")) is not prompt
+
+    assert pool.statistics() == {
+        "size": 2,
+        "hits": 1,
+        "misses": 4,
+        "evictions": 2,
+        "hit_rate": 0.2,
+    }
+
+
+def test_parse_interned():
+    parser_manager = ParserManager(intern_pool=InternPool())
+
+    first = parser_manager.parse(IMAGE)
+    second = parser_manager.parse(IMAGE)
+
+    assert first.prompts[0] is second.prompts[0]
+    assert first.negative_prompts[0] is second.negative_prompts[0]
+    assert first.samplers[0].model is second.samplers[0].model
+    assert parser_manager.intern_pool.statistics()["hits"] == 3
+
+
+def test_parse_interned_lazy():
+    parser_manager = ParserManager(intern_pool=InternPool(), lazy=True)
+
+    first = parser_manager.parse(IMAGE)
+    second = parser_manager.parse(IMAGE)
+    assert len(parser_manager.intern_pool) == 0
+
+    assert first.prompts[0] is second.prompts[0]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parse_many_interned(executor):
+    parser_manager = ParserManager()
+    pool = InternPool()
+
+    results = [
+        result
+        for _, result in parser_manager.parse_many(
+            [IMAGE] * 4, workers=2, executor=executor, intern_pool=pool
+        )
+    ]
+
+    assert all(result.prompts[0] is results[0].prompts[0] for result in results)
+    assert pool.statistics()["hit_rate"] == 0.75
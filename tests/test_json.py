@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from sd_parsers import ParserManager, _json
+
+from tests.tools import RESOURCE_PATH
+
+DOCUMENTS = [
+    '{"a": [1, 2.5, "b", null, true], "c": {"d": "\\u00e4"}}',
+    b'{"bytes": "\xc3\xa4"}',
+    "[NaN, Infinity, -Infinity]",
+    "[18446744073709551615, 18446744073709551616, -9223372036854775809]",
+    "-9223372036854775809",
+    '"\\ud800"',
+    '{"a": 1, "a": 2}',
+    '{"a": 1}'.encode("utf-16"),
+]
+
+INVALID_DOCUMENTS = ["", "{", "[1,]", "{'a': 1}", '"\x00"', None]
+
+
+def _available_backends():
+    backends = []
+    for name in _json.BACKENDS:
+        try:
+            _json.get_backend(name)
+        except ImportError:
+            continue
+        backends.append(name)
+    return backends
+
+
+@pytest.mark.parametrize("backend", _available_backends())
+def test_loads(backend):
+    with _json.use_backend(backend):
+        assert _json.backend_name() == backend
+
+        for document in DOCUMENTS:
+            assert repr(_json.loads(document)) == repr(json.loads(document))
+
+        for document in INVALID_DOCUMENTS:
+            with pytest.raises(Exception) as expected:
+                json.loads(document)
+            with pytest.raises(type(expected.value)):
+                _json.loads(document)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        ParserManager(json_backend="simplejson5")
+
+
+def test_environment_variable(monkeypatch):
+    monkeypatch.setenv(_json.ENVIRONMENT_VARIABLE, "json")
+    assert _json._default_backend()[0] == "json"
+
+    monkeypatch.setenv(_json.ENVIRONMENT_VARIABLE, "unknown")
+    assert _json._default_backend() == _json.get_backend("auto")
+
+
+@pytest.mark.parametrize("backend", _available_backends())
+def test_parse_results(backend):
+    sources = sorted((RESOURCE_PATH / "parsers").rglob("*.png"))
+    expected = list(ParserManager(json_backend="json").parse_many(sources))
+
+    assert list(ParserManager(json_backend=backend).parse_many(sources)) == expected
+
+
+def test_lazy_results_backend(monkeypatch):
+    parser_manager = ParserManager(json_backend="json", lazy=True)
+    prompt_info = parser_manager.parse(
+        RESOURCE_PATH / "parsers" / "ComfyUI" / "img2img_cropped.png"
+    )
+    assert prompt_info is not None and not prompt_info.materialized
+
+    backends = []
+    loads = _json.loads
+    monkeypatch.setattr(
+        _json, "loads", lambda value: backends.append(_json.backend_name()) or loads(value)
+    )
+
+    # parsed outside of parse(), with the backend of the ParserManager
+    assert prompt_info.samplers
+    assert backends and set(backends) == {"json"}
@@ -0,0 +1,25 @@
+import json
+
+from sd_parsers.__main__ import main
+
+from tests.tools import RESOURCE_PATH
+
+
+def test_scan(tmp_path, capsys):
+    output = tmp_path / "output.ndjson"
+
+    exit_code = main(
+        ["scan", "-r", str(RESOURCE_PATH / "parsers"), "--executor", "thread", "--metrics"]
+        + ["-o", str(output)]
+    )
+
+    assert exit_code == 0
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert len(records) == 11
+    for record in records:
+        assert record["prompt_info"]["generator"] in record["file"]
+
+    summary = capsys.readouterr().err
+    assert "files/s" in summary
+    assert "ComfyUI: 4" in summary
+    assert "ComfyUI (4 files" in summary
@@ -1,11 +1,26 @@
+import functools
 import io
 import logging
+import pickle
+import struct
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import PIL
 import pytest
-from sd_parsers import ParserManager
+from sd_parsers import ParserManager, _batch
+from sd_parsers.data import Generators, LazyPromptInfo, PromptInfo
+from sd_parsers.exceptions import ParserError
+from sd_parsers.parsers import (
+    AUTOMATIC1111Parser,
+    ComfyUIParser,
+    FooocusParser,
+    InvokeAIParser,
+    NovelAIParser,
+)
 
-from sd_parsers.extractors import Eagerness
+from sd_parsers.extractors import METADATA_EXTRACTORS, Eagerness, png_image_info
 from tests.tools import RESOURCE_PATH
 
 logger = logging.getLogger(__name__)
@@ -37,6 +52,15 @@ def test_parse_empty_file():
         parser_manager.parse(RESOURCE_PATH / "bad_images" / "empty_file.png")
 
 
+def test_parse_heic_file():
+    # not supported by Pillow, nor a video
+    heic = struct.pack(">I4s4sI8s", 24, b"ftyp", b"heic", 0, b"mif1heic") + bytes(100)
+
+    parser_manager = ParserManager()
+    with pytest.raises(PIL.UnidentifiedImageError):
+        parser_manager.parse(io.BytesIO(heic))
+
+
 def test_parse_images_without_metadata():
     parser_manager = ParserManager()
 
@@ -47,6 +71,30 @@ def test_parse_images_without_metadata():
     assert res2 is None
 
 
+def test_parse_unsupported_format():
+    image = io.BytesIO()
+    PIL.Image.new("RGB", (4, 4)).save(image, "BMP")
+
+    parser_manager = ParserManager()
+    assert parser_manager.parse(image) is None
+
+
+def test_lazy_imports():
+    code = (
+        "import sys\n"
+        "from sd_parsers import ParserManager\n"
+        "ParserManager()\n"
+        "print(' '.join(sys.modules))"
+    )
+    modules = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout.split()
+
+    assert "PIL" not in modules
+    assert "sd_parsers.parsers._comfyui" not in modules
+    assert "sd_parsers.extractors._png_stenographic_alpha" not in modules
+
+
 def test_parse_text_string():
     parser_manager = ParserManager()
     with pytest.raises(ValueError):
@@ -59,3 +107,261 @@ def test_parse_text_after_idat():
     prompt_info = parser_manager.parse(RESOURCE_PATH / "bad_images" / "text_after_idat.png")
     assert prompt_info is not None
     assert prompt_info.prompts
+
+
+def test_parse_images_threaded():
+    parser_manager = ParserManager()
+    filenames = [
+        filename
+        for filename in (RESOURCE_PATH / "parsers").rglob("*.*")
+        if filename.suffix.lower() in (".jpg", ".png", ".webp")
+    ]
+
+    expected = [parser_manager.parse(filename, eagerness=Eagerness.EAGER) for filename in filenames]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(
+                lambda filename: parser_manager.parse(filename, eagerness=Eagerness.EAGER),
+                filenames * 8,
+            )
+        )
+
+    assert results == expected * 8
+
+
+def _batch_sources():
+    return [
+        *sorted((RESOURCE_PATH / "parsers").rglob("*.png")),
+        RESOURCE_PATH / "bad_images" / "empty_image.png",
+        RESOURCE_PATH / "bad_images" / "missing_file.png",
+    ]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parse_many(executor):
+    parser_manager = ParserManager()
+    sources = _batch_sources()
+
+    results = list(parser_manager.parse_many(sources, workers=2, executor=executor))
+
+    assert [source for source, _ in results] == sources
+    for source, result in results[:-2]:
+        assert result == parser_manager.parse(source)
+    assert results[-2][1] is None
+    assert isinstance(results[-1][1], FileNotFoundError)
+
+
+def test_worker_config(monkeypatch):
+    from sd_parsers import parsers
+
+    # changes to the default parsers are passed on to worker processes
+    monkeypatch.setattr(parsers, "MANAGED_PARSERS", [NovelAIParser])
+    parser_manager = ParserManager()
+
+    assert parser_manager._worker_config["managed_parsers"] == [NovelAIParser]
+    worker_manager = ParserManager(**parser_manager._worker_config)
+    assert worker_manager._cache_config == parser_manager._cache_config
+
+
+def test_set_managed_parsers():
+    filename = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+    parser_manager = ParserManager()
+    cache_config = parser_manager._cache_config
+    assert parser_manager.parse(filename) is not None
+
+    parser_manager.managed_parsers = [NovelAIParser()]
+
+    assert [type(parser) for parser in parser_manager.managed_parsers] == [NovelAIParser]
+    assert parser_manager._cache_config != cache_config
+    assert parser_manager._worker_config["managed_parsers"] == [NovelAIParser]
+    assert parser_manager.parse(filename) is None
+
+
+def test_change_managed_parsers():
+    filename = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+    parser_manager = ParserManager(managed_parsers=[NovelAIParser])
+    assert parser_manager.parse(filename) is None
+
+    # changes made in place are indexed as well
+    parser_manager.managed_parsers.append(AUTOMATIC1111Parser())
+    assert parser_manager.parse(filename).generator == Generators.AUTOMATIC1111
+
+    del parser_manager.managed_parsers[1]
+    assert parser_manager.parse(filename) is None
+
+
+def test_pack_results():
+    parser_manager = ParserManager()
+    for source in _batch_sources()[:-2]:
+        result = parser_manager.parse(source)
+        assert _batch._unpack(_batch._pack(result)) == result
+
+    # errors which can't be restored are replaced
+    class LocalError(Exception):
+        pass
+
+    assert type(_batch._portable_error(LocalError("message"))) is RuntimeError
+    assert type(_batch._portable_error(KeyError("key"))) is KeyError
+
+
+def test_parse_many_completion_order():
+    parser_manager = ParserManager()
+    sources = _batch_sources()
+
+    results = dict(parser_manager.parse_many(sources, workers=4, ordered=False))
+
+    assert results.keys() == set(sources)
+
+
+def test_parse_many_bounded():
+    parser_manager = ParserManager()
+    sources = _batch_sources()
+    consumed = []
+
+    def source_iterator():
+        for source in sources:
+            consumed.append(source)
+            yield source
+
+    results = parser_manager.parse_many(source_iterator(), workers=1, max_pending=2)
+    next(results)
+    assert len(consumed) <= 3
+    results.close()
+
+
+def test_parse_many_unknown_executor():
+    with pytest.raises(ValueError):
+        ParserManager().parse_many([], executor="cluster")
+
+
+def test_parser_routing(monkeypatch):
+    parser_manager = ParserManager()
+    called = []
+
+    for parser in parser_manager.managed_parsers:
+        monkeypatch.setattr(
+            parser,
+            "parse",
+            lambda parameters, parse=parser.parse, parser=parser: (
+                called.append(parser.generator) or parse(parameters)
+            ),
+        )
+
+    prompt_info = parser_manager.parse(
+        RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+    )
+
+    assert prompt_info is not None
+    assert called == [Generators.AUTOMATIC1111]
+
+
+@pytest.mark.parametrize(
+    "parser, parameters, expected",
+    [
+        (AUTOMATIC1111Parser, {"parameters": "a prompt\nSteps: 1"}, True),
+        (AUTOMATIC1111Parser, {"parameters": 1}, False),
+        (FooocusParser, {"parameters": '{"prompt": "a prompt"}'}, True),
+        (FooocusParser, {"parameters": "a prompt\nSteps: 1"}, False),
+        (ComfyUIParser, {"prompt": '{"1": {"class_type": "A"}}', "workflow": "{}"}, True),
+        (ComfyUIParser, {"prompt": b'{"1": {"class_type": "A"}}'}, True),
+        (ComfyUIParser, {"prompt": {"1": {"class_type": "A", "inputs": {}}}}, True),
+        (ComfyUIParser, {"prompt": "a prompt", "workflow": "{}"}, False),
+        (ComfyUIParser, {"prompt": '{"prompt": "a prompt", "seed": 1}'}, False),
+        (ComfyUIParser, {"prompt": {"prompt": "a prompt", "seed": 1}}, False),
+        (InvokeAIParser, {"Dream": '"a prompt" -s 1'}, True),
+        (InvokeAIParser, {"parameters": ""}, False),
+        (NovelAIParser, {"Comment": "{}", "Description": "", "Source": ""}, True),
+        (NovelAIParser, {"Comment": "{}"}, False),
+    ],
+)
+def test_parser_accepts(parser, parameters, expected):
+    assert parser().accepts(parameters) is expected
+
+
+def test_parse_lazy():
+    parser_manager = ParserManager()
+    lazy_manager = ParserManager(lazy=True)
+
+    for filename in sorted((RESOURCE_PATH / "parsers").rglob("*.png")):
+        prompt_info = parser_manager.parse(filename, eagerness=Eagerness.EAGER)
+        lazy_info = lazy_manager.parse(filename, eagerness=Eagerness.EAGER)
+
+        assert isinstance(lazy_info, LazyPromptInfo)
+        assert lazy_info.generator == prompt_info.generator
+        assert lazy_info.raw_parameters.items() >= prompt_info.raw_parameters.items()
+        assert not lazy_info.materialized
+
+        assert lazy_info.prompts == prompt_info.prompts
+        assert lazy_info.materialized
+        assert lazy_info == prompt_info
+
+        unpickled = pickle.loads(pickle.dumps(lazy_info))
+        assert type(unpickled) is PromptInfo
+        assert unpickled == prompt_info
+
+
+def test_parse_lazy_error():
+    def failing_parse(parameters):
+        raise ParserError("always fails")
+
+    lazy_info = LazyPromptInfo(Generators.AUTOMATIC1111, {}, failing_parse)
+
+    assert lazy_info.generator == Generators.AUTOMATIC1111
+    with pytest.raises(ParserError):
+        lazy_info.samplers
+
+
+class _FailingParser(AUTOMATIC1111Parser):
+    generator = Generators.UNKNOWN
+
+    def parse(self, parameters):
+        raise ParserError("always fails")
+
+
+def test_parse_lazy_fallback():
+    filename = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+    managed_parsers = [_FailingParser, AUTOMATIC1111Parser]
+    expected = ParserManager(managed_parsers=managed_parsers).parse(filename)
+
+    # the next parser accepting the same metadata is used, updating the generator
+    lazy_info = ParserManager(managed_parsers=managed_parsers, lazy=True).parse(filename)
+    assert lazy_info.generator == Generators.UNKNOWN
+    assert lazy_info == expected
+    assert lazy_info.generator == Generators.AUTOMATIC1111
+
+    # without another parser, parse() returns None, while lazy results raise on first access
+    assert ParserManager(managed_parsers=[_FailingParser]).parse(filename) is None
+    lazy_info = ParserManager(managed_parsers=[_FailingParser], lazy=True).parse(filename)
+    assert lazy_info is not None
+    with pytest.raises(ParserError):
+        lazy_info.samplers
+
+
+def test_detect(monkeypatch):
+    parser_manager = ParserManager()
+    sources = sorted((RESOURCE_PATH / "parsers").rglob("*.png"))
+    expected = [parser_manager.parse(source, Eagerness.EAGER).generator for source in sources]
+
+    for parser in parser_manager.managed_parsers:
+        monkeypatch.setattr(parser, "parse", None)
+
+    detections = [parser_manager.detect(source, Eagerness.EAGER) for source in sources]
+
+    assert [detection.generator for detection in detections] == expected
+    assert detections[0] == (
+        Generators.AUTOMATIC1111,
+        "png_image_info",
+        "AUTOMATIC1111Parser",
+    )
+    assert parser_manager.detect(RESOURCE_PATH / "bad_images" / "empty_image.png") is None
+
+
+def test_detect_unnamed_extractor(monkeypatch):
+    extractor = functools.partial(png_image_info)
+    monkeypatch.setitem(METADATA_EXTRACTORS, "PNG", {Eagerness.FAST: [extractor]})
+    filename = RESOURCE_PATH / "parsers" / "AUTOMATIC1111" / "automatic1111_cropped.png"
+
+    detection = ParserManager().detect(filename)
+
+    assert detection == (Generators.AUTOMATIC1111, repr(extractor), "AUTOMATIC1111Parser")
@@ -0,0 +1,60 @@
+import io
+import json
+
+import pytest
+from sd_parsers import NDJSONWriter, ParserManager
+from sd_parsers.data import Generators, Prompt, PromptInfo, Sampler
+
+from tests.tools import RESOURCE_PATH
+
+PROMPT_INFO = PromptInfo(
+    Generators.AUTOMATIC1111,
+    [Sampler(name="UniPC", parameters={"steps": "15"}, prompts=[Prompt("a duck")])],
+    {"Size": "512x400"},
+    {"parameters": "a duck", "icc_profile": b"\x00\x01", "dpi": (72, 72)},
+)
+
+
+def _write(records, **kwargs):
+    stream = io.StringIO()
+    writer = NDJSONWriter(stream, **kwargs)
+    for record in records:
+        writer.write(record)
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_same_as_to_json():
+    parser_manager = ParserManager()
+    results = [
+        parser_manager.parse(filename)
+        for filename in sorted((RESOURCE_PATH / "parsers").rglob("*.png"))
+    ]
+    results = [result for result in results if result]
+
+    records = _write({"file": index, "prompt_info": result} for index, result in enumerate(results))
+
+    assert len(records) == len(results)
+    for index, (record, result) in enumerate(zip(records, results)):
+        assert record == {"file": index, "prompt_info": json.loads(result.to_json())}
+
+
+def test_binary_values():
+    (record,) = _write([PROMPT_INFO])
+    assert record["raw_parameters"] == {
+        "parameters": "a duck",
+        "icc_profile": "AAE=",
+        "dpi": [72, 72],
+    }
+    assert record["full_prompt"] == "a duck"
+    assert record["samplers"][0]["prompts"] == [
+        {"value": "a duck", "prompt_id": None, "metadata": {}}
+    ]
+
+    (record,) = _write([PROMPT_INFO], binary="drop")
+    assert record["raw_parameters"] == {"parameters": "a duck", "dpi": [72, 72]}
+
+    (record,) = _write([PROMPT_INFO], raw_parameters=False)
+    assert "raw_parameters" not in record
+
+    with pytest.raises(ValueError):
+        NDJSONWriter(io.StringIO(), binary="hex")
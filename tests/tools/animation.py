@@ -0,0 +1,118 @@
+"""Create animated images with metadata, as written by ComfyUI (and Pillow)."""
+
+import io
+import json
+import random
+import struct
+import zlib
+from typing import Any, Dict, List
+
+from PIL import Image, PngImagePlugin
+
+
+def _frames(frame_count: int, size: int) -> List[Image.Image]:
+    # noise, to keep the image data from being compressed away
+    rng = random.Random(frame_count)
+    return [
+        Image.frombytes("RGB", (size, size), rng.randbytes(size * size * 3))
+        for _ in range(frame_count)
+    ]
+
+
+def animated_webp(parameters: Dict[str, Any], *, frame_count: int = 20, size: int = 64) -> bytes:
+    """
+    Return an animated WEBP image, storing `parameters` as "name:value" EXIF tags.
+
+    Like ComfyUI's SaveAnimatedWEBP node: "prompt" goes to tag 0x0110,
+    all other values to the tags from 0x010F downwards.
+    """
+    frames = _frames(frame_count, size)
+    exif = Image.Exif()
+    tag = 0x010F
+    for name, value in parameters.items():
+        text = value if isinstance(value, str) else json.dumps(value)
+        if name == "prompt":
+            exif[0x0110] = f"prompt:{text}"
+        else:
+            exif[tag] = f"{name}:{text}"
+            tag -= 1
+
+    fp = io.BytesIO()
+    frames[0].save(fp, "WEBP", save_all=True, append_images=frames[1:], exif=exif, quality=90)
+    return fp.getvalue()
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def animated_png(
+    parameters: Dict[str, Any],
+    *,
+    frame_count: int = 20,
+    size: int = 64,
+    text_after_frames: bool = False,
+) -> bytes:
+    """
+    Return an animated PNG image, storing `parameters` as text chunks.
+
+    Text chunks are written in front of the image data (like ComfyUI's SaveAnimatedPNG node),
+    or behind the last frame.
+    """
+    frames = _frames(frame_count, size)
+    texts = {
+        name: value if isinstance(value, str) else json.dumps(value)
+        for name, value in parameters.items()
+    }
+
+    fp = io.BytesIO()
+    if text_after_frames:
+        frames[0].save(fp, "PNG", save_all=True, append_images=frames[1:])
+        data = fp.getvalue()
+        iend = data.rindex(b"IEND") - 4
+        chunks = b"".join(
+            _png_chunk(b"tEXt", name.encode("latin-1") + b"\0" + text.encode("latin-1"))
+            for name, text in texts.items()
+        )
+        return data[:iend] + chunks + data[iend:]
+
+    pnginfo = PngImagePlugin.PngInfo()
+    for name, text in texts.items():
+        pnginfo.add_text(name, text)
+    frames[0].save(fp, "PNG", save_all=True, append_images=frames[1:], pnginfo=pnginfo)
+    return fp.getvalue()
+
+
+def _gif_comment(comment: bytes) -> bytes:
+    sub_blocks = b"".join(
+        bytes([len(comment[i : i + 255])]) + comment[i : i + 255]
+        for i in range(0, len(comment), 255)
+    )
+    return b"\x21\xfe" + sub_blocks + b"\x00"
+
+
+def animated_gif(
+    parameters: Dict[str, Any],
+    *,
+    frame_count: int = 20,
+    size: int = 64,
+    comment_after_frames: bool = False,
+) -> bytes:
+    """
+    Return an animated GIF image, storing `parameters` as JSON object in a comment extension.
+
+    The comment is written in front of the first frame (by Pillow), or behind the last frame.
+    """
+    frames = _frames(frame_count, size)
+    comment = json.dumps(parameters).encode()
+
+    fp = io.BytesIO()
+    if comment_after_frames:
+        frames[0].save(fp, "GIF", save_all=True, append_images=frames[1:])
+        data = fp.getvalue()
+        # insert in front of the trailer
+        return data[:-1] + _gif_comment(comment) + data[-1:]
+
+    frames[0].save(fp, "GIF", save_all=True, append_images=frames[1:], comment=comment)
+    return fp.getvalue()
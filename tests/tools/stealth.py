@@ -0,0 +1,28 @@
+"""Create images containing stealth metadata (as used by the `png_stenographic_alpha` extractor)."""
+
+import gzip
+
+from PIL import Image
+
+from sd_parsers.extractors._png_stenographic_alpha import STEALTH_HEADER
+
+
+def embed_stealth(image: Image.Image, text: str) -> Image.Image:
+    """Return an RGBA copy of `image`, hiding `text` in the least significant bits of its alpha."""
+    payload = gzip.compress(text.encode("utf-8"))
+    data = STEALTH_HEADER.encode("utf-8") + (len(payload) * 8).to_bytes(4, "big") + payload
+    bits = [(byte >> shift) & 1 for byte in data for shift in range(7, -1, -1)]
+
+    width, height = image.size
+    if len(bits) > width * height:
+        raise ValueError("image too small for the given text")
+
+    image = image.convert("RGBA")
+    alpha = bytearray(image.getchannel("A").tobytes())
+    for index, bit in enumerate(bits):
+        col, row = divmod(index, height)
+        pos = row * width + col
+        alpha[pos] = (alpha[pos] & 0xFE) | bit
+
+    image.putalpha(Image.frombytes("L", image.size, bytes(alpha)))
+    return image
@@ -0,0 +1,150 @@
+"""Create minimal video files with metadata tags (as read by the `video_metadata` extractor)."""
+
+import struct
+from typing import Dict
+
+# iTunes style item codes, as used by ffmpeg
+ITEM_CODES = {"comment": b"\xa9cmt", "title": b"\xa9nam", "encoder": b"\xa9too"}
+
+
+def _box(box_type: bytes, *children: bytes) -> bytes:
+    data = b"".join(children)
+    return struct.pack(">I4s", 8 + len(data), box_type) + data
+
+
+def _data(value: str) -> bytes:
+    # UTF-8 type, default locale
+    return _box(b"data", struct.pack(">II", 1, 0), value.encode("utf-8"))
+
+
+def mp4_file(
+    tags: Dict[str, str],
+    *,
+    payload_size: int = 1_000_000,
+    layout: str = "ilst",
+    moov_first: bool = False,
+) -> bytes:
+    """
+    Return an MP4 file with the given tags and `payload_size` bytes of video data.
+
+    Layouts (as written by ffmpeg):
+     - ilst: iTunes style items in "moov/udta/meta/ilst"
+     - mdta: named items in "moov/meta" (`-movflags use_metadata_tags`)
+     - quicktime: QuickTime text in "moov/udta", in a .mov file
+    """
+    brand = b"qt  " if layout == "quicktime" else b"isom"
+    ftyp = _box(b"ftyp", brand, struct.pack(">I", 0x200), b"isomiso2mp41")
+    mdat = _box(b"mdat", b"\xff" * payload_size)
+    mvhd = _box(b"mvhd", bytes(100))
+    trak = _box(b"trak", _box(b"tkhd", bytes(84)), _box(b"mdia", bytes(64)))
+
+    if layout == "quicktime":
+        udta = _box(
+            b"udta",
+            *(
+                _box(
+                    ITEM_CODES[name],
+                    struct.pack(">HH", len(value.encode()), 0x55C4),
+                    value.encode(),
+                )
+                for name, value in tags.items()
+            ),
+        )
+        moov = _box(b"moov", mvhd, trak, udta)
+    elif layout == "mdta":
+        keys = _box(
+            b"keys",
+            struct.pack(">II", 0, len(tags)),
+            *(struct.pack(">I4s", 8 + len(name), b"mdta") + name.encode() for name in tags),
+        )
+        ilst = _box(
+            b"ilst",
+            *(
+                _box(struct.pack(">I", index), _data(value))
+                for index, value in enumerate(tags.values(), start=1)
+            ),
+        )
+        hdlr = _box(b"hdlr", bytes(8), b"mdta", bytes(13))
+        moov = _box(b"moov", mvhd, trak, _box(b"meta", bytes(4), hdlr, keys, ilst))
+    else:
+        ilst = _box(
+            b"ilst", *(_box(ITEM_CODES[name], _data(value)) for name, value in tags.items())
+        )
+        hdlr = _box(b"hdlr", bytes(8), b"mdirappl", bytes(9))
+        moov = _box(b"moov", mvhd, trak, _box(b"udta", _box(b"meta", bytes(4), hdlr, ilst)))
+
+    return ftyp + (moov + mdat if moov_first else mdat + moov)
+
+
+def _element(element_id: int, *children: bytes) -> bytes:
+    data = b"".join(children)
+    # ids keep their length marker, sizes are written with 8 bytes
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + (
+        b"\x01" + len(data).to_bytes(7, "big") + data
+    )
+
+
+def _simple_tag(name: str, value: str) -> bytes:
+    return _element(0x67C8, _element(0x45A3, name.encode()), _element(0x4487, value.encode()))
+
+
+def webm_file(
+    tags: Dict[str, str],
+    *,
+    payload_size: int = 1_000_000,
+    doc_type: str = "webm",
+    seek_head: bool = True,
+    tags_first: bool = False,
+) -> bytes:
+    """
+    Return a Matroska/WebM file with the given global tags and `payload_size` bytes of video data.
+
+    Tags are written behind the clusters (listed in the seek head, if any),
+    or in front of them (`tags_first`). A track specific tag is written as well.
+    """
+    header = _element(0x1A45DFA3, _element(0x4286, b"\x01"), _element(0x4282, doc_type.encode()))
+    info = _element(0x1549A966, _element(0x2AD7B1, b"\x0f\x42\x40"))
+    tracks = _element(
+        0x1654AE6B, _element(0xAE, _element(0xD7, b"\x01"), _element(0x73C5, b"\x07"))
+    )
+    clusters = b"".join(
+        _element(0x1F43B675, _element(0xE7, b"\x00"), _element(0xA3, b"\xff" * (payload_size // 4)))
+        for _ in range(4)
+    )
+
+    track_tag = _element(
+        0x7373,
+        _element(0x63C0, _element(0x63C5, b"\x07")),
+        _simple_tag("COMMENT", "track comment"),
+    )
+    global_tag = _element(
+        0x7373,
+        _element(0x63C0),
+        *(_simple_tag(name.upper(), value) for name, value in tags.items()),
+    )
+    tags_element = _element(0x1254C367, track_tag, global_tag)
+
+    body = (
+        [info, tracks, tags_element, clusters]
+        if tags_first
+        else [info, tracks, clusters, tags_element]
+    )
+
+    if seek_head:
+        # positions relative to the segment data, behind the seek head (of fixed size)
+        def seek_entries(tags_position: int) -> bytes:
+            return _element(
+                0x114D9B74,
+                _element(0x4DBB, _element(0x53AB, b"\x15\x49\xa9\x66"), _element(0x53AC, bytes(8))),
+                _element(
+                    0x4DBB,
+                    _element(0x53AB, b"\x12\x54\xc3\x67"),
+                    _element(0x53AC, tags_position.to_bytes(8, "big")),
+                ),
+            )
+
+        size = len(seek_entries(0))
+        tags_position = size + sum(len(element) for element in body[: body.index(tags_element)])
+        body.insert(0, seek_entries(tags_position))
+
+    return header + _element(0x18538067, *body)